@@ -1,26 +1,105 @@
-import os
 import re
 import json
+import time
+import asyncio
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 from decimal import Decimal
 from app.utils import format_date_br
-from app.data_to_db import query_payroll_data, csv_to_sqlite
-from app.utils import format_currency, parse_date_input
+from app.data_to_db import (
+    query_payroll_data, iter_payroll_data, query_period_totals, csv_to_sqlite, dataset_version, PAYROLL_COLUMNS,
+)
+from app.utils import format_currency, format_currency_column, parse_date_input
+from app.config import (
+    GEMINI_API_KEY, CHAT_MAX_CONCURRENCY, DB_EXECUTOR_WORKERS, PAYROLL_CSV_PATH, PAYROLL_DB_PATH, CHAT_LOG_MESSAGES,
+    OFFLINE_MODE, PAYROLL_BACKEND, PAYROLL_PAGE_SIZE, PAYROLL_FETCH_BATCH, AGGREGATE_MAX_GROUPS, AGGREGATE_SOURCE_LIMIT,
+)
+from app.sessions import create_session_store
+from app.extraction_cache import create_extraction_cache, normalize_query
+from app.intent_router import IntentRouter
+from app.name_index import NameIndex
+from app.columnar import load_columnar_payroll
+from app.response_cache import ResponseCache, SingleFlight, response_key
+from app.llm_governor import LLMGovernor, CircuitOpenError
+from app.pagination import encode_cursor, decode_cursor
+from app.query_planner import aggregate_spec, plan_aggregate, GROUP_KEYS
+from app.metrics import stage, STAGE_SECONDS, INTENTS, EXTRACTIONS, LLM_ERRORS
+
+UNANSWERABLE_PAYROLL_QUERY = "Não consegui entender sua consulta de folha de pagamento ou faltam informações."
+
+UNRESOLVED_NAME = 'Não encontrei um único funcionário chamado "{name}". Informe o nome completo.'
+
+# Máximo de funcionários por `employee_id IN (...)` no caminho em lote.
+BATCH_SQL_CHUNK = 500
+
+# Colunas cujo total em um período é respondido pelos agregados (`payroll_rollups`).
+PERIOD_TOTAL_LABELS = {
+    "net_pay": "líquido",
+    "base_salary": "salário base",
+    "benefits_vt_vr": "benefícios (VT/VR)",
+    "other_earnings": "outros proventos",
+    "deductions_inss": "INSS",
+    "deductions_irrf": "IRRF",
+    "other_deductions": "outros descontos",
+}
+
+# Rótulos das perguntas agregadas (`app.query_planner`).
+AGGREGATE_LABELS = {
+    "sum": "Total", "avg": "Média", "max": "Maior valor", "min": "Menor valor", "count": "Quantidade de lançamentos",
+}
+COLUMN_LABELS = {**PERIOD_TOTAL_LABELS, "net_pay": "salário líquido", "bonus": "bônus"}
+
+ORDINALS = {"1": 1, "2": 2, "3": 3, "4": 4, "primeiro": 1, "segundo": 2, "terceiro": 3, "quarto": 4}
+
+GENERAL_CHAT_ERROR = "Desculpe, não consegui processar sua solicitação no momento. Tente novamente mais tarde."
+
+OFFLINE_GENERAL_CHAT = "No modo offline só respondo perguntas sobre a folha de pagamento."
+
+# Intenções com rótulo próprio no /metrics; qualquer outra resposta do LLM conta como "other".
+KNOWN_INTENTS = ("payroll_query", "general_chat")
+
+
+def _rows_label(count: int):
+    return f"{count} linha" if count == 1 else f"{count} linhas"
 
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 class PayrollChatbot:
-    def __init__(self):
-        if not GEMINI_API_KEY:
-            raise ValueError("GEMINI_API_KEY não configurada. Verifique seu arquivo .env.")
-        self.llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=GEMINI_API_KEY)
-        self.history = [] 
-        csv_to_sqlite("data/payroll.csv", "data/payroll.db")
+    def __init__(self, llm=None, session_store=None, extraction_cache=None, intent_router=None, offline=OFFLINE_MODE,
+                 payroll_backend=PAYROLL_BACKEND, response_cache=None, llm_governor=None):
+        # Modo offline: sem LLM (nem a importação do LangChain/Gemini); a extração usa só
+        # cache, roteador e heurística, e o chat geral recebe uma resposta fixa.
+        if llm is None and not offline:
+            if not GEMINI_API_KEY:
+                raise ValueError("GEMINI_API_KEY não configurada. Verifique seu arquivo .env.")
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+            llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=GEMINI_API_KEY)
+        self.llm = llm
+        # Prazos, limite de concorrência, novas tentativas, hedge e disjuntor de toda chamada ao LLM.
+        self.governor = llm_governor if llm_governor is not None else LLMGovernor()
+        self.sessions = session_store if session_store is not None else create_session_store()
+        self.extraction_cache = extraction_cache if extraction_cache is not None else create_extraction_cache()
+        self.intent_router = intent_router if intent_router is not None else IntentRouter()
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        # Perguntas idênticas simultâneas compartilham o cálculo da resposta de folha e, no
+        # chat geral, a chamada ao LLM (mesmo prompt completo, histórico incluído).
+        self.payroll_flight = SingleFlight("payroll")
+        self.llm_flight = SingleFlight("general_chat")
+        # Caminho assíncrono: limite de conversas simultâneas e pool para o SQLite.
+        self._chat_semaphore = asyncio.Semaphore(CHAT_MAX_CONCURRENCY)
+        self._db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="payroll-db")
+        # Ingestão incremental: não relê o CSV se ele não mudou desde a última carga.
+        csv_to_sqlite(PAYROLL_CSV_PATH, PAYROLL_DB_PATH)
+        # Índice de nomes e motor colunar acompanham `dataset_version`: uma nova carga (mesmo
+        # feita por outro worker) não deixa respostas da carga anterior no cache da nova versão.
+        self._name_index_lock = threading.Lock()
+        self._name_index_version = dataset_version(PAYROLL_DB_PATH)
+        self._name_index = NameIndex.from_db(PAYROLL_DB_PATH)
+        self.payroll_backend = payroll_backend
+        if payroll_backend == "columnar":
+            load_columnar_payroll(PAYROLL_DB_PATH)
         self.system_prompt = (
             "Você é um chatbot especializado em folha de pagamento, mas também capaz de conversar sobre assuntos gerais. "
             "Para perguntas sobre folha de pagamento, consulte os dados disponíveis. "
@@ -29,10 +108,39 @@ class PayrollChatbot:
             "Se não encontrar informações específicas sobre folha de pagamento, informe ao usuário. "
         )
 
-    def _extract_payroll_intent_and_params(self, user_query: str):
+    @property
+    def name_index(self):
+        """Índice de nomes da versão atual dos dados; remontado quando a versão muda."""
+        version = dataset_version(PAYROLL_DB_PATH)
+        if version != self._name_index_version:
+            with self._name_index_lock:
+                if version != self._name_index_version:
+                    self._name_index = NameIndex.from_db(PAYROLL_DB_PATH)
+                    self._name_index_version = version
+        return self._name_index
+
+    @property
+    def columnar(self):
         """
-        Usa o LLM para extrair intenção (payroll_query, general_chat) e parâmetros (nome, mes_ano, tipo_dado).
+        Motor colunar opcional (as consultas de folha rodam em matrizes NumPy, sem SQLite), ou
+        `None`. `load_columnar_payroll` confere a versão a cada chamada e recarrega se mudou.
         """
+        return load_columnar_payroll(PAYROLL_DB_PATH) if self.payroll_backend == "columnar" else None
+
+    def _log(self, message: str):
+        """Log por mensagem no stdout, desligável com `CHAT_LOG_MESSAGES=false`."""
+        if CHAT_LOG_MESSAGES:
+            print(message)
+
+    def _count_intent(self, params: dict):
+        intent = params.get("intent")
+        INTENTS.inc(intent=intent if intent in KNOWN_INTENTS else "other")
+
+    def _build_extraction_chain(self, user_query: str):
+        """Monta a chain de extração de intenção e parâmetros (JSON)."""
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_core.messages import SystemMessage, HumanMessage
+
         prompt = ChatPromptTemplate.from_messages([
             SystemMessage(
                 "Analise a seguinte pergunta do usuário e extraia o máximo de informações possível "
@@ -41,34 +149,125 @@ class PayrollChatbot:
                 "Se a pergunta não for sobre folha de pagamento, indique 'general_chat'. "
                 "Formato de saída esperado: JSON como {'intent': 'payroll_query'|'general_chat', 'name': '...', 'competency': 'YYYY-MM', 'data_type': '...', 'period_start': 'YYYY-MM', 'period_end': 'YYYY-MM'}"
                 "Para perguntas de período, como '1º trimestre', converta para 'period_start' e 'period_end'."
+                "Para agregações e rankings, inclua também 'aggregation' ('sum'|'avg'|'max'|'min'|'count'), "
+                "'group_by' ('employee'|'month'), 'order' ('asc'|'desc') e 'limit' (número), "
+                "ex.: 'top 10 bônus do trimestre' → {'order': 'desc', 'limit': 10}; "
+                "'média de IRRF por mês' → {'aggregation': 'avg', 'group_by': 'month'}."
             ),
             HumanMessage(content=user_query)
         ])
+        return prompt | self.llm.bind(response_format={"type": "json_object"})
+
+    def _extract_payroll_intent_and_params(self, user_query: str):
+        """
+        Usa o LLM para extrair intenção (payroll_query, general_chat) e parâmetros (nome, mes_ano, tipo_dado).
+        Perguntas equivalentes após `normalize_query` reaproveitam a extração do cache, e as
+        óbvias são resolvidas pelo roteador local (`IntentRouter`) sem chamar o LLM. Com o
+        disjuntor do `LLMGovernor` aberto, a extração vai direto para `_fallback_extract_params`.
+        """
+        cache_key = normalize_query(user_query)
+        cached = self.extraction_cache.get(cache_key)
+        if cached is not None:
+            EXTRACTIONS.inc(source="cache")
+            return cached
+        intent, _ = self.intent_router.route(user_query)
+        routed_params = self._params_from_route(user_query, intent)
+        if routed_params is not None:
+            EXTRACTIONS.inc(source="router")
+            return routed_params
+        if self.llm is None:
+            EXTRACTIONS.inc(source="fallback")
+            return self._fallback_extract_params(user_query)
         try:
-            extraction_chain = prompt | self.llm.bind(response_format={"type": "json_object"})
-            response = extraction_chain.invoke({"user_query": user_query})
-            
+            extraction_chain = self._build_extraction_chain(user_query)
+            response = self.governor.call(
+                lambda: extraction_chain.invoke({"user_query": user_query}), call="extraction"
+            )
             parsed_response = json.loads(response.content)
+            self.extraction_cache.set(cache_key, parsed_response)
+            EXTRACTIONS.inc(source="llm")
             return parsed_response
+        except CircuitOpenError:
+            # Provedor degradado: a heurística local responde sem esperar pelo LLM.
+            EXTRACTIONS.inc(source="fallback")
+            return self._fallback_extract_params(user_query)
+        except Exception as e:
+            print(f"Erro ao extrair intenção e parâmetros: {e}")
+            LLM_ERRORS.inc(call="extraction")
+            EXTRACTIONS.inc(source="fallback")
+            return self._fallback_extract_params(user_query)
+
+    async def _aextract_payroll_intent_and_params(self, user_query: str, route=None):
+        """
+        Versão assíncrona de `_extract_payroll_intent_and_params` (usa `ainvoke`). `route` é a
+        decisão do roteador já calculada em lote; se omitida, o roteador é consultado aqui.
+        """
+        cache_key = normalize_query(user_query)
+        cached = await self._run_in_db_executor(self.extraction_cache.get, cache_key)
+        if cached is not None:
+            EXTRACTIONS.inc(source="cache")
+            return cached
+        if route is None:
+            route = await self._run_in_db_executor(self.intent_router.route, user_query)
+        intent, _ = route
+        routed_params = self._params_from_route(user_query, intent)
+        if routed_params is not None:
+            EXTRACTIONS.inc(source="router")
+            return routed_params
+        if self.llm is None:
+            EXTRACTIONS.inc(source="fallback")
+            return self._fallback_extract_params(user_query)
+        try:
+            extraction_chain = self._build_extraction_chain(user_query)
+            response = await self.governor.acall(
+                lambda: extraction_chain.ainvoke({"user_query": user_query}), call="extraction"
+            )
+            parsed_response = json.loads(response.content)
+            await self._run_in_db_executor(self.extraction_cache.set, cache_key, parsed_response)
+            EXTRACTIONS.inc(source="llm")
+            return parsed_response
+        except CircuitOpenError:
+            # Provedor degradado: a heurística local responde sem esperar pelo LLM.
+            EXTRACTIONS.inc(source="fallback")
+            return self._fallback_extract_params(user_query)
         except Exception as e:
             print(f"Erro ao extrair intenção e parâmetros: {e}")
+            LLM_ERRORS.inc(call="extraction")
+            EXTRACTIONS.inc(source="fallback")
             return self._fallback_extract_params(user_query)
 
 
+    def _params_from_route(self, user_query: str, intent):
+        """
+        Parâmetros para uma decisão confiante do roteador local, ou `None` se o LLM ainda
+        for necessário (roteador sem confiança ou consulta sem nome e competência/período).
+        """
+        params = None
+        if intent == "general_chat":
+            params = {"intent": "general_chat"}
+        elif intent == "payroll_query":
+            heuristic = self._fallback_extract_params(user_query)
+            if heuristic.get("employee_id") and (heuristic.get("competency") or heuristic.get("period_start")):
+                params = dict(heuristic, intent="payroll_query")
+        self.intent_router.record(params is not None)
+        return params
+
     def _fallback_extract_params(self, user_query: str):
         """Heurística simples para extrair parâmetros se o LLM falhar no JSON."""
         params = {"intent": "general_chat"}
         
-        name_match = re.search(r"(Ana(?:\s+Souza)?|Bruno(?:\s+Lima)?)", user_query, re.IGNORECASE)
-        if name_match:
-            name = name_match.group(1).strip()
-            if "ana" in name.lower():
-                params["name"] = "Ana Souza"
-            elif "bruno" in name.lower():
-                params["name"] = "Bruno Lima"
+        name_index = self.name_index
+        employee = name_index.find_in_text(user_query)
+        if employee:
+            params["employee_id"], params["name"] = employee
             params["intent"] = "payroll_query"
+        else:
+            # Nome citado mas não resolvido: a resposta pede o nome completo em vez de cobrir todos.
+            mention = name_index.unresolved_mention(user_query)
+            if mention:
+                params["name"] = mention
 
-        month_year_match = re.search(r"(janeiro|jan|fevereiro|fev|março|mar|abril|abr|maio|mai|junho|jun)\D*(\d{4})", user_query, re.IGNORECASE)
+        month_year_match = re.search(r"(?<![a-zà-ú])(janeiro|jan|fevereiro|fev|março|mar|abril|abr|maio|mai|junho|jun)(?![a-zà-ú])\D*(\d{4})", user_query, re.IGNORECASE)
         if month_year_match:
             month_map = {"jan": "01", "fev": "02", "mar": "03", "abr": "04", "mai": "05", "jun": "06",
                          "janeiro": "01", "fevereiro": "02", "março": "03", "abril": "04", "maio": "05", "junho": "06"}
@@ -77,11 +276,39 @@ class PayrollChatbot:
                 params["competency"] = f"{month_year_match.group(2)}-{month_num}"
                 params["intent"] = "payroll_query"
         
-        if "1º trimestre" in user_query.lower():
-            params["period_start"] = "2025-01"
-            params["period_end"] = "2025-03"
+        period_match = re.search(
+            r"\b(1|2|3|4|primeiro|segundo|terceiro|quarto)\s*[º°o]?\s+(trimestre|semestre)(?:\s+de)?\s*(\d{4})?",
+            user_query, re.IGNORECASE,
+        )
+        year_match = re.search(r"\b(?:no\s+ano|ano|acumulado)(?:\s+de)?\s+(\d{4})", user_query, re.IGNORECASE)
+        if period_match:
+            ordinal = ORDINALS[period_match.group(1).lower()]
+            months = 3 if period_match.group(2).lower() == "trimestre" else 6
+            year = period_match.group(3) or str(datetime.now().year)
+            if ordinal * months <= 12:
+                first_month = (ordinal - 1) * months + 1
+                params["period_start"] = f"{year}-{first_month:02d}"
+                params["period_end"] = f"{year}-{first_month + months - 1:02d}"
+                params["intent"] = "payroll_query"
+        elif year_match:
+            params["period_start"] = f"{year_match.group(1)}-01"
+            params["period_end"] = f"{year_match.group(1)}-12"
             params["intent"] = "payroll_query"
 
+        params.update(self._fallback_aggregate_params(user_query))
+        # "INSS de todos em 2021", "total líquido por funcionário em 2025": ano solto vale como período.
+        bare_year = re.search(r"\b(?:em|de)\s+(\d{4})\b", user_query, re.IGNORECASE)
+        if bare_year and not (params.get("competency") or params.get("period_start")):
+            params["period_start"] = f"{bare_year.group(1)}-01"
+            params["period_end"] = f"{bare_year.group(1)}-12"
+        # "top 10 bônus do trimestre": trimestre/semestre sem número nem ano é o da última competência.
+        bare_period = re.search(r"\b(trimestre|semestre)\b(?!\s+(?:de\s+)?\d{4})", user_query, re.IGNORECASE)
+        if bare_period and not (params.get("competency") or params.get("period_start")):
+            period = self._current_period(3 if bare_period.group(1).lower() == "trimestre" else 6)
+            if period:
+                params["period_start"], params["period_end"] = period
+                params["intent"] = "payroll_query"
+
         if "data de pagamento" in user_query.lower() or "quando foi pago" in user_query.lower():
             params["data_type"] = "payment_date"
             params["intent"] = "payroll_query"
@@ -101,36 +328,335 @@ class PayrollChatbot:
 
         return params
 
+    @staticmethod
+    def _current_period(months: int):
+        """(início, fim) do trimestre (3) ou semestre (6) da última competência carregada, ou `None`."""
+        rows = query_payroll_data("SELECT MAX(competency) AS competency FROM payroll")
+        latest = rows[0]["competency"] if rows else None
+        if not latest:
+            return None
+        year, month = latest[:4], int(latest[5:7])
+        first_month = (month - 1) // months * months + 1
+        return f"{year}-{first_month:02d}", f"{year}-{first_month + months - 1:02d}"
 
-    def _handle_payroll_query(self, params: dict):
-        """Lida com perguntas de folha de pagamento usando o banco de dados."""
+    @staticmethod
+    def _fallback_aggregate_params(user_query: str):
+        """Agregação, agrupamento e ranking pedidos no texto ("top 10", "média", "por mês")."""
+        text = user_query.lower()
+        params = {}
+        top_match = re.search(r"\btop\s*(\d+)|\b(\d+)\s+(?:maiores|menores)\b", text)
+        if "menores" in text:
+            params["order"] = "asc"
+        elif top_match or "maiores" in text:
+            params["order"] = "desc"
+        if top_match:
+            params["limit"] = int(top_match.group(1) or top_match.group(2))
+        if "média" in text or "media" in text:
+            params["aggregation"] = "avg"
+        elif re.search(r"\b(?:total|soma)\b", text) and (" por " in text or "todos" in text):
+            params["aggregation"] = "sum"
+        if "por funcionário" in text or "por funcionario" in text:
+            params["group_by"] = "employee"
+        elif "por mês" in text or "por mes" in text:
+            params["group_by"] = "month"
+        if params.get("group_by") and "aggregation" not in params:
+            # "maior INSS por mês"; sem agrupamento, "maior bônus" segue pelo caminho de uma linha.
+            if re.search(r"\bmaior\b", text):
+                params["aggregation"] = "max"
+            elif re.search(r"\bmenor\b", text):
+                params["aggregation"] = "min"
+        return params
+
+    def _payroll_filters(self, params: dict):
+        """Filtros da consulta de folha, com o nome resolvido para `employee_id` pelo índice de nomes."""
         name = params.get("name")
-        competency = params.get("competency")
-        data_type = params.get("data_type")
-        period_start = params.get("period_start")
-        period_end = params.get("period_end")
+        employee_id = params.get("employee_id")
+        if name and not employee_id:
+            employee = self.name_index.resolve(name)
+            if employee:
+                employee_id, name = employee
+        return {
+            "name": name,
+            "employee_id": employee_id,
+            "competency": params.get("competency"),
+            "data_type": params.get("data_type"),
+            "period_start": params.get("period_start"),
+            "period_end": params.get("period_end"),
+            "after": params.get("after"),
+        }
+
+    @staticmethod
+    def _is_answerable(filters: dict):
+        return filters["data_type"] in PAYROLL_COLUMNS or bool(filters["name"] and filters["competency"])
+
+    @staticmethod
+    def _is_period_total(filters: dict):
+        """Total de uma coluna num intervalo de competências de um funcionário resolvido: sai dos agregados."""
+        return bool(
+            filters["employee_id"]
+            and filters["data_type"] in PERIOD_TOTAL_LABELS
+            and not filters["competency"]
+            and all(
+                isinstance(filters[key], str) and re.fullmatch(r"\d{4}-\d{2}", filters[key])
+                for key in ("period_start", "period_end")
+            )
+        )
+
+    def _format_period_total(self, filters: dict, totals):
+        name = filters["name"]
+        period_start = filters["period_start"]
+        period_end = filters["period_end"]
+        if not totals:
+            return f"Não encontrei dados de folha de pagamento para {name} no período de {period_start} a {period_end}."
+        data_type = filters["data_type"]
+        label = "líquido" if data_type == "net_pay" else f"de {PERIOD_TOTAL_LABELS[data_type]}"
+        source_str = ", ".join(f"{filters['employee_id']}, {competency}" for competency in totals["sources"])
+        return (
+            f"O total {label} de {name} de "
+            f"{parse_date_input(period_start).strftime('%b/%Y')} a {parse_date_input(period_end).strftime('%b/%Y')} foi de "
+            f"**{format_currency(totals[data_type])}**. "
+            f"Fonte: `{source_str}`."
+        )
+
+    @staticmethod
+    def _is_paginated(filters: dict):
+        """Respostas de uma coluna linha a linha (ramo genérico de `data_type`), que podem ter qualquer tamanho."""
+        data_type = filters["data_type"]
+        return data_type in PAYROLL_COLUMNS and not (
+            (data_type == "net_pay" and filters["period_start"] and filters["period_end"])
+            or data_type == "payment_date"
+            or (data_type == "bonus" and filters["name"])
+        )
 
+    @staticmethod
+    def _payroll_where(filters: dict, employee_ids=None):
+        """Cláusula `WHERE` (com parâmetros ligados) dos filtros da consulta de folha."""
         sql_where_clauses = []
-        if name:
-            sql_where_clauses.append(f"name = '{name}'")
-        
-        if competency:
-            sql_where_clauses.append(f"competency = '{competency}'")
-        
-        if period_start and period_end:
-            sql_where_clauses.append(f"competency BETWEEN '{period_start}' AND '{period_end}'")
+        sql_params = []
+        if employee_ids:
+            sql_where_clauses.append(f"employee_id IN ({', '.join('?' for _ in employee_ids)})")
+            sql_params.extend(employee_ids)
+        elif filters["employee_id"]:
+            sql_where_clauses.append("employee_id = ?")
+            sql_params.append(filters["employee_id"])
+        elif filters["name"]:
+            sql_where_clauses.append("name = ?")
+            sql_params.append(filters["name"])
+
+        if filters["competency"]:
+            sql_where_clauses.append("competency = ?")
+            sql_params.append(filters["competency"])
+
+        if filters["period_start"] and filters["period_end"]:
+            sql_where_clauses.append("competency BETWEEN ? AND ?")
+            sql_params.extend([filters["period_start"], filters["period_end"]])
+
+        if filters.get("after"):
+            # Paginação por chave: linhas depois da última já entregue, pelo índice da chave primária.
+            sql_where_clauses.append("(employee_id, competency) > (?, ?)")
+            sql_params.extend(filters["after"])
 
         where_clause = " AND ".join(sql_where_clauses)
         if where_clause:
             where_clause = f" WHERE {where_clause}"
+        return where_clause, sql_params
+
+    def _fetch_payroll_rows(self, filters: dict, employee_ids=None):
+        """
+        Linhas da `payroll` que atendem aos filtros, ordenadas por funcionário e competência.
+        Com `employee_ids`, busca vários funcionários de uma vez (`employee_id IN (...)`).
+        """
+        columnar = self.columnar
+        if columnar is not None:
+            return columnar.fetch_rows(employee_ids=employee_ids, **self._columnar_filters(filters))
+        where_clause, sql_params = self._payroll_where(filters, employee_ids)
+        return query_payroll_data(f"SELECT * FROM payroll {where_clause} ORDER BY employee_id, competency", sql_params)
+
+    def _answer_rows(self, filters: dict):
+        """
+        Só as linhas que a resposta a uma pergunta usa: a primeira (data de pagamento) e a do
+        maior bônus saem com `LIMIT 1`; o holerite de uma competência já é uma linha por
+        funcionário. Linhas inteiras para várias perguntas só no lote (`_fetch_payroll_rows`).
+        """
+        data_type = filters["data_type"]
+        if data_type == "payment_date":
+            return [row for rows in self._iter_payroll_rows(filters, 1) for row in rows]
+        if data_type == "bonus" and filters["name"]:
+            columnar = self.columnar
+            if columnar is not None:
+                # "Maior bônus": argmax vetorizado, sem montar todas as linhas do funcionário.
+                row = columnar.max_row("bonus", **self._columnar_filters(filters))
+                return [row] if row else []
+            where_clause, sql_params = self._payroll_where(filters)
+            return query_payroll_data(
+                f"SELECT * FROM payroll {where_clause} ORDER BY bonus DESC, employee_id, competency LIMIT 1", sql_params
+            )
+        return self._fetch_payroll_rows(filters)
+
+    def _iter_payroll_rows(self, filters: dict, limit: int):
+        """Até `limit` linhas dos filtros (a partir de `filters["after"]`), em lotes de `PAYROLL_FETCH_BATCH`."""
+        columnar = self.columnar
+        if columnar is not None:
+            return columnar.iter_rows(
+                PAYROLL_FETCH_BATCH, limit=limit, after=filters["after"], **self._columnar_filters(filters)
+            )
+        where_clause, sql_params = self._payroll_where(filters)
+        return iter_payroll_data(
+            f"SELECT * FROM payroll {where_clause} ORDER BY employee_id, competency LIMIT ?",
+            [*sql_params, limit], batch_size=PAYROLL_FETCH_BATCH,
+        )
+
+    @staticmethod
+    def _columnar_filters(filters: dict):
+        return {
+            key: filters[key] for key in ("employee_id", "name", "competency", "period_start", "period_end")
+        }
+
+    def _period_totals(self, employee_ids, period_start, period_end):
+        columnar = self.columnar
+        if columnar is not None:
+            return columnar.period_totals(employee_ids, period_start, period_end)
+        return query_period_totals(employee_ids, period_start, period_end)
+
+    @staticmethod
+    def _format_column_lines(data_type: str, rows: list):
+        """Uma linha de resposta por linha da folha com o valor de `data_type` e a fonte."""
+        # Valores numéricos da coluna são formatados em BRL de uma vez; os demais saem como estão.
+        formatted_values = [r[data_type] for r in rows]
+        numeric = [i for i, value in enumerate(formatted_values) if isinstance(value, (int, float, Decimal))]
+        currency = format_currency_column([Decimal(str(formatted_values[i])) for i in numeric])
+        for i, formatted_value in zip(numeric, currency):
+            formatted_values[i] = formatted_value
+        return [
+            f"{r['competency']}: **{formatted_value}**. "
+            f"Fonte: `{r['employee_id']}, {r['competency']}`"
+            for r, formatted_value in zip(rows, formatted_values)
+        ]
+
+    def _payroll_page(self, params: dict, filters: dict):
+        """
+        Uma página da resposta linha a linha: no máximo `PAYROLL_PAGE_SIZE` linhas, lidas em
+        lotes e formatadas lote a lote, então a memória não cresce com o total de linhas
+        encontradas. Devolve (resposta, {"page": página}), com o cursor da próxima página se houver.
+        Leitura e formatação se intercalam; o tempo de cada uma é somado e registrado uma vez
+        nos spans `sql` e `formatting`.
+        """
+        lines, count, last, has_more = [], 0, None, False
+        sql_seconds = formatting_seconds = 0.0
+        batches = iter(self._iter_payroll_rows(filters, PAYROLL_PAGE_SIZE + 1))
+        while True:
+            start = time.perf_counter()
+            rows = next(batches, None)
+            sql_seconds += time.perf_counter() - start
+            if rows is None:
+                break
+            if count + len(rows) > PAYROLL_PAGE_SIZE:
+                rows = rows[:PAYROLL_PAGE_SIZE - count]
+                has_more = True
+            if rows:
+                start = time.perf_counter()
+                lines.extend(self._format_column_lines(filters["data_type"], rows))
+                formatting_seconds += time.perf_counter() - start
+                count += len(rows)
+                last = (rows[-1]["employee_id"], rows[-1]["competency"])
+        STAGE_SECONDS.observe(sql_seconds, stage="sql")
+        STAGE_SECONDS.observe(formatting_seconds, stage="formatting")
+        next_cursor = encode_cursor(params, last) if has_more else None
+        page = {"size": PAYROLL_PAGE_SIZE, "rows": count, "next_cursor": next_cursor}
+        if not lines:
+            if filters["after"]:
+                return "Não há mais dados para esta consulta.", {"page": page}
+            return self._format_payroll_answer(filters, []), {"page": page}
+        response = "Os dados solicitados são:\n" + "\n".join(lines)
+        if has_more:
+            response += f"\nMostrando {count} linhas; há mais resultados na próxima página."
+        return response, {"page": page}
+
+    def _aggregate_answer(self, spec: dict, filters: dict):
+        """
+        Agregação ou ranking (`aggregate_spec`) numa única consulta, com as linhas de origem de
+        cada grupo. Devolve (resposta, {"aggregate": ...}).
+        """
+        # Um grupo a mais que o teto só para saber se a resposta foi cortada.
+        limit = min(spec["limit"] or AGGREGATE_MAX_GROUPS + 1, AGGREGATE_MAX_GROUPS + 1)
+        where_clause, where_params = self._payroll_where(filters)
+        sql, sql_params = plan_aggregate(spec, where_clause, where_params, limit, AGGREGATE_SOURCE_LIMIT)
+        with stage("sql"):
+            rows = query_payroll_data(sql, sql_params)
+        with stage("formatting"):
+            return self._format_aggregate(spec, filters, rows)
+
+    @staticmethod
+    def _aggregate_scope(filters: dict):
+        scope = f" de {filters['name']}" if filters["name"] else ""
+        if filters["competency"]:
+            scope += f" em {parse_date_input(filters['competency']).strftime('%b/%Y')}"
+        elif filters["period_start"] and filters["period_end"]:
+            scope += (
+                f" de {parse_date_input(filters['period_start']).strftime('%b/%Y')}"
+                f" a {parse_date_input(filters['period_end']).strftime('%b/%Y')}"
+            )
+        return scope
+
+    def _format_aggregate(self, spec: dict, filters: dict, rows: list):
+        function, group_by = spec["function"], spec["group_by"]
+        # Sem linhas, a agregação sem agrupamento ainda devolve um grupo vazio (row_count 0).
+        rows = [row for row in rows if row.get("row_count", 1)]
+        if not rows:
+            return "Não encontrei dados de folha de pagamento para essa consulta.", {"aggregate": {**spec, "groups": []}}
+        truncated = len(rows) > AGGREGATE_MAX_GROUPS
+        rows = rows[:AGGREGATE_MAX_GROUPS]
+        if function == "count":
+            values = [str(row["value"]) for row in rows]
+        else:
+            values = format_currency_column([Decimal(str(row["value"])) for row in rows])
+
+        lines, groups = [], []
+        for i, (row, value) in enumerate(zip(rows, values), start=1):
+            if function is None:
+                sources = [f"{row['employee_id']}, {row['competency']}"]
+                lines.append(f"{i}. {row['name']} em {row['competency']}: **{value}**. Fonte: `{sources[0]}`")
+            else:
+                sources = sorted(row["sources"].split("; ")) if row["sources"] else []
+                source_str = "; ".join(sources)
+                if row["row_count"] > len(sources) and function not in ("max", "min"):
+                    source_str += f" e mais {_rows_label(row['row_count'] - len(sources))}"
+                detail = f"**{value}** ({_rows_label(row['row_count'])}). Fonte: `{source_str}`"
+                if group_by == "employee":
+                    lines.append(f"{i}. {row['name']} ({row['employee_id']}): {detail}")
+                elif group_by == "month":
+                    lines.append(f"{row['competency']}: {detail}")
+                else:
+                    lines.append(detail)
+            key = row.get(GROUP_KEYS.get(group_by, ""))
+            groups.append({"key": key, "value": row["value"], "rows": row.get("row_count", 1), "sources": sources})
+
+        evidence = {"aggregate": {**spec, "groups": groups}}
+        label = f"{COLUMN_LABELS.get(spec['column'], spec['column'])}{self._aggregate_scope(filters)}"
+        if function is None:
+            header = f"{'Maiores' if spec['order'] == 'desc' else 'Menores'} valores de {label}:"
+        elif group_by is None:
+            return f"{AGGREGATE_LABELS[function]} de {label}: {lines[0]}.", evidence
+        else:
+            header = f"{AGGREGATE_LABELS[function]} de {label} {'por funcionário' if group_by == 'employee' else 'por mês'}:"
+        response = header + "\n" + "\n".join(lines)
+        if truncated:
+            response += f"\nMostrando os {AGGREGATE_MAX_GROUPS} primeiros grupos."
+        return response, evidence
+
+    def _format_payroll_answer(self, filters: dict, results: list):
+        """Monta a resposta de folha de pagamento a partir das linhas já consultadas."""
+        name = filters["name"]
+        competency = filters["competency"]
+        data_type = filters["data_type"]
+        period_start = filters["period_start"]
+        period_end = filters["period_end"]
 
         if data_type == "net_pay" and period_start and period_end:
-            sql_query = f"SELECT SUM(net_pay) as total_net_pay FROM payroll {where_clause}"
-            results = query_payroll_data(sql_query)
-            if results and results[0]["total_net_pay"] is not None:
-                total_net_pay = Decimal(str(results[0]["total_net_pay"]))
-                sources = query_payroll_data(f"SELECT employee_id, competency FROM payroll {where_clause}")
-                source_str = ", ".join([f"{s['employee_id']}, {s['competency']}" for s in sources])
+            net_pays = [Decimal(str(r["net_pay"])) for r in results if r["net_pay"] is not None]
+            if net_pays:
+                total_net_pay = sum(net_pays, Decimal("0"))
+                source_str = ", ".join([f"{s['employee_id']}, {s['competency']}" for s in results])
                 return (
                     f"O total líquido de {name} de "
                     f"{parse_date_input(period_start).strftime('%b/%Y')} a {parse_date_input(period_end).strftime('%b/%Y')} foi de "
@@ -141,9 +667,6 @@ class PayrollChatbot:
                 return f"Não encontrei dados de folha de pagamento para {name} no período de {period_start} a {period_end}."
 
         elif data_type == "payment_date":
-            sql_query = f"SELECT payment_date, net_pay, employee_id, competency FROM payroll {where_clause}"
-            results = query_payroll_data(sql_query)
-
             if results:
                 result = results[0]
                 formatted_date = format_date_br(result["payment_date"])
@@ -158,15 +681,8 @@ class PayrollChatbot:
                 return f"Não encontrei dados de pagamento para {name} em {competency}."
 
         elif data_type == "bonus" and name:
-            sql_query = f"""
-            SELECT bonus, employee_id, competency 
-            FROM payroll {where_clause}
-            ORDER BY bonus DESC LIMIT 1
-            """
-            results = query_payroll_data(sql_query)
             if results:
-                result = results[0]
-                bonus = Decimal(str(result["bonus"]))
+                result = max(results, key=lambda r: r["bonus"] or 0)
                 return (
                     f"O maior bônus recebido por {name} foi de **{format_currency(result['bonus'])}** "
                     f"em {parse_date_input(result['competency']).strftime('%b/%Y')}. "
@@ -175,34 +691,13 @@ class PayrollChatbot:
             else:
                 return f"Não encontrei dados de bônus para {name}." 
             
-        elif data_type: 
-            select_column = data_type          
-            sql_query = f"SELECT {select_column}, employee_id, competency FROM payroll {where_clause}"
-            results = query_payroll_data(sql_query)
-            
+        elif data_type in PAYROLL_COLUMNS:
             if results:
-                response_parts = []
-                for r in results:
-                    value = r[select_column]
-                    if isinstance(value, (int, float, Decimal)):
-                        value = Decimal(str(value))
-                        formatted_value = format_currency(value)
-                    else:
-                        formatted_value = value
-                    if data_type == "payment_date":
-                        formatted_value = format_date_br(value)
-                        
-                    response_parts.append(
-                        f"{r['competency']}: **{formatted_value}**. "
-                        f"Fonte: `{r['employee_id']}, {r['competency']}`"
-                    )
-                return "Os dados solicitados são:\n" + "\n".join(response_parts)
+                return "Os dados solicitados são:\n" + "\n".join(self._format_column_lines(data_type, results))
             else:
-                return f"Não encontrei dados de folha de pagamento para {name} em {competency} para o item solicitado."
+                return f"Não encontrei dados de folha de pagamento{self._aggregate_scope(filters)} para o item solicitado."
 
         elif name and competency:
-            sql_query = f"SELECT * FROM payroll {where_clause}"
-            results = query_payroll_data(sql_query)
             if results:
                 result = results[0]
                 response = (
@@ -219,31 +714,313 @@ class PayrollChatbot:
             else:
                 return f"Não encontrei dados para {name} em {parse_date_input(competency).strftime('%b/%Y')}."
             
-        return "Não consegui entender sua consulta de folha de pagamento ou faltam informações."
+        return UNANSWERABLE_PAYROLL_QUERY
+
+    def _handle_payroll_query(self, params: dict):
+        """Lida com perguntas de folha de pagamento usando o banco de dados."""
+        return self._payroll_response(params)[0]
+
+    def _payroll_response(self, params: dict):
+        """
+        Resposta de folha e a evidência além dos parâmetros (`page` nas respostas paginadas,
+        `aggregate` nas agregadas; `None` nas demais). Agregações e rankings saem de uma única
+        consulta montada por `app.query_planner`; respostas linha a linha saem por
+        `_payroll_page`, e `params["after"]` (do cursor) pede a página seguinte.
+        """
+        filters = self._payroll_filters(params)
+        if filters["name"] and not filters["employee_id"]:
+            return UNRESOLVED_NAME.format(name=filters["name"]), None
+        spec = aggregate_spec(params)
+        if spec is not None:
+            return self._aggregate_answer(spec, filters)
+        if not self._is_answerable(filters):
+            return UNANSWERABLE_PAYROLL_QUERY, None
+        if self._is_period_total(filters):
+            with stage("sql"):
+                totals = self._period_totals([filters["employee_id"]], filters["period_start"], filters["period_end"])
+            with stage("formatting"):
+                return self._format_period_total(filters, totals.get(filters["employee_id"])), None
+        if filters["data_type"] == "net_pay" and filters["period_start"] and filters["period_end"]:
+            # Líquido da empresa no período: um SUM no SQL, com poucas linhas de origem citadas.
+            return self._aggregate_answer(aggregate_spec({**params, "aggregation": "sum"}), filters)
+        if self._is_paginated(filters):
+            return self._payroll_page(params, filters)
+        with stage("sql"):
+            rows = self._answer_rows(filters)
+        with stage("formatting"):
+            return self._format_payroll_answer(filters, rows), None
+
+    def _payroll_key(self, params: dict):
+        return response_key(dataset_version(PAYROLL_DB_PATH), params)
+
+    def _payroll_answer(self, params: dict):
+        """
+        `_payroll_response` (resposta, evidência extra) com o cache de respostas, para os parâmetros e a
+        versão atual dos dados.
+        """
+        key = self._payroll_key(params)
+        response = self.response_cache.get(key)
+        if response is None:
+            response = self._payroll_response(params)
+            self.response_cache.set(key, response)
+        return response
+
+    async def _apayroll_answer(self, params: dict):
+        """
+        Versão assíncrona de `_payroll_answer`: enquanto uma resposta é calculada, as perguntas
+        com a mesma chave aguardam o mesmo cálculo em vez de repetir SQL e formatação.
+        """
+        key = await self._run_in_db_executor(self._payroll_key, params)
+        response = self.response_cache.get(key)
+        if response is not None:
+            return response
+
+        async def compute():
+            response = await self._run_in_db_executor(self._payroll_response, params)
+            self.response_cache.set(key, response)
+            return response
+
+        return await self.payroll_flight.run(key, compute)
+
+    @staticmethod
+    def _payroll_evidence(params: dict, extra):
+        return {"source": params, **(extra or {})}
+
+    @staticmethod
+    def _messages_key(messages):
+        return tuple((message.type, message.content) for message in messages)
+
+    def _handle_payroll_batch(self, params_list: list):
+        """
+        Responde várias consultas de folha na ordem recebida, como pares (resposta, evidência extra).
+        Consultas com funcionário resolvido e mesma competência/período viram um único
+        `SELECT ... WHERE employee_id IN (...)`; as demais seguem por `_payroll_response`,
+        inclusive as respostas linha a linha sem competência, que são paginadas como no `chat`.
+        """
+        answers = [None] * len(params_list)
+        filters_list = [self._payroll_filters(params) for params in params_list]
+        groups = defaultdict(list)
+        for i, filters in enumerate(filters_list):
+            if not self._is_answerable(filters):
+                answers[i] = UNANSWERABLE_PAYROLL_QUERY, None
+            elif (
+                filters["employee_id"] and aggregate_spec(params_list[i]) is None
+                # Com competência, a resposta linha a linha tem uma linha por funcionário.
+                and (filters["competency"] or not self._is_paginated(filters))
+            ):
+                period_total = self._is_period_total(filters)
+                groups[(period_total, filters["competency"], filters["period_start"], filters["period_end"])].append(i)
+            else:
+                answers[i] = self._payroll_response(params_list[i])
+
+        for (period_total, _, period_start, period_end), indexes in groups.items():
+            employee_ids = sorted({filters_list[i]["employee_id"] for i in indexes})
+            if period_total:
+                totals = {}
+                with stage("sql"):
+                    for start in range(0, len(employee_ids), BATCH_SQL_CHUNK):
+                        totals.update(self._period_totals(employee_ids[start:start + BATCH_SQL_CHUNK], period_start, period_end))
+                with stage("formatting"):
+                    for i in indexes:
+                        answers[i] = self._format_period_total(filters_list[i], totals.get(filters_list[i]["employee_id"])), None
+                continue
+            rows_by_employee = defaultdict(list)
+            with stage("sql"):
+                for start in range(0, len(employee_ids), BATCH_SQL_CHUNK):
+                    chunk = employee_ids[start:start + BATCH_SQL_CHUNK]
+                    for row in self._fetch_payroll_rows(filters_list[indexes[0]], employee_ids=chunk):
+                        rows_by_employee[row["employee_id"]].append(row)
+            with stage("formatting"):
+                for i in indexes:
+                    answers[i] = self._format_payroll_answer(filters_list[i], rows_by_employee[filters_list[i]["employee_id"]]), None
+        return answers
     
-    def chat(self, user_message: str):
-        """Processa a mensagem do usuário e gera uma resposta."""
-        print(f"[chat] Mensagem recebida: {user_message}")
-        print("[chat] Extraindo intenção e parâmetros...")
-        payroll_params = self._extract_payroll_intent_and_params(user_message)
-        print(f"[chat] Parâmetros extraídos: {payroll_params}")
+    def _general_chat_messages(self, user_message: str, session_id: str = None):
+        """
+        Monta o prompt de chat geral: system prompt, janela de histórico da sessão e a nova
+        mensagem. Sem `session_id` não há histórico: pedidos anônimos não compartilham contexto.
+        """
+        from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+
+        turns = self.sessions.get(session_id) if session_id is not None else []
+        history = [
+            HumanMessage(content=content) if role == "human" else AIMessage(content=content)
+            for role, content in turns
+        ]
+        return [SystemMessage(content=self.system_prompt)] + history + [HumanMessage(content=user_message)]
+
+    def _remember(self, session_id: str, user_message: str, response: str):
+        if session_id is not None:
+            self.sessions.append(session_id, user_message, response)
+
+    def chat(self, user_message: str, session_id: str = None, cursor: str = None):
+        """
+        Processa a mensagem do usuário e gera uma resposta. Com `cursor` (o `next_cursor` da
+        página na evidência anterior), devolve a próxima página daquela consulta sem nova extração.
+        """
+        self._log(f"[chat] Mensagem recebida: {user_message}")
+        if cursor:
+            payroll_params = decode_cursor(cursor)
+        else:
+            self._log("[chat] Extraindo intenção e parâmetros...")
+            with stage("extraction"):
+                payroll_params = self._extract_payroll_intent_and_params(user_message)
+            self._log(f"[chat] Parâmetros extraídos: {payroll_params}")
+            self._count_intent(payroll_params)
 
         if payroll_params.get("intent") == "payroll_query":
-            print("[chat] Processando consulta de folha de pagamento...")
-            response = self._handle_payroll_query(payroll_params)
-            print(f"[chat] Resposta folha de pagamento: {response}")
-            self.history.append(HumanMessage(content=user_message))
-            self.history.append(AIMessage(content=response))
-            return response, {"source": payroll_params}
+            self._log("[chat] Processando consulta de folha de pagamento...")
+            response, extra = self._payroll_answer(payroll_params)
+            self._log(f"[chat] Resposta folha de pagamento: {response}")
+            self._remember(session_id, user_message, response)
+            return response, self._payroll_evidence(payroll_params, extra)
+        elif self.llm is None:
+            return OFFLINE_GENERAL_CHAT, {}
         else:
-            print("[chat] Processando chat geral com LLM...")
-            messages = [SystemMessage(content=self.system_prompt)] + self.history + [HumanMessage(content=user_message)]
+            self._log("[chat] Processando chat geral com LLM...")
+            messages = self._general_chat_messages(user_message, session_id)
+            try:
+                with stage("llm_chat"):
+                    ai_response = self.governor.call(lambda: self.llm.invoke(messages), call="general_chat")
+                self._log(f"[chat] Resposta LLM: {ai_response.content}")
+                self._remember(session_id, user_message, ai_response.content)
+                return ai_response.content, {}
+            except Exception as e:
+                print(f"Erro ao chamar LLM para chat geral: {e}")
+                LLM_ERRORS.inc(call="general_chat")
+                return GENERAL_CHAT_ERROR, {}
+
+    async def _run_in_db_executor(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_executor, func, *args)
+
+    async def achat(self, user_message: str, session_id: str = None, cursor: str = None):
+        """
+        Versão assíncrona de `chat`. As chamadas ao LLM usam `ainvoke` e as consultas
+        SQLite rodam no executor dedicado, então o event loop nunca fica bloqueado.
+        """
+        async with self._chat_semaphore:
+            self._log(f"[achat] Mensagem recebida: {user_message}")
+            if cursor:
+                payroll_params = decode_cursor(cursor)
+            else:
+                with stage("extraction"):
+                    payroll_params = await self._aextract_payroll_intent_and_params(user_message)
+                self._log(f"[achat] Parâmetros extraídos: {payroll_params}")
+                self._count_intent(payroll_params)
+
+            if payroll_params.get("intent") == "payroll_query":
+                response, extra = await self._apayroll_answer(payroll_params)
+                await self._run_in_db_executor(self._remember, session_id, user_message, response)
+                return response, self._payroll_evidence(payroll_params, extra)
+            if self.llm is None:
+                return OFFLINE_GENERAL_CHAT, {}
+
+            # O store de sessões pode ser SQLite: leitura e gravação também saem do event loop.
+            messages = await self._run_in_db_executor(self._general_chat_messages, user_message, session_id)
             try:
-                ai_response = self.llm.invoke(messages)
-                print(f"[chat] Resposta LLM: {ai_response.content}")
-                self.history.append(HumanMessage(content=user_message))
-                self.history.append(AIMessage(content=ai_response.content))
+                with stage("llm_chat"):
+                    ai_response = await self.llm_flight.run(
+                        self._messages_key(messages),
+                        lambda: self.governor.acall(lambda: self.llm.ainvoke(messages), call="general_chat"),
+                    )
+                await self._run_in_db_executor(self._remember, session_id, user_message, ai_response.content)
                 return ai_response.content, {}
             except Exception as e:
                 print(f"Erro ao chamar LLM para chat geral: {e}")
-                return "Desculpe, não consegui processar sua solicitação no momento. Tente novamente mais tarde.", {}
\ No newline at end of file
+                LLM_ERRORS.inc(call="general_chat")
+                return GENERAL_CHAT_ERROR, {}
+
+    async def achat_batch(self, user_messages: list):
+        """
+        Responde várias perguntas de uma vez (`/chat/batch`), sem histórico de sessão, e
+        devolve [(resposta, evidência)] na ordem de entrada. O roteador codifica todas as
+        perguntas em lote, as extrações pelo LLM rodam em paralelo (limitadas pelo semáforo)
+        e as consultas de folha são agrupadas por `_handle_payroll_batch`.
+        """
+        routes = await self._run_in_db_executor(self.intent_router.route_batch, user_messages)
+
+        async def extract(user_message, route):
+            async with self._chat_semaphore:
+                with stage("extraction"):
+                    params = await self._aextract_payroll_intent_and_params(user_message, route)
+                self._count_intent(params)
+                return params
+
+        params_list = await asyncio.gather(*(extract(m, r) for m, r in zip(user_messages, routes)))
+        results = [None] * len(user_messages)
+
+        payroll_indexes = [i for i, params in enumerate(params_list) if params.get("intent") == "payroll_query"]
+        answers = await self._run_in_db_executor(self._handle_payroll_batch, [params_list[i] for i in payroll_indexes])
+        for i, (answer, extra) in zip(payroll_indexes, answers):
+            results[i] = (answer, self._payroll_evidence(params_list[i], extra))
+
+        async def general_chat(user_message):
+            if self.llm is None:
+                return OFFLINE_GENERAL_CHAT, {}
+            from langchain_core.messages import SystemMessage, HumanMessage
+
+            async with self._chat_semaphore:
+                messages = [SystemMessage(content=self.system_prompt), HumanMessage(content=user_message)]
+                try:
+                    with stage("llm_chat"):
+                        ai_response = await self.llm_flight.run(
+                            self._messages_key(messages),
+                            lambda: self.governor.acall(lambda: self.llm.ainvoke(messages), call="general_chat"),
+                        )
+                    return ai_response.content, {}
+                except Exception as e:
+                    print(f"Erro ao chamar LLM para chat geral: {e}")
+                    LLM_ERRORS.inc(call="general_chat")
+                    return GENERAL_CHAT_ERROR, {}
+
+        general_indexes = [i for i in range(len(user_messages)) if results[i] is None]
+        replies = await asyncio.gather(*(general_chat(user_messages[i]) for i in general_indexes))
+        for i, reply in zip(general_indexes, replies):
+            results[i] = reply
+        return results
+
+    async def astream_chat(self, user_message: str, session_id: str = None, cursor: str = None):
+        """
+        Versão em streaming de `achat`, usada pelo `/chat/stream`. Gera dicts de evento:
+        `token` a cada pedaço do `llm.astream` no chat geral e, no fim, `done` com a resposta
+        completa. Respostas de folha de pagamento são determinísticas e saem em um único
+        evento `message` (uma página, se paginadas; `cursor` pede a seguinte, como no `chat`).
+        Falhas do LLM viram um evento `error`.
+        """
+        async with self._chat_semaphore:
+            self._log(f"[astream_chat] Mensagem recebida: {user_message}")
+            if cursor:
+                payroll_params = decode_cursor(cursor)
+            else:
+                with stage("extraction"):
+                    payroll_params = await self._aextract_payroll_intent_and_params(user_message)
+                self._log(f"[astream_chat] Parâmetros extraídos: {payroll_params}")
+                self._count_intent(payroll_params)
+
+            if payroll_params.get("intent") == "payroll_query":
+                response, extra = await self._apayroll_answer(payroll_params)
+                await self._run_in_db_executor(self._remember, session_id, user_message, response)
+                yield {"event": "message", "content": response, "evidence": self._payroll_evidence(payroll_params, extra)}
+                return
+            if self.llm is None:
+                yield {"event": "message", "content": OFFLINE_GENERAL_CHAT, "evidence": {}}
+                return
+
+            messages = await self._run_in_db_executor(self._general_chat_messages, user_message, session_id)
+            parts = []
+            try:
+                # O span inclui o tempo em que o cliente consome cada pedaço.
+                with stage("llm_chat"):
+                    async for chunk in self.governor.astream(lambda: self.llm.astream(messages)):
+                        if chunk.content:
+                            parts.append(chunk.content)
+                            yield {"event": "token", "content": chunk.content}
+            except Exception as e:
+                print(f"Erro ao chamar LLM para chat geral: {e}")
+                LLM_ERRORS.inc(call="general_chat")
+                yield {"event": "error", "content": GENERAL_CHAT_ERROR}
+                return
+            response = "".join(parts)
+            await self._run_in_db_executor(self._remember, session_id, user_message, response)
+            yield {"event": "done", "content": response, "evidence": {}}
@@ -0,0 +1,282 @@
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+import numpy as np
+from app.config import PAYROLL_DB_PATH, COLUMNAR_CACHE_DIR, COLUMNAR_CACHE_KEEP_VERSIONS
+from app.data_to_db import PAYROLL_SCHEMA, ROLLUP_COLUMNS, dataset_version
+
+# Linhas lidas do SQLite por `fetchmany` ao montar as colunas.
+LOAD_BATCH = 50000
+
+
+class ColumnarPayroll:
+    """
+    A tabela `payroll` inteira em memória, uma matriz NumPy por coluna, ordenada por
+    (employee_id, competency) como o `ORDER BY` das consultas SQL.
+
+    `offsets[i]:offsets[i + 1]` são as linhas de `employee_keys[i]`; dentro de cada faixa as
+    competências estão ordenadas, então consultas por funcionário e competência/intervalo
+    são `searchsorted`. Valores nulos ficam como 0/"" na coluna e marcados em `nulls`.
+    As linhas devolvidas são dicts iguais aos de `query_payroll_data("SELECT * ...")`.
+    """
+
+    def __init__(self, columns: dict, nulls: dict, version=None):
+        self.columns = columns
+        self.nulls = nulls
+        self.version = version
+        self.names = [name for name, _ in PAYROLL_SCHEMA]
+        employee_ids = columns["employee_id"]
+        if len(employee_ids):
+            starts = np.flatnonzero(np.r_[True, employee_ids[1:] != employee_ids[:-1]])
+        else:
+            starts = np.array([], dtype=np.int64)
+        self.employee_keys = employee_ids[starts]
+        self.offsets = np.r_[starts, len(employee_ids)].astype(np.int64)
+        self._positions = None
+
+    def __len__(self):
+        return len(self.columns["employee_id"])
+
+    @classmethod
+    def from_db(cls, db_path=PAYROLL_DB_PATH):
+        """Carrega a tabela `payroll` do SQLite em colunas."""
+        names = [name for name, _ in PAYROLL_SCHEMA]
+        values = {name: [] for name in names}
+        connection = sqlite3.connect(db_path)
+        try:
+            cursor = connection.execute(f"SELECT {', '.join(names)} FROM payroll ORDER BY employee_id, competency")
+            while True:
+                rows = cursor.fetchmany(LOAD_BATCH)
+                if not rows:
+                    break
+                for name, column in zip(names, zip(*rows)):
+                    values[name].extend(column)
+        finally:
+            connection.close()
+
+        columns, nulls = {}, {}
+        for name, sql_type in PAYROLL_SCHEMA:
+            column = values.pop(name)
+            null = np.fromiter((value is None for value in column), dtype=bool, count=len(column))
+            if sql_type.startswith("TEXT"):
+                columns[name] = np.array(["" if value is None else value for value in column], dtype=str)
+            elif sql_type == "INTEGER" and all(isinstance(value, int) for value in column if value is not None):
+                columns[name] = np.array([0 if value is None else value for value in column], dtype=np.int64)
+            else:
+                columns[name] = np.array([0.0 if value is None else value for value in column], dtype=np.float64)
+            if null.any():
+                nulls[name] = null
+        return cls(columns, nulls, version=dataset_version(db_path))
+
+    def save(self, cache_dir: str, keep_versions=COLUMNAR_CACHE_KEEP_VERSIONS):
+        """
+        Grava as colunas em `.npy` num subdiretório de `cache_dir` por versão dos dados. A
+        gravação vai para um diretório temporário renomeado no fim: arquivos que outro
+        processo já mapeou nunca são sobrescritos. Depois, só as `keep_versions` versões mais
+        recentes (incluindo esta) ficam em disco.
+        """
+        directory = _version_dir(cache_dir, self.version)
+        if os.path.isdir(directory):
+            return
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=cache_dir, prefix=".tmp-")
+        try:
+            for name, column in self.columns.items():
+                np.save(os.path.join(tmp, f"{name}.npy"), column)
+            for name, null in self.nulls.items():
+                np.save(os.path.join(tmp, f"{name}.null.npy"), null)
+            with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump({"version": self.version, "columns": list(self.columns), "nulls": list(self.nulls)}, f)
+            os.rename(tmp, directory)
+        except OSError:
+            # Outro processo gravou a mesma versão primeiro.
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        _prune_versions(cache_dir, directory, keep_versions)
+
+    @classmethod
+    def load(cls, cache_dir: str, version=None):
+        """
+        Abre as colunas gravadas por `save` para `version` como arquivos mapeados em memória
+        (`mmap_mode="r"`), ou `None` se ainda não existirem.
+        """
+        directory = _version_dir(cache_dir, version)
+        try:
+            with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        columns = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in manifest["columns"]}
+        nulls = {name: np.load(os.path.join(directory, f"{name}.null.npy"), mmap_mode="r") for name in manifest["nulls"]}
+        return cls(columns, nulls, version=version)
+
+    def _employee_range(self, employee_id):
+        # dict employee_id -> posição, montado no primeiro uso: uma consulta pontual não paga
+        # o custo fixo de uma chamada NumPy, que supera o da própria busca.
+        if self._positions is None:
+            self._positions = {key: i for i, key in enumerate(self.employee_keys.tolist())}
+        position = self._positions.get(employee_id)
+        if position is None:
+            return 0, 0
+        return int(self.offsets[position]), int(self.offsets[position + 1])
+
+    def _competency_range(self, start, end, competency=None, period_start=None, period_end=None):
+        """Sub-faixa [start, end) de um funcionário com a competência ou o intervalo pedidos."""
+        # Cada funcionário tem no máximo algumas centenas de competências: bisect na lista.
+        competencies = self.columns["competency"][start:end].tolist()
+        low, high = 0, end - start
+        if competency:
+            low = max(low, bisect_left(competencies, competency))
+            high = min(high, bisect_right(competencies, competency))
+        if period_start and period_end:
+            low = max(low, bisect_left(competencies, period_start))
+            high = min(high, bisect_right(competencies, period_end))
+        return start + low, start + max(low, high)
+
+    def select(self, employee_id=None, employee_ids=None, name=None, competency=None, period_start=None, period_end=None):
+        """
+        Índices das linhas que atendem aos filtros, na ordem (employee_id, competency).
+        Mesmos filtros de `PayrollChatbot._fetch_payroll_rows`: `employee_ids`, senão
+        `employee_id`, senão `name`; mais competência e/ou intervalo. Um único funcionário
+        vira um `slice` (faixa contígua, sem cópia).
+        """
+        if employee_ids or employee_id:
+            ranges = [self._employee_range(eid) for eid in sorted(set(employee_ids or [employee_id]))]
+            ranges = [self._competency_range(start, end, competency, period_start, period_end) for start, end in ranges]
+            if len(ranges) == 1:
+                return slice(*ranges[0])
+            return np.concatenate([np.arange(start, end) for start, end in ranges])
+
+        mask = np.ones(len(self), dtype=bool)
+        if name:
+            mask &= self.columns["name"] == name
+        competencies = self.columns["competency"]
+        if competency:
+            mask &= competencies == competency
+        if period_start and period_end:
+            mask &= (competencies >= period_start) & (competencies <= period_end)
+        return np.flatnonzero(mask)
+
+    def rows(self, indexes):
+        """Linhas como dicts, com `None` nos nulos (mesmos tipos que o `sqlite3` devolve)."""
+        if _count(indexes) == 0:
+            return []
+        values = []
+        for name in self.names:
+            column = self.columns[name][indexes].tolist()
+            null = self.nulls.get(name)
+            if null is not None:
+                for i in np.flatnonzero(null[indexes]):
+                    column[i] = None
+            values.append(column)
+        return [dict(zip(self.names, row)) for row in zip(*values)]
+
+    def fetch_rows(self, **filters):
+        return self.rows(self.select(**filters))
+
+    def iter_rows(self, batch_size: int, limit=None, after=None, **filters):
+        """
+        Linhas de `select(**filters)` em lotes de `batch_size`, só as posteriores à chave
+        `after` = (employee_id, competency) e no máximo `limit`: uma página de resposta longa
+        sem montar todas as linhas.
+        """
+        indexes = self.select(**filters)
+        if isinstance(indexes, slice):
+            indexes = np.arange(indexes.start, indexes.stop)
+        if after is not None and len(indexes):
+            employee_ids = self.columns["employee_id"][indexes]
+            competencies = self.columns["competency"][indexes]
+            indexes = indexes[(employee_ids > after[0]) | ((employee_ids == after[0]) & (competencies > after[1]))]
+        if limit is not None:
+            indexes = indexes[:limit]
+        for start in range(0, len(indexes), batch_size):
+            yield self.rows(indexes[start:start + batch_size])
+
+    def max_row(self, column: str, **filters):
+        """
+        Linha com o maior valor de `column` entre as filtradas (nulos contam como 0; no
+        empate, a primeira na ordem), ou `None`. É o "maior bônus" sem montar todas as linhas.
+        """
+        indexes = self.select(**filters)
+        if _count(indexes) == 0:
+            return None
+        best = int(np.argmax(self.columns[column][indexes]))
+        position = indexes.start + best if isinstance(indexes, slice) else int(indexes[best])
+        return self.rows(slice(position, position + 1))[0]
+
+    def period_totals(self, employee_ids, period_start, period_end):
+        """
+        Mesmo resultado de `query_period_totals`: {employee_id: {coluna: Decimal,
+        "sources": [competência, ...]}}, somando as faixas de cada funcionário de uma vez
+        (`np.add.reduceat`).
+        """
+        segments = []
+        for employee_id in sorted(set(employee_ids)):
+            start, end = self._competency_range(*self._employee_range(employee_id), None, period_start, period_end)
+            if end > start:
+                segments.append((employee_id, start, end))
+        if not segments:
+            return {}
+        indexes = np.concatenate([np.arange(start, end) for _, start, end in segments])
+        boundaries = np.cumsum([0] + [end - start for _, start, end in segments[:-1]])
+        sums = {column: np.add.reduceat(self.columns[column][indexes], boundaries).tolist() for column in ROLLUP_COLUMNS}
+        competencies = self.columns["competency"]
+        return {
+            employee_id: {
+                **{column: Decimal(str(sums[column][i])) for column in ROLLUP_COLUMNS},
+                "sources": competencies[start:end].tolist(),
+            }
+            for i, (employee_id, start, end) in enumerate(segments)
+        }
+
+
+def _count(indexes):
+    return indexes.stop - indexes.start if isinstance(indexes, slice) else len(indexes)
+
+
+def _version_dir(cache_dir: str, version):
+    return os.path.join(cache_dir, hashlib.sha256(str(version).encode()).hexdigest()[:16])
+
+
+def _prune_versions(cache_dir: str, current: str, keep: int):
+    """Apaga as versões gravadas além das `keep` mais recentes; `current` nunca é apagada."""
+    directories = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_dir() and not entry.name.startswith(".tmp-") and entry.path != current:
+            try:
+                directories.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                continue
+    directories.sort(reverse=True)
+    for _, path in directories[max(keep - 1, 0):]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def load_columnar_payroll(db_path=PAYROLL_DB_PATH, cache_dir=COLUMNAR_CACHE_DIR):
+    """
+    Motor colunar do banco `db_path`, compartilhado no processo. Com `cache_dir`, reabre as
+    colunas já gravadas em `.npy` (mapeadas em memória) quando a versão dos dados é a mesma
+    e, se não, carrega do SQLite e regrava o cache.
+    """
+    version = dataset_version(db_path)
+    with _engines_lock:
+        engine = _engines.get(db_path)
+        if engine is not None and engine.version == version:
+            return engine
+        engine = ColumnarPayroll.load(cache_dir, version) if cache_dir else None
+        if engine is None:
+            engine = ColumnarPayroll.from_db(db_path)
+            if cache_dir:
+                engine.save(cache_dir)
+        _engines[db_path] = engine
+        return engine
@@ -0,0 +1,92 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# Origem (CSV) e banco SQLite da folha de pagamento.
+PAYROLL_CSV_PATH = os.getenv("PAYROLL_CSV_PATH", "data/payroll.csv")
+PAYROLL_DB_PATH = os.getenv("PAYROLL_DB_PATH", "data/payroll.db")
+
+# Quantas conversas podem ser processadas ao mesmo tempo pelo caminho assíncrono.
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "32"))
+
+# Threads reservadas para as consultas SQLite executadas fora do event loop.
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "4"))
+
+# Máximo de perguntas aceitas por chamada ao /chat/batch.
+BATCH_MAX_MESSAGES = int(os.getenv("BATCH_MAX_MESSAGES", "500"))
+
+# Pool de conexões somente leitura do SQLite: tamanho do mmap (bytes) e statements em cache por conexão.
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(64 * 1024 * 1024)))
+DB_CACHED_STATEMENTS = int(os.getenv("DB_CACHED_STATEMENTS", "128"))
+
+# Histórico de conversa por sessão: backend (memory | sqlite), janela de turnos e expiração.
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "data/sessions.db")
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "10"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+
+# Linhas lidas por bloco na ingestão incremental do CSV.
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "50000"))
+
+# Cache da extração de intenção/parâmetros pelo LLM: backend (memory | sqlite), tamanho e validade.
+EXTRACTION_CACHE_BACKEND = os.getenv("EXTRACTION_CACHE_BACKEND", "memory")
+EXTRACTION_CACHE_DB_PATH = os.getenv("EXTRACTION_CACHE_DB_PATH", "data/extraction_cache.db")
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "5000"))
+EXTRACTION_CACHE_TTL_SECONDS = float(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", "86400"))
+
+# Roteador local de intenção (embeddings): abaixo do limiar de confiança a decisão volta para o LLM.
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+INTENT_ROUTER_MODEL = os.getenv("INTENT_ROUTER_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+INTENT_ROUTER_THRESHOLD = float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.75"))
+INTENT_ROUTER_MARGIN = float(os.getenv("INTENT_ROUTER_MARGIN", "0.1"))
+INTENT_ROUTER_BANK_PATH = os.getenv("INTENT_ROUTER_BANK_PATH", "data/intent_bank.npz")
+
+# Log por mensagem no stdout (pergunta, parâmetros e resposta completos); desligue em produção.
+CHAT_LOG_MESSAGES = os.getenv("CHAT_LOG_MESSAGES", "true").lower() in ("1", "true", "yes")
+
+# Modo offline/determinístico: não carrega o LLM (LangChain/Gemini); só responde folha de pagamento.
+OFFLINE_MODE = os.getenv("OFFLINE_MODE", "false").lower() in ("1", "true", "yes")
+# Constrói o chatbot (ingestão, índice de nomes, cliente do LLM) em segundo plano ao subir a API.
+CHAT_WARMUP_ON_STARTUP = os.getenv("CHAT_WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# Motor das consultas de folha: sqlite, ou columnar (tabela em memória em matrizes NumPy,
+# com cache em `.npy` mapeado em memória em COLUMNAR_CACHE_DIR; vazio desliga o cache).
+PAYROLL_BACKEND = os.getenv("PAYROLL_BACKEND", "sqlite")
+COLUMNAR_CACHE_DIR = os.getenv("COLUMNAR_CACHE_DIR", "data/columnar")
+# Versões do cache colunar mantidas em disco; as mais antigas são apagadas ao gravar uma nova
+# (mais de uma: outro processo ainda pode estar com a anterior mapeada em memória).
+COLUMNAR_CACHE_KEEP_VERSIONS = int(os.getenv("COLUMNAR_CACHE_KEEP_VERSIONS", "2"))
+
+# Cache de respostas de folha (por versão dos dados + parâmetros extraídos); 0 entradas desliga.
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+
+# Governador das chamadas ao LLM: prazo por tentativa (s) na extração e no chat geral, chamadas
+# simultâneas ao provedor, novas tentativas (backoff exponencial com jitter) e hedge (duplica a
+# chamada que passar de LLM_HEDGE_AFTER_SECONDS; 0 desliga).
+LLM_EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("LLM_EXTRACTION_TIMEOUT_SECONDS", "5"))
+LLM_CHAT_TIMEOUT_SECONDS = float(os.getenv("LLM_CHAT_TIMEOUT_SECONDS", "20"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+LLM_RETRY_BACKOFF_SECONDS = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "0.2"))
+LLM_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_RETRY_BACKOFF_MAX_SECONDS", "2"))
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))
+# Disjuntor: abre após N falhas seguidas (0 desliga) e testa o provedor de novo após o intervalo.
+# Aberto, a extração vai direto para a heurística local.
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# Respostas longas de folha (uma coluna para muitas linhas, ex. "INSS de todos em 2025") saem em
+# páginas de PAYROLL_PAGE_SIZE linhas, com cursor de continuação na evidência; o banco é lido
+# em lotes de PAYROLL_FETCH_BATCH linhas (`fetchmany`).
+PAYROLL_PAGE_SIZE = int(os.getenv("PAYROLL_PAGE_SIZE", "200"))
+PAYROLL_FETCH_BATCH = int(os.getenv("PAYROLL_FETCH_BATCH", "100"))
+
+# Perguntas agregadas ("top 10 bônus", "média de IRRF por mês"): máximo de grupos na resposta e
+# linhas de origem citadas por grupo.
+AGGREGATE_MAX_GROUPS = int(os.getenv("AGGREGATE_MAX_GROUPS", "100"))
+AGGREGATE_SOURCE_LIMIT = int(os.getenv("AGGREGATE_SOURCE_LIMIT", "5"))
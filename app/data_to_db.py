@@ -1,31 +1,419 @@
 import os
+import math
 import sqlite3
-import pandas as pd
+import hashlib
+import threading
+from decimal import Decimal
+from pathlib import Path
+from app.config import (
+    PAYROLL_CSV_PATH, PAYROLL_DB_PATH, DB_MMAP_SIZE, DB_CACHED_STATEMENTS, INGEST_CHUNK_SIZE, PAYROLL_FETCH_BATCH,
+)
 
+# Colunas da tabela `payroll`. Nomes de coluna não podem ser parâmetros SQL, então
+# qualquer coluna vinda de fora (ex.: `data_type` extraído pelo LLM) é validada aqui.
+PAYROLL_COLUMNS = frozenset({
+    "employee_id", "name", "competency", "base_salary", "bonus", "benefits_vt_vr",
+    "other_earnings", "deductions_inss", "deductions_irrf", "other_deductions",
+    "net_pay", "payment_date",
+})
 
-def csv_to_sqlite(csv_path="data/payroll.csv", db_path="data/payroll.db"):
+
+# (coluna, tipo) na ordem do CSV; (employee_id, competency) identifica cada linha.
+PAYROLL_SCHEMA = (
+    ("employee_id", "TEXT NOT NULL"),
+    ("name", "TEXT"),
+    ("competency", "TEXT NOT NULL"),
+    ("base_salary", "INTEGER"),
+    ("bonus", "INTEGER"),
+    ("benefits_vt_vr", "INTEGER"),
+    ("other_earnings", "INTEGER"),
+    ("deductions_inss", "REAL"),
+    ("deductions_irrf", "REAL"),
+    ("other_deductions", "INTEGER"),
+    ("net_pay", "REAL"),
+    ("payment_date", "TEXT"),
+)
+PAYROLL_KEY = ("employee_id", "competency")
+# Colunas que as perguntas agregadas usam (líquido, bônus, INSS, IRRF), copiadas no índice
+# por (competency, employee_id); agregações de outras colunas leem a tabela.
+AGGREGATE_INDEX_COLUMNS = ("bonus", "deductions_inss", "deductions_irrf", "net_pay")
+_AGGREGATE_INDEX = ("competency", "employee_id", *AGGREGATE_INDEX_COLUMNS)
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _ensure_schema(connection):
+    """
+    Cria a tabela `payroll` com chave (employee_id, competency) e os índices de consulta. O
+    índice por (competency, employee_id) inclui as colunas de `AGGREGATE_INDEX_COLUMNS`:
+    agregações delas por mês ou por funcionário (`app.query_planner`) são respondidas só com
+    ele, sem ler a tabela.
+    """
+    columns = connection.execute("PRAGMA table_info(payroll)").fetchall()
+    if columns and not any(column[5] for column in columns):
+        # Tabela antiga criada pelo pandas, sem chave primária: é recriada e recarregada.
+        connection.execute("DROP TABLE payroll")
+        connection.execute("DELETE FROM ingest_state")
+    indexed = tuple(row[2] for row in connection.execute("PRAGMA index_info(idx_payroll_competency_employee)"))
+    if indexed and indexed != _AGGREGATE_INDEX:
+        # Índice de uma versão anterior, com outras colunas: é recriado abaixo.
+        connection.execute("DROP INDEX idx_payroll_competency_employee")
+    column_defs = ", ".join(f"{name} {sql_type}" for name, sql_type in PAYROLL_SCHEMA)
+    connection.executescript(
+        f"""
+        CREATE TABLE IF NOT EXISTS payroll ({column_defs}, PRIMARY KEY ({", ".join(PAYROLL_KEY)}));
+        CREATE INDEX IF NOT EXISTS idx_payroll_name ON payroll (name, competency);
+        DROP INDEX IF EXISTS idx_payroll_competency;
+        CREATE INDEX IF NOT EXISTS idx_payroll_competency_employee
+            ON payroll ({", ".join(_AGGREGATE_INDEX)});
+        """
+    )
+    _ensure_rollup_schema(connection)
+
+
+# Agregados por funcionário e período, com a soma de cada coluna numérica e as
+# competências de origem. Períodos: '2025-03' (mês), '2025-Q1', '2025-S1' e '2025' (ano).
+ROLLUP_COLUMNS = tuple(name for name, sql_type in PAYROLL_SCHEMA if sql_type in ("INTEGER", "REAL"))
+
+_MONTH_SQL = "CAST(substr(p.competency, 6, 2) AS INTEGER)"
+ROLLUP_PERIODS = {
+    "month": "p.competency",
+    "quarter": f"substr(p.competency, 1, 4) || '-Q' || (({_MONTH_SQL} + 2) / 3)",
+    "semester": f"substr(p.competency, 1, 4) || '-S' || (({_MONTH_SQL} + 5) / 6)",
+    "year": "substr(p.competency, 1, 4)",
+}
+
+
+def _ensure_rollup_schema(connection):
+    """
+    Cria `payroll_rollups` e os gatilhos que marcam (funcionário, ano) alterados em
+    `payroll_rollup_dirty`; só esses agregados são recalculados por `_refresh_rollups`.
+    """
+    sum_defs = ", ".join(f"{column} REAL" for column in ROLLUP_COLUMNS)
+    created = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'payroll_rollups'"
+    ).fetchone() is None
+    # Dentro de gatilhos, um UPSERT externo anula o "OR IGNORE": a marcação usa NOT EXISTS.
+    mark_new, mark_old = (
+        "INSERT INTO payroll_rollup_dirty SELECT {row}.employee_id, substr({row}.competency, 1, 4) "
+        "WHERE NOT EXISTS (SELECT 1 FROM payroll_rollup_dirty WHERE employee_id = {row}.employee_id "
+        "AND year = substr({row}.competency, 1, 4));".format(row=row)
+        for row in ("NEW", "OLD")
+    )
+    connection.executescript(
+        f"""
+        CREATE TABLE IF NOT EXISTS payroll_rollups (
+            employee_id TEXT NOT NULL,
+            period_type TEXT NOT NULL,
+            period TEXT NOT NULL,
+            {sum_defs},
+            sources TEXT NOT NULL,
+            PRIMARY KEY (employee_id, period)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS payroll_rollup_dirty (
+            employee_id TEXT NOT NULL,
+            year TEXT NOT NULL,
+            PRIMARY KEY (employee_id, year)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS payroll_rollup_on_insert AFTER INSERT ON payroll BEGIN
+            {mark_new}
+        END;
+        CREATE TRIGGER IF NOT EXISTS payroll_rollup_on_update AFTER UPDATE ON payroll BEGIN
+            {mark_old}
+            {mark_new}
+        END;
+        CREATE TRIGGER IF NOT EXISTS payroll_rollup_on_delete AFTER DELETE ON payroll BEGIN
+            {mark_old}
+        END;
+        """
+    )
+    if created:
+        # Base carregada antes dos agregados existirem: todos os (funcionário, ano) ficam pendentes.
+        connection.execute(
+            "INSERT OR IGNORE INTO payroll_rollup_dirty "
+            "SELECT DISTINCT employee_id, substr(competency, 1, 4) FROM payroll"
+        )
+
+
+def _rebuild_dirty_rollups(connection):
+    """Recalcula os agregados dos (funcionário, ano) marcados como alterados, na transação corrente."""
+    sums = ", ".join(f"SUM(p.{column})" for column in ROLLUP_COLUMNS)
+    connection.execute(
+        "DELETE FROM payroll_rollups WHERE EXISTS (SELECT 1 FROM payroll_rollup_dirty d "
+        "WHERE d.employee_id = payroll_rollups.employee_id AND d.year = substr(payroll_rollups.period, 1, 4))"
+    )
+    for period_type, period_sql in ROLLUP_PERIODS.items():
+        connection.execute(
+            f"INSERT INTO payroll_rollups (employee_id, period_type, period, {', '.join(ROLLUP_COLUMNS)}, sources) "
+            f"SELECT p.employee_id, ?, {period_sql}, {sums}, group_concat(p.competency, ',') "
+            "FROM (SELECT payroll.* FROM payroll JOIN payroll_rollup_dirty d "
+            "ON d.employee_id = payroll.employee_id AND d.year = substr(payroll.competency, 1, 4) "
+            "ORDER BY payroll.employee_id, payroll.competency) p "
+            f"GROUP BY p.employee_id, {period_sql}",
+            (period_type,),
+        )
+    connection.execute("DELETE FROM payroll_rollup_dirty")
+
+
+def _refresh_rollups(connection):
+    """Aplica agregados pendentes (ex.: base carregada antes dos agregados existirem)."""
+    if connection.execute("SELECT 1 FROM payroll_rollup_dirty LIMIT 1").fetchone() is None:
+        return
+    with connection:
+        connection.execute("BEGIN IMMEDIATE")
+        _rebuild_dirty_rollups(connection)
+
+
+def rollup_periods(period_start: str, period_end: str):
+    """
+    Decompõe o intervalo de competências [period_start, period_end] ('YYYY-MM') no menor
+    conjunto de agregados alinhados: anos, semestres, trimestres e, nas pontas, meses.
+    """
+    year, month = int(period_start[:4]), int(period_start[5:7])
+    end_year, end_month = int(period_end[:4]), int(period_end[5:7])
+    end = end_year * 12 + end_month - 1
+    cursor = year * 12 + month - 1
+    periods = []
+    while cursor <= end:
+        year, month = divmod(cursor, 12)
+        month += 1
+        if month == 1 and cursor + 11 <= end:
+            periods.append(f"{year}")
+            cursor += 12
+        elif month in (1, 7) and cursor + 5 <= end:
+            periods.append(f"{year}-S{(month + 5) // 6}")
+            cursor += 6
+        elif month % 3 == 1 and cursor + 2 <= end:
+            periods.append(f"{year}-Q{(month + 2) // 3}")
+            cursor += 3
+        else:
+            periods.append(f"{year}-{month:02d}")
+            cursor += 1
+    return periods
+
+
+def _chunk_rows(chunk, columns):
+    values = [chunk[column].tolist() for column in columns]
+    for row in zip(*values):
+        yield tuple(None if isinstance(v, float) and math.isnan(v) else v for v in row)
+
+
+def csv_to_sqlite(csv_path=PAYROLL_CSV_PATH, db_path=PAYROLL_DB_PATH, chunk_size=INGEST_CHUNK_SIZE):
+    """
+    Sincroniza a tabela `payroll` com o CSV de forma incremental.
+
+    Se o arquivo não mudou desde a última carga (tamanho/mtime ou, em seguida, sha256),
+    nada é lido. Caso contrário o CSV é lido em blocos de `chunk_size` linhas, só as
+    linhas novas ou alteradas são gravadas e as que sumiram do CSV são removidas.
+    Retorna a versão dos dados resultante (`dataset_version`).
+    """
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"Arquivo CSV não encontrado: {csv_path}")
-    
-    df = pd.read_csv("data/payroll.csv", dtype={"competency": str})
 
-    connection_to_sqlite = sqlite3.connect(db_path)
+    source = os.path.abspath(csv_path)
+    stat = os.stat(csv_path)
+
+    connection_to_sqlite = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        # WAL permite que as conexões somente leitura do pool consultem durante a carga.
+        connection_to_sqlite.execute("PRAGMA journal_mode=WAL")
+        connection_to_sqlite.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_state ("
+            "source TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL)"
+        )
+        _ensure_schema(connection_to_sqlite)
+
+        state = connection_to_sqlite.execute(
+            "SELECT size, mtime_ns, sha256 FROM ingest_state WHERE source = ?", (source,)
+        ).fetchone()
+        if state and state[0] == stat.st_size and state[1] == stat.st_mtime_ns:
+            _refresh_rollups(connection_to_sqlite)
+            print(f"Base de dados já atualizada em: {db_path} (CSV sem alterações).")
+            return dataset_version(db_path)
+        sha256 = _file_sha256(csv_path)
+        if state and state[2] == sha256:
+            _refresh_rollups(connection_to_sqlite)
+            connection_to_sqlite.execute(
+                "UPDATE ingest_state SET size = ?, mtime_ns = ? WHERE source = ?",
+                (stat.st_size, stat.st_mtime_ns, source),
+            )
+            print(f"Base de dados já atualizada em: {db_path} (CSV sem alterações).")
+            return dataset_version(db_path)
+
+        columns = [name for name, _ in PAYROLL_SCHEMA]
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in PAYROLL_KEY)
+        changed = " OR ".join(f"payroll.{c} IS NOT excluded.{c}" for c in columns if c not in PAYROLL_KEY)
+        upsert = (
+            f"INSERT INTO payroll ({', '.join(columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT ({', '.join(PAYROLL_KEY)}) DO UPDATE SET {updates} WHERE {changed}"
+        )
+
+        total_rows = upserted = 0
+        with connection_to_sqlite:
+            connection_to_sqlite.execute("BEGIN IMMEDIATE")
+            connection_to_sqlite.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS ingest_keys (employee_id TEXT, competency TEXT, "
+                "PRIMARY KEY (employee_id, competency)) WITHOUT ROWID"
+            )
+            connection_to_sqlite.execute("DELETE FROM ingest_keys")
+            # pandas só é importado quando o CSV mudou: reinícios sem mudança não pagam a importação.
+            import pandas as pd
+
+            reader = pd.read_csv(
+                csv_path, dtype={"employee_id": str, "competency": str}, usecols=columns, chunksize=chunk_size
+            )
+            for chunk in reader:
+                rows = list(_chunk_rows(chunk, columns))
+                upserted += connection_to_sqlite.executemany(upsert, rows).rowcount
+                connection_to_sqlite.executemany(
+                    "INSERT OR IGNORE INTO ingest_keys VALUES (?, ?)", ((row[0], row[2]) for row in rows)
+                )
+                total_rows += len(rows)
+            removed = connection_to_sqlite.execute(
+                "DELETE FROM payroll WHERE NOT EXISTS (SELECT 1 FROM ingest_keys k "
+                "WHERE k.employee_id = payroll.employee_id AND k.competency = payroll.competency)"
+            ).rowcount
+            connection_to_sqlite.execute("DROP TABLE ingest_keys")
+            _rebuild_dirty_rollups(connection_to_sqlite)
+            connection_to_sqlite.execute(
+                "INSERT INTO ingest_state (source, size, mtime_ns, sha256) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(source) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns, sha256 = excluded.sha256",
+                (source, stat.st_size, stat.st_mtime_ns, sha256),
+            )
+    finally:
+        connection_to_sqlite.close()
+
+    print(
+        f"Base de dados sincronizada em: {db_path} com {total_rows} registros "
+        f"({upserted} novos/alterados, {removed} removidos)."
+    )
+    return dataset_version(db_path)
+
+
+def dataset_version(db_path=PAYROLL_DB_PATH):
+    """
+    Versão dos dados carregados: o sha256 do(s) CSV(s) da última ingestão. Muda sempre
+    que `csv_to_sqlite` grava uma carga nova (em qualquer processo); `None` se o banco ainda
+    não foi carregado. Lida pelo pool somente leitura, é barata o bastante para cada consulta.
+    """
+    try:
+        rows = query_payroll_data("SELECT sha256 FROM ingest_state ORDER BY source", db_path=db_path)
+    except sqlite3.OperationalError:
+        return None
+    return ",".join(row["sha256"] for row in rows) or None
+
+
+class ReadOnlyConnectionPool:
+    """
+    Uma conexão SQLite somente leitura por thread, reaproveitada entre consultas.
+
+    As conexões usam `mmap_size` e o cache de statements do `sqlite3`, então consultas
+    parametrizadas repetidas não são re-planejadas.
+    """
+
+    def __init__(self, db_path=PAYROLL_DB_PATH, mmap_size=DB_MMAP_SIZE, cached_statements=DB_CACHED_STATEMENTS):
+        self.db_path = db_path
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+            connection = sqlite3.connect(
+                uri, uri=True, cached_statements=self.cached_statements, check_same_thread=False
+            )
+            connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def query(self, query, params=()):
+        """Executa `query` com parâmetros ligados e retorna as linhas como dicts."""
+        cursor = self._connection().execute(query, params)
+        columns = [desc[0] for desc in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def iter_query(self, query, params=(), batch_size=PAYROLL_FETCH_BATCH):
+        """Como `query`, mas em lotes de até `batch_size` linhas (`fetchmany`), sem materializar o resultado."""
+        cursor = self._connection().execute(query, params)
+        columns = [desc[0] for desc in cursor.description]
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(zip(columns, row)) for row in rows]
+        finally:
+            cursor.close()
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(db_path=PAYROLL_DB_PATH):
+    """Retorna o pool compartilhado do banco `db_path`, criando-o na primeira chamada."""
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = ReadOnlyConnectionPool(db_path)
+        return pool
+
+
+def query_payroll_data(query, params=(), db_path=PAYROLL_DB_PATH):
+    return get_connection_pool(db_path).query(query, params)
 
-    df.to_sql('payroll', connection_to_sqlite, if_exists='replace', index=False)
-    connection_to_sqlite.commit()
-    connection_to_sqlite.close()
 
-    print(f"Base de dados criada em: {db_path} com {len(df)} registros.")
+def iter_payroll_data(query, params=(), batch_size=PAYROLL_FETCH_BATCH, db_path=PAYROLL_DB_PATH):
+    return get_connection_pool(db_path).iter_query(query, params, batch_size)
 
 
-def query_payroll_data(query, db_path="data/payroll.db"):
-    connection_to_sqlite = sqlite3.connect(db_path)
-    cursor = connection_to_sqlite.cursor()
-    cursor.execute(query)
-    columns = [desc[0] for desc in cursor.description]
-    result = cursor.fetchall()
-    connection_to_sqlite.close()
-    return [dict(zip(columns, row)) for row in result]
+def query_period_totals(employee_ids, period_start, period_end, db_path=PAYROLL_DB_PATH):
+    """
+    Totais de cada coluna numérica por funcionário no intervalo de competências, lidos dos
+    agregados em uma única consulta pela chave primária. Retorna
+    {employee_id: {coluna: Decimal, "sources": [competência, ...]}} só para quem tem dados.
+    """
+    periods = rollup_periods(period_start, period_end)
+    if not employee_ids or not periods:
+        return {}
+    rows = query_payroll_data(
+        f"SELECT * FROM payroll_rollups WHERE employee_id IN ({', '.join('?' for _ in employee_ids)}) "
+        f"AND period IN ({', '.join('?' for _ in periods)}) ORDER BY employee_id, period",
+        [*employee_ids, *periods],
+        db_path=db_path,
+    )
+    totals = {}
+    for row in rows:
+        employee_totals = totals.setdefault(
+            row["employee_id"], {**{column: Decimal("0") for column in ROLLUP_COLUMNS}, "sources": []}
+        )
+        for column in ROLLUP_COLUMNS:
+            if row[column] is not None:
+                employee_totals[column] += Decimal(str(row[column]))
+        employee_totals["sources"].extend(row["sources"].split(","))
+    for employee_totals in totals.values():
+        employee_totals["sources"].sort()
+    return totals
 
 if __name__ == "__main__":
-    csv_to_sqlite()
\ No newline at end of file
+    csv_to_sqlite()
@@ -0,0 +1,183 @@
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from app.utils import fold_accents
+from app.config import (
+    EXTRACTION_CACHE_BACKEND,
+    EXTRACTION_CACHE_DB_PATH,
+    EXTRACTION_CACHE_MAX_ENTRIES,
+    EXTRACTION_CACHE_TTL_SECONDS,
+)
+
+
+def normalize_query(user_query: str) -> str:
+    """
+    Forma canônica da pergunta usada como chave do cache: sem acentos, minúscula,
+    espaços colapsados e números sem separador de milhar, vírgula decimal ou zeros à esquerda.
+    """
+    text = fold_accents(user_query)
+    text = re.sub(r"(?<=\d)\.(?=\d{3}\b)", "", text)   # 1.234,56 -> 1234,56
+    text = re.sub(r"(?<=\d),(?=\d)", ".", text)         # 1234,56 -> 1234.56
+    text = re.sub(r"\b0+(?=\d)", "", text)               # 05/2025 -> 5/2025
+    text = re.sub(r"[^\w/.%$-]+", " ", text)
+    return " ".join(text.split())
+
+
+class _CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "backend": self.backend,
+            "entries": len(self),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+
+class InMemoryExtractionCache(_CacheStats):
+    """
+    Cache LRU com TTL para o resultado da extração de intenção/parâmetros, na memória do processo.
+    As chaves são perguntas já normalizadas por `normalize_query`.
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_entries=EXTRACTION_CACHE_MAX_ENTRIES, ttl_seconds=EXTRACTION_CACHE_TTL_SECONDS,
+                 clock=time.monotonic):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, json)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self._count(entry is not None)
+        # Cada chamada recebe uma cópia: quem usa o dict pode alterá-lo sem afetar o cache.
+        return json.loads(entry[1]) if entry is not None else None
+
+    def set(self, key: str, value: dict):
+        expires_at = self._clock() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, json.dumps(value, ensure_ascii=False))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteExtractionCache(_CacheStats):
+    """Mesmo contrato de `InMemoryExtractionCache`, persistido em SQLite para sobreviver a reinícios."""
+
+    backend = "sqlite"
+
+    # A limpeza de entradas expiradas/excedentes roda a cada N gravações.
+    EVICT_EVERY = 100
+
+    def __init__(self, db_path=EXTRACTION_CACHE_DB_PATH, max_entries=EXTRACTION_CACHE_MAX_ENTRIES,
+                 ttl_seconds=EXTRACTION_CACHE_TTL_SECONDS, clock=time.time):
+        super().__init__()
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._local = threading.local()
+        self._writes = 0
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_extraction_cache_last_access ON extraction_cache (last_access);
+            """
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str):
+        connection = self._connection()
+        now = self._clock()
+        row = connection.execute(
+            "SELECT value FROM extraction_cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        self._count(row is not None)
+        if row is None:
+            return None
+        connection.execute("UPDATE extraction_cache SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict):
+        now = self._clock()
+        self._connection().execute(
+            "INSERT INTO extraction_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at, "
+            "last_access = excluded.last_access",
+            (key, json.dumps(value, ensure_ascii=False), now + self.ttl_seconds, now),
+        )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """Remove entradas expiradas e, se ainda houver excesso, as menos usadas recentemente."""
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("DELETE FROM extraction_cache WHERE expires_at <= ?", (self._clock(),))
+            connection.execute(
+                "DELETE FROM extraction_cache WHERE key IN "
+                "(SELECT key FROM extraction_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+
+
+def create_extraction_cache():
+    """Cria o cache de extração configurado em `EXTRACTION_CACHE_BACKEND` (memory | sqlite)."""
+    if EXTRACTION_CACHE_BACKEND == "sqlite":
+        return SQLiteExtractionCache()
+    if EXTRACTION_CACHE_BACKEND == "memory":
+        return InMemoryExtractionCache()
+    raise ValueError(f"EXTRACTION_CACHE_BACKEND inválido: {EXTRACTION_CACHE_BACKEND}. Use 'memory' ou 'sqlite'.")
@@ -0,0 +1,178 @@
+import os
+import time
+import hashlib
+import threading
+import numpy as np
+from app.config import (
+    INTENT_ROUTER_ENABLED,
+    INTENT_ROUTER_MODEL,
+    INTENT_ROUTER_THRESHOLD,
+    INTENT_ROUTER_MARGIN,
+    INTENT_ROUTER_BANK_PATH,
+)
+
+# Banco de frases de exemplo por intenção. Os embeddings são calculados uma vez e
+# guardados em `INTENT_ROUTER_BANK_PATH` como matriz NumPy.
+EXAMPLE_UTTERANCES = {
+    "payroll_query": [
+        "Quanto recebi em maio/2025?",
+        "Qual foi o meu salário líquido em abril de 2025?",
+        "Quanto a Ana Souza recebeu de líquido em março?",
+        "Qual o total líquido do Bruno Lima no 1º trimestre de 2025?",
+        "Quando foi pago o salário de abril/2025?",
+        "Qual a data de pagamento da folha de junho?",
+        "Qual o maior bônus que recebi?",
+        "Quanto foi descontado de INSS em fevereiro?",
+        "Qual o valor do IRRF no meu contracheque de janeiro?",
+        "Me mostre a folha de pagamento de maio de 2025",
+        "Detalhes do holerite da Ana em fevereiro/2025",
+        "Quanto de desconto eu tive no salário do mês passado?",
+        "Qual o salário base do Bruno?",
+        "Quanto recebi de vale transporte e vale refeição?",
+        "Qual foi o líquido total do semestre?",
+    ],
+    "general_chat": [
+        "Olá, tudo bem?",
+        "Bom dia!",
+        "Obrigado pela ajuda",
+        "Quem é você?",
+        "O que você consegue fazer?",
+        "Me conte uma piada",
+        "Qual a capital da França?",
+        "Como está o tempo hoje?",
+        "Explique o que é inteligência artificial",
+        "Pode me ajudar a escrever um e-mail?",
+        "Tchau, até mais",
+        "Qual a diferença entre Python e Java?",
+        "Me recomende um livro",
+        "Como faço um bolo de chocolate?",
+        "O que significa CLT?",
+    ],
+}
+
+
+def _load_sentence_transformer(model_name):
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(texts):
+        return model.encode(
+            list(texts), batch_size=64, normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False
+        )
+
+    return encode
+
+
+class IntentRouter:
+    """
+    Classifica a intenção (payroll_query | general_chat) localmente, comparando o embedding
+    da pergunta com o banco de exemplos. `route` retorna `None` como intenção quando a
+    confiança fica abaixo de `threshold` (ou a margem sobre a outra intenção é pequena),
+    e nesse caso quem chama deve consultar o LLM.
+
+    `encoder` recebe uma lista de textos e devolve uma matriz (n, d) de vetores normalizados;
+    por padrão é o modelo `sentence-transformers` de `INTENT_ROUTER_MODEL`, carregado na
+    primeira chamada. Se o modelo não puder ser carregado o roteador fica desativado.
+    """
+
+    def __init__(self, encoder=None, enabled=INTENT_ROUTER_ENABLED, model_name=INTENT_ROUTER_MODEL,
+                 threshold=INTENT_ROUTER_THRESHOLD, margin=INTENT_ROUTER_MARGIN, bank_path=INTENT_ROUTER_BANK_PATH,
+                 examples=EXAMPLE_UTTERANCES):
+        self.enabled = enabled
+        self.model_name = model_name
+        self.threshold = threshold
+        self.margin = margin
+        self.bank_path = bank_path
+        self.examples = examples
+        self._encoder = encoder
+        self._bank = None
+        self._labels = None
+        self._intents = sorted(examples)
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.routed = 0
+        self.total = 0
+        self.route_seconds = 0.0
+        self.routed_queries = 0
+
+    def _bank_key(self):
+        digest = hashlib.sha256(self.model_name.encode())
+        for intent in self._intents:
+            for utterance in self.examples[intent]:
+                digest.update(f"{intent}\0{utterance}\0".encode())
+        return digest.hexdigest()
+
+    def _ensure_loaded(self):
+        if self._bank is not None or not self.enabled:
+            return self.enabled
+        with self._load_lock:
+            if self._bank is not None or not self.enabled:
+                return self.enabled
+            try:
+                if self._encoder is None:
+                    self._encoder = _load_sentence_transformer(self.model_name)
+                self._bank, self._labels = self._load_bank()
+            except Exception as e:
+                print(f"Roteador de intenção desativado, usando só o LLM: {e}")
+                self.enabled = False
+        return self.enabled
+
+    def _load_bank(self):
+        labels = np.array([self._intents.index(i) for i in self._intents for _ in self.examples[i]])
+        key = self._bank_key()
+        if self.bank_path and os.path.exists(self.bank_path):
+            stored = np.load(self.bank_path)
+            if str(stored["key"]) == key:
+                return stored["embeddings"], stored["labels"]
+        texts = [u for i in self._intents for u in self.examples[i]]
+        embeddings = np.asarray(self._encoder(texts), dtype=np.float32)
+        if self.bank_path:
+            np.savez(self.bank_path, key=key, embeddings=embeddings, labels=labels)
+        return embeddings, labels
+
+    def _decide(self, scores):
+        # Melhor similaridade por intenção; a vencedora precisa passar do limiar e da margem.
+        best = np.array([scores[self._labels == i].max() for i in range(len(self._intents))])
+        order = np.argsort(best)[::-1]
+        confidence = float(best[order[0]])
+        runner_up = float(best[order[1]]) if len(order) > 1 else -1.0
+        if confidence >= self.threshold and confidence - runner_up >= self.margin:
+            return self._intents[order[0]], confidence
+        return None, confidence
+
+    def route_batch(self, queries):
+        """Classifica várias perguntas com uma única codificação em lote. Retorna [(intent | None, confiança)]."""
+        if not queries or not self._ensure_loaded():
+            return [(None, 0.0) for _ in queries]
+        start = time.perf_counter()
+        vectors = np.asarray(self._encoder(list(queries)), dtype=np.float32)
+        decisions = [self._decide(row) for row in vectors @ self._bank.T]
+        with self._stats_lock:
+            self.route_seconds += time.perf_counter() - start
+            self.routed_queries += len(queries)
+        return decisions
+
+    def route(self, query: str):
+        return self.route_batch([query])[0]
+
+    def record(self, handled_without_llm: bool):
+        """Contabiliza se a pergunta foi resolvida sem chamar o LLM de extração."""
+        with self._stats_lock:
+            self.total += 1
+            if handled_without_llm:
+                self.routed += 1
+
+    def stats(self):
+        with self._stats_lock:
+            routed, total = self.routed, self.total
+            route_seconds, routed_queries = self.route_seconds, self.routed_queries
+        return {
+            "enabled": self.enabled,
+            "model": self.model_name,
+            "threshold": self.threshold,
+            "handled_without_llm": routed,
+            "total": total,
+            "share_without_llm": routed / total if total else 0.0,
+            "avg_route_ms": route_seconds / routed_queries * 1000 if routed_queries else 0.0,
+        }
@@ -0,0 +1,352 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from app.config import (
+    LLM_EXTRACTION_TIMEOUT_SECONDS, LLM_CHAT_TIMEOUT_SECONDS, LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES,
+    LLM_RETRY_BACKOFF_SECONDS, LLM_RETRY_BACKOFF_MAX_SECONDS, LLM_HEDGE_AFTER_SECONDS,
+    LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS,
+)
+from app.metrics import LLM_CALLS, LLM_RETRIES, LLM_HEDGED, LLM_CIRCUIT
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Marca o fim do stream na fila entre o leitor do provedor e quem consome os pedaços.
+_STREAM_END = object()
+
+
+class CircuitOpenError(Exception):
+    """O circuito do LLM está aberto: a chamada é recusada sem chegar ao provedor."""
+
+
+class CircuitBreaker:
+    """
+    Disjuntor das chamadas ao LLM. Depois de `failure_threshold` falhas seguidas abre e recusa
+    tudo por `reset_seconds`; em seguida deixa passar uma chamada de teste (meio aberto), que
+    fecha o circuito se der certo ou o reabre se falhar. `failure_threshold=0` desliga.
+    """
+
+    def __init__(self, failure_threshold=LLM_BREAKER_FAILURES, reset_seconds=LLM_BREAKER_RESET_SECONDS,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_started = None
+
+    def _transition(self, state):
+        if state != self.state:
+            self.state = state
+            LLM_CIRCUIT.inc(state=state)
+
+    def allow(self) -> bool:
+        """Se a próxima chamada pode ir ao provedor; no estado meio aberto, só uma por vez."""
+        with self._lock:
+            now = self._clock()
+            if self.state == OPEN and now - self._opened_at >= self.reset_seconds:
+                self._transition(HALF_OPEN)
+                self._probe_started = None
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN:
+                # Uma chamada de teste que nunca terminou (cancelada) não prende o circuito.
+                if self._probe_started is None or now - self._probe_started >= self.reset_seconds:
+                    self._probe_started = now
+                    return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failure_threshold <= 0:
+                return
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                self._transition(OPEN)
+
+
+class ConcurrencyLimiter:
+    """
+    Limite de chamadas simultâneas compartilhado entre threads (`with limiter`) e corrotinas
+    (`async with limiter`), de qualquer event loop. Quem espera é atendido em ordem de chegada
+    e recebe a vaga diretamente de quem a libera.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._free = limit
+        self._lock = threading.Lock()
+        self._waiters = deque()  # threading.Event (thread) ou (loop, future) (corrotina)
+
+    def acquire(self):
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # A vaga já tinha sido entregue: é devolvida (se o future foi cancelado, `_wake` devolve).
+            if waiter[1].done() and not waiter[1].cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self._free += 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            loop, future = waiter
+            loop.call_soon_threadsafe(self._wake, future)
+
+    def _wake(self, future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def in_use(self):
+        with self._lock:
+            return self.limit - self._free
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    async def __aenter__(self):
+        await self.aacquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+class LLMGovernor:
+    """
+    Envolve toda chamada ao LLM: prazo por tentativa (`timeouts`, por tipo de chamada),
+    limite global de chamadas simultâneas ao provedor, novas tentativas com backoff
+    exponencial e jitter, requisição duplicada ("hedge") opcional quando a primeira demora
+    mais que `hedge_after_seconds`, e o `CircuitBreaker`. Com o circuito aberto as chamadas
+    falham na hora com `CircuitOpenError`.
+
+    O caminho síncrono (`call`) roda a chamada numa thread para poder abandoná-la no prazo;
+    ele não faz hedge. Os caminhos síncrono, assíncrono e de streaming dividem o mesmo
+    `ConcurrencyLimiter`.
+    """
+
+    def __init__(self, timeouts=None, max_concurrency=LLM_MAX_CONCURRENCY, max_retries=LLM_MAX_RETRIES,
+                 backoff_seconds=LLM_RETRY_BACKOFF_SECONDS, backoff_max_seconds=LLM_RETRY_BACKOFF_MAX_SECONDS,
+                 hedge_after_seconds=LLM_HEDGE_AFTER_SECONDS, breaker=None, rng=random.random):
+        self.timeouts = timeouts if timeouts is not None else {
+            "extraction": LLM_EXTRACTION_TIMEOUT_SECONDS,
+            "general_chat": LLM_CHAT_TIMEOUT_SECONDS,
+        }
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._rng = rng
+        # No caminho síncrono a vaga é liberada só quando a chamada termina de fato, mesmo
+        # que quem a fez já tenha desistido pelo prazo.
+        self._limiter = ConcurrencyLimiter(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="payroll-llm")
+
+    def _timeout(self, call):
+        timeout = self.timeouts.get(call)
+        return timeout if timeout and timeout > 0 else None
+
+    def _backoff(self, attempt):
+        """Espera antes da tentativa `attempt + 1`: jitter completo sobre o backoff exponencial."""
+        return self._rng() * min(self.backoff_max_seconds, self.backoff_seconds * 2 ** attempt)
+
+    def _admit(self, call):
+        if not self.breaker.allow():
+            LLM_CALLS.inc(call=call, outcome="rejected")
+            raise CircuitOpenError(f"Circuito do LLM aberto; chamada '{call}' recusada.")
+
+    def _failed(self, call, error, attempt, retryable=True):
+        """Registra a falha; `True` (e conta a nova tentativa) se ela vai acontecer."""
+        timed_out = isinstance(error, (asyncio.TimeoutError, FutureTimeoutError))
+        LLM_CALLS.inc(call=call, outcome="timeout" if timed_out else "error")
+        self.breaker.record_failure()
+        if not retryable or attempt >= self.max_retries:
+            return False
+        LLM_RETRIES.inc(call=call)
+        return True
+
+    def _succeeded(self, call):
+        LLM_CALLS.inc(call=call, outcome="ok")
+        self.breaker.record_success()
+
+    async def _attempt(self, factory, call):
+        # O prazo vale para a chamada ao provedor, não para a espera na fila do semáforo.
+        async with self._limiter:
+            return await asyncio.wait_for(factory(), self._timeout(call))
+
+    async def _hedged(self, factory, call):
+        first = asyncio.ensure_future(self._attempt(factory, call))
+        tasks = {first}
+        try:
+            if not self.hedge_after_seconds or self.hedge_after_seconds <= 0:
+                return await first
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after_seconds)
+            if not done:
+                LLM_HEDGED.inc(call=call)
+                tasks.add(asyncio.ensure_future(self._attempt(factory, call)))
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        return task.result()
+            return first.result()  # as duas falharam: propaga o erro da primeira
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def acall(self, factory, call="general_chat"):
+        """Resultado de `await factory()` (ex.: `lambda: llm.ainvoke(messages)`) sob as regras do governador."""
+        attempt = 0
+        while True:
+            self._admit(call)
+            try:
+                result = await self._hedged(factory, call)
+            except Exception as e:
+                if not self._failed(call, e, attempt):
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            self._succeeded(call)
+            return result
+
+    def _run_sync(self, func, call):
+        self._limiter.acquire()
+
+        def run():
+            try:
+                return func()
+            finally:
+                self._limiter.release()
+
+        return self._executor.submit(run).result(timeout=self._timeout(call))
+
+    def call(self, func, call="general_chat"):
+        """Versão síncrona de `acall`: resultado de `func()` (ex.: `lambda: llm.invoke(messages)`)."""
+        attempt = 0
+        while True:
+            self._admit(call)
+            try:
+                result = self._run_sync(func, call)
+            except Exception as e:
+                if not self._failed(call, e, attempt):
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            self._succeeded(call)
+            return result
+
+    async def _produce(self, factory, call, queue):
+        """
+        Lê o stream do provedor sob uma vaga do limite e entrega os pedaços em `queue`. A vaga
+        é liberada quando o provedor termina, não quando o cliente termina de ler: um leitor
+        de SSE lento não segura vagas das demais chamadas (a resposta fica em memória).
+        """
+        try:
+            async with self._limiter:
+                iterator = factory().__aiter__()
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(iterator.__anext__(), self._timeout(call))
+                        except StopAsyncIteration:
+                            break
+                        queue.put_nowait((chunk, None))
+                finally:
+                    if hasattr(iterator, "aclose"):
+                        await iterator.aclose()
+        except Exception as e:
+            queue.put_nowait((_STREAM_END, e))
+        else:
+            queue.put_nowait((_STREAM_END, None))
+
+    async def astream(self, factory, call="general_chat"):
+        """
+        Pedaços de `factory()` (ex.: `lambda: llm.astream(messages)`). O prazo vale para cada
+        pedaço, inclusive o primeiro; só há nova tentativa se a falha vier antes do primeiro
+        pedaço, para não repetir texto já entregue.
+        """
+        attempt = 0
+        while True:
+            self._admit(call)
+            queue = asyncio.Queue()
+            producer = asyncio.ensure_future(self._produce(factory, call, queue))
+            started = False
+            try:
+                while True:
+                    chunk, error = await queue.get()
+                    if error is not None:
+                        raise error
+                    if chunk is _STREAM_END:
+                        break
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if not self._failed(call, e, attempt, retryable=not started):
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            finally:
+                if not producer.done():
+                    producer.cancel()
+            self._succeeded(call)
+            return
+
+    def stats(self):
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._limiter.in_use(),
+            "max_retries": self.max_retries,
+            "hedge_after_seconds": self.hedge_after_seconds,
+            "timeouts": self.timeouts,
+        }
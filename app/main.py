@@ -1,40 +1,163 @@
+import json
+import asyncio
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import Dict, Any
-from app.chatbot import PayrollChatbot
-from app.data_to_db import csv_to_sqlite
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional
+from app.pagination import InvalidCursorError
+from app.config import BATCH_MAX_MESSAGES, CHAT_WARMUP_ON_STARTUP
+from app.metrics import registry, stage
 
-app = FastAPI(title="Chatbot de Folha de Pagamento")
+_chatbot = None
+_chatbot_lock = threading.Lock()
 
-chatbot = PayrollChatbot()
+
+def get_chatbot():
+    """
+    `PayrollChatbot` do processo, construído na primeira chamada: a importação do módulo não
+    carrega LangChain/Gemini, não lê o CSV e não exige `GEMINI_API_KEY`.
+    """
+    global _chatbot
+    if _chatbot is None:
+        with _chatbot_lock:
+            if _chatbot is None:
+                from app.chatbot import PayrollChatbot
+
+                _chatbot = PayrollChatbot()
+    return _chatbot
+
+
+async def aget_chatbot():
+    """`get_chatbot` sem bloquear o event loop enquanto o chatbot é construído."""
+    if _chatbot is not None:
+        return _chatbot
+    return await asyncio.to_thread(get_chatbot)
+
+
+async def _warm_up():
+    try:
+        await aget_chatbot()
+    except Exception as e:
+        print(f"Erro ao inicializar o chatbot: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # A construção roda em segundo plano: o uvicorn já aceita conexões (e o /health responde)
+    # enquanto a ingestão e o cliente do LLM são preparados; o primeiro /chat espera por ela.
+    warm_up = asyncio.create_task(_warm_up()) if CHAT_WARMUP_ON_STARTUP else None
+    yield
+    if warm_up is not None and not warm_up.done():
+        warm_up.cancel()
+
+
+app = FastAPI(title="Chatbot de Folha de Pagamento", lifespan=lifespan)
 
 class ChatRequest(BaseModel):
     message: str
+    # Sem `session_id` a pergunta é respondida sem histórico (e não entra em nenhum).
+    session_id: Optional[str] = None
+    # `evidence.page.next_cursor` de uma resposta paginada: pede a próxima página.
+    cursor: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
     evidence: Dict[str, Any] = {}
 
-@app.on_event("startup")
-async def startup_event():
-    print("Inicializando banco de dados de folha de pagamento...")
-    csv_to_sqlite("data/payroll.csv", "data/payroll.db")
-    print("Banco de dados de folha de pagamento inicializado.")
+class BatchChatRequest(BaseModel):
+    messages: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_MESSAGES)
+
+class BatchChatResponse(BaseModel):
+    results: List[ChatResponse]
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     """Endpoint para interagir com o chatbot."""
     try:
-        response_text, evidence = chatbot.chat(request.message)
+        with stage("request"):
+            chatbot = await aget_chatbot()
+            response_text, evidence = await chatbot.achat(request.message, request.session_id, request.cursor)
         return ChatResponse(response=response_text, evidence=evidence)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Erro no endpoint /chat: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch_endpoint(request: BatchChatRequest):
+    """Várias perguntas numa chamada; as respostas voltam na ordem das perguntas, cada uma com sua evidência."""
+    try:
+        with stage("batch_request"):
+            chatbot = await aget_chatbot()
+            results = await chatbot.achat_batch(request.messages)
+        return BatchChatResponse(
+            results=[ChatResponse(response=response_text, evidence=evidence) for response_text, evidence in results]
+        )
+    except Exception as e:
+        print(f"Erro no endpoint /chat/batch: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Mesma conversa do /chat em server-sent events: no chat geral os tokens chegam conforme
+    o LLM gera; consultas de folha chegam num único evento `message`.
+    """
+    async def events():
+        try:
+            chatbot = await aget_chatbot()
+            async for event in chatbot.astream_chat(request.message, request.session_id, request.cursor):
+                yield f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except InvalidCursorError as e:
+            error = {"event": "error", "content": str(e)}
+            yield f"event: error\ndata: {json.dumps(error, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            print(f"Erro no endpoint /chat/stream: {e}")
+            error = {"event": "error", "content": "Erro interno do servidor"}
+            yield f"event: error\ndata: {json.dumps(error, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/extraction-cache/stats")
+def extraction_cache_stats():
+    """Acertos e falhas do cache de extração de intenção/parâmetros."""
+    return get_chatbot().extraction_cache.stats()
+
+@app.get("/response-cache/stats")
+def response_cache_stats():
+    """Acertos do cache de respostas de folha e chamadas que aguardaram um cálculo idêntico em andamento."""
+    chatbot = get_chatbot()
+    return {
+        **chatbot.response_cache.stats(),
+        "coalesced": {flight.name: flight.coalesced for flight in (chatbot.payroll_flight, chatbot.llm_flight)},
+    }
+
+@app.get("/llm-governor/stats")
+def llm_governor_stats():
+    """Estado do disjuntor do LLM e limites em vigor (prazos, concorrência, novas tentativas, hedge)."""
+    return get_chatbot().governor.stats()
+
+@app.get("/intent-router/stats")
+def intent_router_stats():
+    """Parcela das perguntas classificadas pelo roteador local, sem chamar o LLM de extração."""
+    return get_chatbot().intent_router.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Latência por etapa, mix de intenções, origem das extrações e falhas do LLM (formato texto do Prometheus)."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
-    """Endpoint de verificação de saúde."""
-    return {"status": "ok", "message": "Chatbot está funcionando!"}
+    """Endpoint de verificação de saúde; `ready` indica se o chatbot já terminou de inicializar."""
+    return {"status": "ok", "message": "Chatbot está funcionando!", "ready": _chatbot is not None}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,132 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Limites (s) dos buckets dos histogramas de latência.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [contagem por bucket..., soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels):
+        with self._lock:
+            series = self._series.get(tuple(sorted(labels.items())))
+            return series[-1] if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Métricas do processo em formato texto do Prometheus, sem dependências externas.
+    Com vários workers do uvicorn cada processo expõe as suas.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str):
+        metric = Counter(name, documentation)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "payroll_stage_seconds",
+    "Duração de cada etapa do atendimento (extraction, sql, formatting, llm_chat, request, batch_request).",
+)
+INTENTS = registry.counter("payroll_intent_total", "Perguntas atendidas por intenção.")
+EXTRACTIONS = registry.counter(
+    "payroll_extraction_total", "Origem da extração de intenção/parâmetros (cache, router, llm, fallback)."
+)
+LLM_ERRORS = registry.counter("payroll_llm_errors_total", "Falhas em chamadas ao LLM, por tipo de chamada.")
+RESPONSE_CACHE = registry.counter("payroll_response_cache_total", "Consultas ao cache de respostas (hit, miss).")
+COALESCED = registry.counter(
+    "payroll_single_flight_coalesced_total", "Chamadas que aguardaram um cálculo idêntico já em andamento."
+)
+LLM_CALLS = registry.counter(
+    "payroll_llm_calls_total", "Tentativas de chamada ao LLM por tipo e resultado (ok, timeout, error, rejected)."
+)
+LLM_RETRIES = registry.counter("payroll_llm_retries_total", "Novas tentativas após falha ou prazo estourado.")
+LLM_HEDGED = registry.counter("payroll_llm_hedged_total", "Chamadas duplicadas (hedge) por demora da primeira.")
+LLM_CIRCUIT = registry.counter("payroll_llm_circuit_transitions_total", "Mudanças de estado do disjuntor do LLM.")
+
+
+@contextmanager
+def stage(name: str):
+    """Span de tempo: registra a duração do bloco em `payroll_stage_seconds{stage=name}`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
@@ -0,0 +1,203 @@
+import re
+import sqlite3
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from app.utils import fold_accents
+from app.config import PAYROLL_DB_PATH
+
+# Palavras comuns nas perguntas que nunca devem ser confundidas com nomes.
+STOPWORDS = frozenset("""
+    a o as os de da do das dos e em no na nos nas um uma para por com sem que qual quais quanto quanta
+    quando onde como meu minha seu sua foi era sao ser ter tive teve recebi recebeu receber pago paga
+    pagamento pagos salario salarios liquido bruto total totais bonus inss irrf desconto descontos data
+    folha mes ano trimestre semestre periodo valor valores maior menor me mostre detalhes holerite
+    contracheque base vale transporte refeicao janeiro fevereiro marco abril maio junho julho agosto
+    setembro outubro novembro dezembro jan fev mar abr mai jun jul ago set out nov dez funcionario
+    funcionarios todos media soma top maiores menores mais menos quantidade lancamentos vt vr beneficios
+""".split())
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Palavras da pergunta com a grafia original (a caixa indica um possível nome).
+WORD_RE = re.compile(r"\w+")
+
+
+def _tokens(text: str):
+    return TOKEN_RE.findall(fold_accents(text))
+
+
+def _trigrams(token: str):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """
+    Índice de nomes de funcionários -> `employee_id`, tolerante a acentos, caixa, nomes
+    parciais e erros de digitação.
+
+    Cada token de nome normalizado aponta para os funcionários que o contêm. Um token da
+    pergunta casa por igualdade, por prefixo (lista ordenada + bisect) ou, se não houver
+    nenhum dos dois, por similaridade de trigramas. Empates entre funcionários não são
+    resolvidos: `resolve` e `find_in_text` retornam `None` quando o nome é ambíguo.
+
+    Numa pergunta livre contam o nome completo e as palavras iguais a um token de nome, em
+    qualquer caixa ("o bruno"), e, por aproximação, só as palavras com inicial maiúscula, com
+    um limiar de similaridade mais alto: palavras comuns ("média", "mais") não viram
+    funcionários.
+    """
+
+    MIN_PREFIX = 3
+    MIN_FUZZY = 4
+    FUZZY_THRESHOLD = 0.5
+    TEXT_FUZZY_THRESHOLD = 0.7
+    MAX_CANDIDATES = 50
+
+    def __init__(self, employees):
+        self._employees = []                     # [(employee_id, name)]
+        self._full_names = {}                    # nome normalizado completo -> posição
+        self._token_employees = defaultdict(set)  # token -> {posição}
+        self._trigram_tokens = defaultdict(list)  # trigrama -> [token]
+        self._trigram_counts = {}                 # token -> nº de trigramas
+        for employee_id, name in employees:
+            position = len(self._employees)
+            self._employees.append((employee_id, name))
+            tokens = _tokens(name)
+            self._full_names.setdefault(" ".join(tokens), position)
+            for token in tokens:
+                self._token_employees[token].add(position)
+        for token in self._token_employees:
+            trigrams = _trigrams(token)
+            self._trigram_counts[token] = len(trigrams)
+            for trigram in trigrams:
+                self._trigram_tokens[trigram].append(token)
+        self._sorted_tokens = sorted(self._token_employees)
+        self._max_name_tokens = max((len(name.split()) for name in self._full_names), default=0)
+
+    @classmethod
+    def from_db(cls, db_path=PAYROLL_DB_PATH):
+        """Monta o índice a partir dos funcionários distintos da tabela `payroll`."""
+        connection = sqlite3.connect(db_path)
+        try:
+            rows = connection.execute(
+                "SELECT employee_id, MAX(name) FROM payroll GROUP BY employee_id ORDER BY employee_id"
+            ).fetchall()
+        finally:
+            connection.close()
+        return cls(rows)
+
+    def __len__(self):
+        return len(self._employees)
+
+    def _match_token(self, token: str, threshold: float):
+        """Retorna {token do índice: score} para um token da pergunta."""
+        if token in self._token_employees:
+            return {token: 1.0}
+        matches = {}
+        if len(token) >= self.MIN_PREFIX:
+            i = bisect_left(self._sorted_tokens, token)
+            while i < len(self._sorted_tokens) and self._sorted_tokens[i].startswith(token):
+                matches[self._sorted_tokens[i]] = 0.9
+                i += 1
+        if not matches and len(token) >= self.MIN_FUZZY:
+            query_trigrams = _trigrams(token)
+            shared = Counter()
+            for trigram in query_trigrams:
+                shared.update(self._trigram_tokens.get(trigram, ()))
+            # Dice >= limiar exige um mínimo de trigramas em comum: descarta o resto sem calcular.
+            min_shared = threshold * len(query_trigrams) / 2
+            for candidate, count in shared.items():
+                if count < min_shared:
+                    continue
+                dice = 2 * count / (len(query_trigrams) + self._trigram_counts[candidate])
+                if dice >= threshold:
+                    matches[candidate] = 0.8 * dice
+        return matches
+
+    def _best(self, tokens, threshold=FUZZY_THRESHOLD):
+        per_token = [m for m in (self._match_token(t, threshold) for t in tokens) if m]
+        if not per_token:
+            return None
+        # Candidatos: quem casa com todos os tokens ou, se ninguém casa, com o mais seletivo.
+        # Acima de MAX_CANDIDATES o nome é ambíguo ("Ana") e nem vale pontuar.
+        per_token_positions = [set().union(*(self._token_employees[t] for t in m)) for m in per_token]
+        candidates = set.intersection(*per_token_positions) or min(per_token_positions, key=len)
+        if len(candidates) > self.MAX_CANDIDATES:
+            return None
+        scores = {}
+        for position in candidates:
+            scores[position] = sum(
+                max((score for t, score in matches.items() if position in self._token_employees[t]), default=0.0)
+                for matches in per_token
+            )
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if len(ranked) > 1 and ranked[0][1] == ranked[1][1]:
+            return None
+        return self._employees[ranked[0][0]]
+
+    def resolve(self, name: str):
+        """Resolve um nome (completo, parcial ou com erro) para `(employee_id, nome)`, ou `None`."""
+        tokens = _tokens(name)
+        position = self._full_names.get(" ".join(tokens))
+        if position is not None:
+            return self._employees[position]
+        return self._best(tokens)
+
+    def _full_name_in(self, tokens):
+        """Nome completo do índice escrito por extenso na pergunta (n-gramas, do mais longo)."""
+        for size in range(min(self._max_name_tokens, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                position = self._full_names.get(" ".join(tokens[start:start + size]))
+                if position is not None:
+                    return self._employees[position]
+        return None
+
+    def _mentions(self, text: str):
+        """
+        Trechos da pergunta que parecem nomes: sequências de palavras com inicial maiúscula,
+        fora as palavras comuns. A primeira palavra da pergunta só conta se for um token de
+        nome do índice, já que a maiúscula ali é só o começo da frase.
+        """
+        spans, current = [], []
+        for i, match in enumerate(WORD_RE.finditer(text)):
+            word = match.group()
+            token = fold_accents(word)
+            is_name = (
+                word[0].isupper() and token not in STOPWORDS and len(token) > 1
+                and (i > 0 or token in self._token_employees)
+            )
+            if is_name:
+                current.append(word)
+            elif current:
+                spans.append(current)
+                current = []
+        if current:
+            spans.append(current)
+        return [" ".join(span) for span in spans]
+
+    def find_in_text(self, text: str):
+        """
+        Procura um funcionário citado em uma pergunta livre: primeiro o nome completo, depois
+        as palavras iguais a um token de nome (fora as palavras comuns), em qualquer caixa, e
+        por fim os trechos com inicial maiúscula (`_mentions`), com o limiar mais alto.
+        """
+        tokens = _tokens(text)
+        employee = self._full_name_in(tokens)
+        if employee is not None:
+            return employee
+        exact = [t for t in tokens if t in self._token_employees and t not in STOPWORDS and len(t) > 1]
+        if exact:
+            employee = self._best(exact)
+            if employee is not None:
+                return employee
+        for mention in self._mentions(text):
+            employee = self._best(_tokens(mention), self.TEXT_FUZZY_THRESHOLD)
+            if employee is not None:
+                return employee
+        return None
+
+    def unresolved_mention(self, text: str):
+        """Primeiro nome citado na pergunta que `find_in_text` não resolve (ambíguo ou desconhecido)."""
+        if self.find_in_text(text) is not None:
+            return None
+        mentions = self._mentions(text)
+        return mentions[0] if mentions else None
@@ -0,0 +1,54 @@
+import re
+import json
+import base64
+import binascii
+
+COMPETENCY_PARAMS = ("competency", "period_start", "period_end")
+COMPETENCY_RE = re.compile(r"\d{4}-\d{2}")
+
+
+class InvalidCursorError(ValueError):
+    """Cursor de continuação malformado ou adulterado."""
+
+
+def encode_cursor(params: dict, after) -> str:
+    """
+    Cursor de continuação de uma resposta paginada: os parâmetros já extraídos da pergunta e
+    a chave (employee_id, competency) da última linha entregue, em JSON base64 (URL-safe).
+    A próxima página sai direto do banco, sem passar de novo pelo LLM.
+    """
+    payload = {key: value for key, value in params.items() if key != "after"}
+    payload["after"] = list(after)
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Parâmetros da consulta (com `after`) guardados em `cursor`; `InvalidCursorError` se inválido."""
+    try:
+        params = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursorError("Cursor de paginação inválido.")
+    if not isinstance(params, dict):
+        raise InvalidCursorError("Cursor de paginação inválido.")
+    after = params.get("after")
+    if (
+        params.get("intent") != "payroll_query"
+        or not isinstance(after, list)
+        or len(after) != 2
+        or not all(isinstance(key, str) for key in after)
+        or not all(_valid_param(key, value) for key, value in params.items() if key != "after")
+    ):
+        raise InvalidCursorError("Cursor de paginação inválido.")
+    return params
+
+
+def _valid_param(key: str, value) -> bool:
+    """Parâmetros extraídos são texto (ou nulos), competências em YYYY-MM; só `limit` é inteiro."""
+    if value is None:
+        return True
+    if key == "limit":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if key in COMPETENCY_PARAMS:
+        return isinstance(value, str) and COMPETENCY_RE.fullmatch(value) is not None
+    return isinstance(value, str)
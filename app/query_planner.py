@@ -0,0 +1,107 @@
+from app.data_to_db import ROLLUP_COLUMNS
+
+# Funções de agregação aceitas em `aggregation` (valor vindo do LLM, validado aqui).
+AGGREGATE_FUNCTIONS = {"sum": "SUM", "avg": "AVG", "max": "MAX", "min": "MIN", "count": "COUNT"}
+# Agrupamentos aceitos em `group_by` e a coluna-chave de cada um.
+GROUP_KEYS = {"employee": "employee_id", "month": "competency"}
+
+
+def _as_int(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def aggregate_spec(params: dict):
+    """
+    Normaliza os parâmetros de agregação extraídos (`aggregation`, `group_by`, `order`,
+    `limit`) para uma coluna numérica em `data_type`, ou `None` se a pergunta não pede
+    agregação nem ranking. `group_by` sem função soma; `order`/`limit` sem função e sem
+    agrupamento é um ranking de linhas ("top 10 bônus").
+    """
+    column = params.get("data_type")
+    if column not in ROLLUP_COLUMNS:
+        return None
+    function = str(params.get("aggregation") or "").lower() or None
+    group_by = str(params.get("group_by") or "").lower() or None
+    order = str(params.get("order") or "").lower() or None
+    limit = _as_int(params.get("limit"))
+    function = function if function in AGGREGATE_FUNCTIONS else None
+    group_by = group_by if group_by in GROUP_KEYS else None
+    order = order if order in ("asc", "desc") else None
+    if function is None and group_by is None and order is None and limit is None:
+        return None
+    if group_by and function is None:
+        function = "sum"
+    if order is None and not (group_by == "month" and limit is None):
+        # Rankings vêm do maior para o menor; "por mês" sem limite sai em ordem cronológica.
+        order = "asc" if function == "min" else "desc"
+    return {"function": function, "column": column, "group_by": group_by, "order": order, "limit": limit}
+
+
+def plan_aggregate(spec: dict, where_clause: str, where_params: list, limit: int, source_limit: int):
+    """
+    Um único `SELECT` para `spec` sobre as linhas de `where_clause` (cláusula `WHERE` com
+    parâmetros ligados, ou vazia). Devolve (sql, parâmetros).
+
+    Ranking de linhas: `ORDER BY coluna LIMIT`. Agregação: `GROUP BY` com `ORDER BY`/`LIMIT`
+    sobre o índice de cobertura (competency, employee_id, `AGGREGATE_INDEX_COLUMNS`), sem
+    ler a tabela quando a coluna está nele. Cada grupo traz `value`, `row_count` e
+    `sources` ("employee_id, competency" separados por "; "): em `max`/`min`, a linha do
+    valor, tirada do próprio `GROUP BY`; nas demais, as primeiras `source_limit` linhas do
+    grupo pela chave, lidas direto do índice.
+    """
+    column = spec["column"]
+    direction = "ASC" if spec["order"] == "asc" else "DESC"
+    not_null = f"{where_clause} AND {column} IS NOT NULL" if where_clause else f" WHERE {column} IS NOT NULL"
+
+    if spec["function"] is None:
+        # O nome sai por linha já escolhida: a ordenação fica só no índice de cobertura.
+        sql = (
+            f"SELECT r.employee_id, {_name('r', ' AND n.competency = r.competency')}, r.competency, r.value "
+            f"FROM (SELECT employee_id, competency, {column} AS value FROM payroll{not_null} "
+            f"ORDER BY {column} {direction}, employee_id, competency LIMIT ?) r "
+            f"ORDER BY r.value {direction}, r.employee_id, r.competency"
+        )
+        return sql, [*where_params, limit]
+
+    function = AGGREGATE_FUNCTIONS[spec["function"]]
+    key = GROUP_KEYS.get(spec["group_by"])
+    params = list(where_params)
+    if spec["function"] in ("max", "min"):
+        # Com um único MAX/MIN, o SQLite preenche as colunas soltas com a linha do valor.
+        sources = ", employee_id || ', ' || competency AS sources"
+        outer_sources = ""
+    else:
+        sources = ""
+        group_filter = f" AND {key} = g.{key}" if key else ""
+        outer_sources = (
+            f", (SELECT group_concat(source, '; ') FROM (SELECT employee_id || ', ' || competency AS source "
+            f"FROM payroll{not_null}{group_filter} ORDER BY employee_id, competency LIMIT ?)) AS sources"
+        )
+
+    groups = f"SELECT {key + ', ' if key else ''}{function}({column}) AS value, COUNT({column}) AS row_count{sources} FROM payroll{not_null}"
+    outer_order = ""
+    if key:
+        # Ordem dos grupos: pelo valor (desempate pela chave) ou, "por mês" sem ranking, cronológica.
+        if spec["order"] is None:
+            group_order, outer_order = key, f" ORDER BY g.{key}"
+        else:
+            group_order, outer_order = f"value {direction}, {key}", f" ORDER BY g.value {direction}, g.{key}"
+        groups += f" GROUP BY {key} ORDER BY {group_order} LIMIT ?"
+        params.append(limit)
+    if outer_sources:
+        params.extend([*where_params, source_limit])
+
+    name = f", {_name('g')}" if key == "employee_id" else ""
+    return f"WITH groups AS ({groups}) SELECT g.*{name}{outer_sources} FROM groups g{outer_order}", params
+
+
+def _name(alias: str, extra: str = ""):
+    """Nome do funcionário da linha/grupo `alias`, buscado pela chave primária."""
+    return (
+        f"(SELECT n.name FROM payroll n WHERE n.employee_id = {alias}.employee_id{extra} "
+        f"ORDER BY n.competency DESC LIMIT 1) AS name"
+    )
@@ -0,0 +1,102 @@
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from app.config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS
+from app.metrics import RESPONSE_CACHE, COALESCED
+
+
+def response_key(version, params: dict) -> str:
+    """Chave de uma resposta: versão dos dados + parâmetros extraídos, em JSON canônico."""
+    return json.dumps([version, params], sort_keys=True, ensure_ascii=False, default=str)
+
+
+class ResponseCache:
+    """
+    Cache LRU com TTL das respostas de folha de pagamento, na memória do processo.
+
+    As chaves (`response_key`) incluem a versão dos dados gravada por `csv_to_sqlite`: depois
+    de uma nova ingestão, inclusive feita por outro worker, as respostas antigas deixam de ser
+    encontradas e saem pelo LRU/TTL. `max_entries=0` desliga o cache.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, resposta)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        RESPONSE_CACHE.inc(result="hit" if entry is not None else "miss")
+        return entry[1] if entry is not None else None
+
+    def set(self, key: str, response):
+        if self.max_entries <= 0:
+            return
+        expires_at = self._clock() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            entries, hits, misses = len(self._entries), self.hits, self.misses
+        total = hits + misses
+        return {"entries": entries, "hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+class SingleFlight:
+    """
+    De-duplicação de chamadas assíncronas concorrentes: enquanto a primeira chamada de uma
+    chave está em andamento, as seguintes aguardam o mesmo resultado em vez de repetir o
+    trabalho. O cálculo roda numa task própria, então o cancelamento de quem o iniciou
+    não derruba os demais.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.coalesced = 0
+        self._inflight = {}
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # marca a exceção como tratada se ninguém mais aguardar a task
+
+    async def run(self, key, factory):
+        """Resultado de `await factory()`, compartilhado entre as chamadas concorrentes de `key`."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        else:
+            self.coalesced += 1
+            COALESCED.inc(kind=self.name)
+        return await asyncio.shield(task)
+
+    def __len__(self):
+        return len(self._inflight)
@@ -0,0 +1,182 @@
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from app.config import (
+    SESSION_BACKEND,
+    SESSION_DB_PATH,
+    SESSION_MAX_TURNS,
+    SESSION_TTL_SECONDS,
+    SESSION_MAX_SESSIONS,
+)
+
+
+class InMemorySessionStore:
+    """
+    Histórico de conversa por sessão, em memória do processo.
+
+    Cada sessão guarda no máximo `max_turns` turnos (pergunta + resposta). Sessões
+    ociosas por mais de `ttl_seconds` expiram e, acima de `max_sessions`, a menos
+    recentemente usada é descartada (LRU).
+    """
+
+    def __init__(self, max_turns=SESSION_MAX_TURNS, ttl_seconds=SESSION_TTL_SECONDS,
+                 max_sessions=SESSION_MAX_SESSIONS, clock=time.monotonic):
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._sessions = OrderedDict()  # session_id -> (last_access, deque[(role, content)])
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        # O OrderedDict está ordenado por último acesso: os expirados ficam no início.
+        while self._sessions:
+            session_id, (last_access, _) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl_seconds and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+
+    def get(self, session_id: str):
+        """Retorna os turnos da sessão como lista de (role, content), do mais antigo ao mais novo."""
+        now = self._clock()
+        with self._lock:
+            self._evict(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            self._sessions[session_id] = (now, entry[1])
+            self._sessions.move_to_end(session_id)
+            return list(entry[1])
+
+    def append(self, session_id: str, user_message: str, response: str):
+        now = self._clock()
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            messages = entry[1] if entry else deque(maxlen=self.max_turns * 2)
+            messages.append(("human", user_message))
+            messages.append(("ai", response))
+            self._sessions[session_id] = (now, messages)
+            self._evict(now)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """
+    Mesmo contrato de `InMemorySessionStore`, persistido em SQLite (WAL) para que
+    vários workers do uvicorn compartilhem as sessões.
+    """
+
+    # A limpeza de sessões expiradas/excedentes roda a cada N gravações.
+    EVICT_EVERY = 100
+
+    def __init__(self, db_path=SESSION_DB_PATH, max_turns=SESSION_MAX_TURNS,
+                 ttl_seconds=SESSION_TTL_SECONDS, max_sessions=SESSION_MAX_SESSIONS, clock=time.time):
+        self.db_path = db_path
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._local = threading.local()
+        self._writes = 0
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access);
+            CREATE TABLE IF NOT EXISTS session_turns (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_session_turns_session ON session_turns (session_id, seq);
+            """
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, session_id: str):
+        connection = self._connection()
+        now = self._clock()
+        row = connection.execute("SELECT last_access FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return []
+        if now - row[0] > self.ttl_seconds:
+            self._delete_sessions(connection, [session_id])
+            return []
+        connection.execute("UPDATE sessions SET last_access = ? WHERE session_id = ?", (now, session_id))
+        rows = connection.execute(
+            "SELECT role, content FROM session_turns WHERE session_id = ? ORDER BY seq",
+            (session_id,),
+        ).fetchall()
+        return [(role, content) for role, content in rows]
+
+    def append(self, session_id: str, user_message: str, response: str):
+        connection = self._connection()
+        now = self._clock()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "INSERT INTO sessions (session_id, last_access) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_access = excluded.last_access",
+                (session_id, now),
+            )
+            connection.executemany(
+                "INSERT INTO session_turns (session_id, role, content) VALUES (?, ?, ?)",
+                [(session_id, "human", user_message), (session_id, "ai", response)],
+            )
+            connection.execute(
+                "DELETE FROM session_turns WHERE session_id = ? AND seq NOT IN "
+                "(SELECT seq FROM session_turns WHERE session_id = ? ORDER BY seq DESC LIMIT ?)",
+                (session_id, session_id, self.max_turns * 2),
+            )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """Remove sessões expiradas e, se ainda houver excesso, as menos recentes."""
+        connection = self._connection()
+        now = self._clock()
+        expired = [r[0] for r in connection.execute(
+            "SELECT session_id FROM sessions WHERE last_access < ?", (now - self.ttl_seconds,)
+        )]
+        overflow = [r[0] for r in connection.execute(
+            "SELECT session_id FROM sessions WHERE last_access >= ? ORDER BY last_access DESC LIMIT -1 OFFSET ?",
+            (now - self.ttl_seconds, self.max_sessions),
+        )]
+        self._delete_sessions(connection, expired + overflow)
+
+    def _delete_sessions(self, connection, session_ids):
+        if not session_ids:
+            return
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany("DELETE FROM session_turns WHERE session_id = ?", [(s,) for s in session_ids])
+            connection.executemany("DELETE FROM sessions WHERE session_id = ?", [(s,) for s in session_ids])
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_store():
+    """Cria o store de sessões configurado em `SESSION_BACKEND` (memory | sqlite)."""
+    if SESSION_BACKEND == "sqlite":
+        return SQLiteSessionStore()
+    if SESSION_BACKEND == "memory":
+        return InMemorySessionStore()
+    raise ValueError(f"SESSION_BACKEND inválido: {SESSION_BACKEND}. Use 'memory' ou 'sqlite'.")
@@ -1,7 +1,9 @@
 # Helper functions for formatting and parsing (in app/utils.py)
 # app/utils.py
 import re
+import unicodedata
 from datetime import datetime
+from functools import lru_cache
 
 def format_currency(value):
     """Formata um valor numérico para o formato de moeda BRL."""
@@ -9,46 +11,77 @@ def format_currency(value):
         return "N/A"
     return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
+def format_currency_column(values):
+    """
+    Formata uma coluna inteira de valores em BRL, com a mesma saída de `format_currency`
+    item a item: as trocas de separador rodam uma vez sobre a coluna toda, não por valor.
+    """
+    if not values:
+        return []
+    text = "\n".join(["" if value is None else f"R$ {value:,.2f}" for value in values])
+    text = text.replace(",", "X").replace(".", ",").replace("X", ".")
+    return [formatted or "N/A" for formatted in text.split("\n")]
+
+# Mapeamento de meses para números
+MONTH_MAP = {
+    "janeiro": "01", "jan": "01", "fevereiro": "02", "fev": "02", "março": "03", "mar": "03",
+    "abril": "04", "abr": "04", "maio": "05", "mai": "05", "junho": "06", "jun": "06", "julho": "07", "jul": "07",
+    "agosto": "08", "ago": "08", "setembro": "09", "set": "09", "outubro": "10", "out": "10",
+    "novembro": "11", "nov": "11", "dezembro": "12", "dez": "12"
+}
+
+# Mesmos campos que o `strptime` aceita em %Y, %m e %d.
+_YEAR = r"(\d{4})"
+_MONTH = r"(1[0-2]|0[1-9]|[1-9])"
+_DAY = r"(3[01]|[12]\d|0[1-9]|[1-9])"
+_ISO_MONTH_RE = re.compile(f"{_YEAR}-{_MONTH}")
+_ISO_DATE_RE = re.compile(f"{_YEAR}-{_MONTH}-{_DAY}")
+_NUMERIC_MONTH_RE = re.compile(f"{_MONTH}/{_YEAR}")
+_MONTH_NAME_RE = re.compile(r"([a-zç]+)/(\d{4}|\d{2})")
+_SLASH_MONTH_RE = re.compile(r"^\d{1,2}/\d{4}$")
+_DASH_MONTH_RE = re.compile(r"^\d{4}-\d{1,2}$")
+
+@lru_cache(maxsize=4096)
 def parse_date_input(date_str: str):
-    """Tenta parsear uma string de data/competência em um objeto datetime."""
-    # Formatos esperados: YYYY-MM, YYYY-MM-DD, MM/YYYY, Mês/YYYY, Mês/YY
-    formats = ["%Y-%m", "%Y-%m-%d", "%m/%Y"]
-    
-    # Mapeamento de meses para números
-    month_map = {
-        "janeiro": "01", "jan": "01", "fevereiro": "02", "fev": "02", "março": "03", "mar": "03",
-        "abril": "04", "abr": "04", "maio": "05", "mai": "05", "junho": "06", "jun": "06", "julho": "07", "jul": "07",
-        "agosto": "08", "ago": "08", "setembro": "09", "set": "09", "outubro": "10", "out": "10",
-        "novembro": "11", "nov": "11", "dezembro": "12", "dez": "12"
-    }
-    
+    """
+    Tenta parsear uma string de data/competência em um objeto datetime.
+    Formatos esperados: YYYY-MM, YYYY-MM-DD, MM/YYYY, Mês/YYYY, Mês/YY. Memoizado: as mesmas
+    competências se repetem em toda resposta (o `datetime` devolvido é imutável).
+    """
+    match = _ISO_MONTH_RE.fullmatch(date_str) or _NUMERIC_MONTH_RE.fullmatch(date_str)
+    if match:
+        year, month = (match.group(1), match.group(2)) if match.re is _ISO_MONTH_RE else (match.group(2), match.group(1))
+        return datetime(int(year), int(month), 1)
+    match = _ISO_DATE_RE.fullmatch(date_str)
+    if match:
+        return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
     date_str_lower = date_str.lower()
-    for month_name, month_num in month_map.items():
+    match = _MONTH_NAME_RE.fullmatch(date_str_lower)
+    if match and match.group(1) in MONTH_MAP:
+        year = match.group(2)
+        # "maio/25" -> 05/2025 (assume anos 20xx)
+        return datetime(int(year) if len(year) == 4 else 2000 + int(year), int(MONTH_MAP[match.group(1)]), 1)
+    return _parse_date_fallback(date_str, date_str_lower)
+
+def _parse_date_fallback(date_str: str, date_str_lower: str):
+    """Caminho geral, para o que não cai nos formatos diretos de `parse_date_input`."""
+    for month_name, month_num in MONTH_MAP.items():
         if month_name in date_str_lower:
             # Substitui o nome do mês pelo número para facilitar o parsing
             date_str_lower = date_str_lower.replace(month_name, month_num)
             # Tenta um formato como "01/2025" ou "2025-01"
-            if re.match(r"^\d{1,2}/\d{4}$", date_str_lower):
+            if _SLASH_MONTH_RE.match(date_str_lower):
                 return datetime.strptime(date_str_lower, "%m/%Y")
-            elif re.match(r"^\d{4}-\d{1,2}$", date_str_lower):
+            elif _DASH_MONTH_RE.match(date_str_lower):
                 return datetime.strptime(date_str_lower, "%Y-%m")
-    
+
     # Tenta os formatos padrão
-    for fmt in formats:
+    for fmt in ("%Y-%m", "%Y-%m-%d", "%m/%Y"):
         try:
             return datetime.strptime(date_str, fmt)
         except ValueError:
             pass
-    
-    # Adiciona tratamento para "maio/25" -> "05/2025"
-    match_short_year = re.match(r"(\w+)/(\d{2})$", date_str_lower)
-    if match_short_year:
-        month_part = match_short_year.group(1)
-        year_part = match_short_year.group(2)
-        full_year = f"20{year_part}" # Assume anos 20xx
-        if month_part in month_map:
-            date_str_full = f"{month_map[month_part]}/{full_year}"
-            return datetime.strptime(date_str_full, "%m/%Y")
 
     raise ValueError(f"Formato de data '{date_str}' não reconhecido.")
 
@@ -57,4 +90,9 @@ def format_date_br(date_str: str) -> str:
     try:
         return datetime.strptime(date_str, "%Y-%m-%d").strftime("%d/%m/%Y")
     except Exception:
-        return date_str
\ No newline at end of file
+        return date_str
+
+def fold_accents(text: str) -> str:
+    """Remove acentos e normaliza caixa (ex.: 'Júlia' -> 'julia'), para comparações tolerantes."""
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
@@ -0,0 +1,99 @@
+"""
+Benchmark do /chat com 50 clientes concorrentes contra um LLM falso (sem rede).
+
+Compara o caminho antigo (chat síncrono dentro de um endpoint async, que bloqueia o
+event loop) com o novo caminho `achat`, e conta quantas sondagens do /health (a cada
+10 ms) foram respondidas durante a carga.
+
+Uso:
+    python -m benchmarks.bench_chat_async --clients 50 --requests 500 --latency 0.05
+"""
+import os
+import io
+import time
+import asyncio
+import argparse
+import contextlib
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("INTENT_ROUTER_ENABLED", "false")
+
+import httpx
+from fastapi import FastAPI
+from app import main
+from tests.fake_llm import FakePayrollLLM
+
+PAYROLL_PARAMS = {"intent": "payroll_query", "name": "Ana Souza", "competency": "2025-05", "data_type": "net_pay"}
+
+
+def _blocking_app():
+    """Reproduz o endpoint anterior: `async def` chamando o `chat` síncrono."""
+    blocking = FastAPI()
+
+    @blocking.post("/chat")
+    async def chat_endpoint(request: main.ChatRequest):
+        response_text, evidence = main.get_chatbot().chat(request.message)
+        return main.ChatResponse(response=response_text, evidence=evidence)
+
+    blocking.add_api_route("/health", main.health_check, methods=["GET"])
+    return blocking
+
+
+async def _run(asgi_app, clients: int, total_requests: int):
+    transport = httpx.ASGITransport(app=asgi_app)
+    per_client = total_requests // clients
+    health_probes = 0
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def worker():
+            for _ in range(per_client):
+                response = await client.post("/chat", json={"message": "Quanto recebi em maio/2025?"})
+                response.raise_for_status()
+
+        async def health_probe():
+            nonlocal health_probes
+            while not stop.is_set():
+                await client.get("/health")
+                health_probes += 1
+                await asyncio.sleep(0.01)
+
+        probe = asyncio.create_task(health_probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe
+
+    return {
+        "requests": per_client * clients,
+        "seconds": elapsed,
+        "rps": per_client * clients / elapsed,
+        "health_probes": health_probes,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="latência simulada do LLM (s)")
+    args = parser.parse_args()
+
+    main.get_chatbot().llm = FakePayrollLLM(latency=args.latency, extraction=PAYROLL_PARAMS)
+
+    results = {}
+    for label, asgi_app in (("blocking chat()", _blocking_app()), ("async achat()", main.app)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[label] = asyncio.run(_run(asgi_app, args.clients, args.requests))
+
+    print(f"clients={args.clients} requests={args.requests} llm_latency={args.latency * 1000:.0f}ms")
+    for label, r in results.items():
+        print(
+            f"{label:>16}: {r['rps']:8.1f} req/s  ({r['seconds']:.2f}s)  "
+            f"/health respondido {r['health_probes']}x"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,78 @@
+"""
+Benchmark do /chat/batch contra chamadas sequenciais ao /chat, com um LLM falso (sem rede).
+
+As perguntas cobrem cada funcionário x competência do dataset, repetidas até `--questions`;
+o cache de extração é esvaziado antes de cada rodada para que as duas paguem a extração.
+
+Uso:
+    python -m benchmarks.bench_chat_batch --questions 200 --latency 0.05
+"""
+import os
+import io
+import time
+import asyncio
+import argparse
+import contextlib
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("INTENT_ROUTER_ENABLED", "false")
+
+import httpx
+from app import main
+from app.extraction_cache import InMemoryExtractionCache
+from tests.fake_llm import FakePayrollLLM
+
+EMPLOYEES = ["Ana Souza", "Bruno Lima"]
+COMPETENCIES = ["2025-01", "2025-02", "2025-03", "2025-04", "2025-05", "2025-06"]
+
+
+def _questions(total: int):
+    extractions = {}
+    for i in range(total):
+        name = EMPLOYEES[i % len(EMPLOYEES)]
+        competency = COMPETENCIES[(i // len(EMPLOYEES)) % len(COMPETENCIES)]
+        extractions[f"Qual o líquido de {name} em {competency}? (#{i})"] = {
+            "intent": "payroll_query", "name": name, "competency": competency, "data_type": "net_pay",
+        }
+    return extractions
+
+
+async def _sequential(client, questions):
+    for question in questions:
+        response = await client.post("/chat", json={"message": question})
+        response.raise_for_status()
+
+
+async def _batch(client, questions):
+    response = await client.post("/chat/batch", json={"messages": questions})
+    response.raise_for_status()
+
+
+async def _run(mode, questions):
+    main.get_chatbot().extraction_cache = InMemoryExtractionCache()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await mode(client, questions)
+        return time.perf_counter() - start
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="latência simulada do LLM (s)")
+    args = parser.parse_args()
+
+    extractions = _questions(args.questions)
+    questions = list(extractions)
+    main.get_chatbot().llm = FakePayrollLLM(latency=args.latency, extractions=extractions)
+
+    print(f"questions={args.questions} llm_latency={args.latency * 1000:.0f}ms")
+    for label, mode in (("/chat sequencial", _sequential), ("/chat/batch", _batch)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds = asyncio.run(_run(mode, questions))
+        print(f"{label:>16}: {len(questions) / seconds:8.1f} perguntas/s  ({seconds:.2f}s)")
+
+
+if __name__ == "__main__":
+    main_cli()
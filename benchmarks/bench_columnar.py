@@ -0,0 +1,98 @@
+"""
+Consultas de folha no SQLite (pool + agregados) contra o motor colunar em NumPy, sobre uma
+folha sintética: busca pontual, intervalo de competências, "maior bônus", totais por período
+e uma competência da empresa inteira. Também mede a carga do motor a partir do SQLite e a
+reabertura do cache `.npy` mapeado.
+
+Uso:
+    python -m benchmarks.bench_columnar --rows 1000000 --months 24 --queries 2000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+import io
+from app.columnar import ColumnarPayroll
+from app.data_to_db import csv_to_sqlite, query_payroll_data, query_period_totals, dataset_version
+from benchmarks.synthetic_payroll import generate_payroll_csv, competencies
+
+
+def _per_query(func, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="payroll-columnar-")
+    csv_path, db_path = os.path.join(workdir, "payroll.csv"), os.path.join(workdir, "payroll.db")
+    employees = generate_payroll_csv(csv_path, args.rows, args.months)
+    with contextlib.redirect_stdout(io.StringIO()):
+        csv_to_sqlite(csv_path, db_path)
+
+    start = time.perf_counter()
+    engine = ColumnarPayroll.from_db(db_path)
+    load_seconds = time.perf_counter() - start
+    cache_dir = os.path.join(workdir, "columnar")
+    engine.save(cache_dir)
+    start = time.perf_counter()
+    ColumnarPayroll.load(cache_dir, dataset_version(db_path))
+    mmap_seconds = time.perf_counter() - start
+
+    rng = random.Random(3)
+    periods = competencies(min(args.months, args.rows))
+    ids = [f"E{rng.randrange(employees) + 1:07d}" for _ in range(args.queries)]
+    point = [(eid, rng.choice(periods)) for eid in ids]
+    ranges = [(eid, *sorted(rng.sample(periods, 2))) for eid in ids]
+
+    def sql_point(eid, competency):
+        return query_payroll_data(
+            "SELECT * FROM payroll WHERE employee_id = ? AND competency = ? ORDER BY employee_id, competency",
+            (eid, competency), db_path=db_path,
+        )
+
+    def sql_range(eid, period_start, period_end):
+        return query_payroll_data(
+            "SELECT * FROM payroll WHERE employee_id = ? AND competency BETWEEN ? AND ? ORDER BY employee_id, competency",
+            (eid, period_start, period_end), db_path=db_path,
+        )
+
+    def sql_max_bonus(eid):
+        rows = query_payroll_data(
+            "SELECT * FROM payroll WHERE employee_id = ? ORDER BY employee_id, competency", (eid,), db_path=db_path
+        )
+        return max(rows, key=lambda r: r["bonus"] or 0) if rows else None
+
+    def sql_company(competency):
+        return query_payroll_data(
+            "SELECT * FROM payroll WHERE competency = ? ORDER BY employee_id, competency", (competency,), db_path=db_path
+        )
+
+    cases = [
+        ("busca pontual", sql_point, lambda e, c: engine.fetch_rows(employee_id=e, competency=c), point),
+        ("intervalo", sql_range, lambda e, s, f: engine.fetch_rows(employee_id=e, period_start=s, period_end=f), ranges),
+        ("maior bônus", sql_max_bonus, lambda e: engine.max_row("bonus", employee_id=e), [(e,) for e in ids]),
+        ("total do período", lambda e, s, f: query_period_totals([e], s, f, db_path=db_path),
+         lambda e, s, f: engine.period_totals([e], s, f), ranges),
+        ("competência (todos)", sql_company, lambda c: engine.fetch_rows(competency=c),
+         [(rng.choice(periods),) for _ in range(max(args.queries // 100, 5))]),
+    ]
+
+    print(f"rows={args.rows} employees={employees} queries={args.queries}")
+    print(f"carga do SQLite: {load_seconds * 1000:.0f} ms   reabertura do cache .npy (mmap): {mmap_seconds * 1000:.1f} ms")
+    for label, sql_func, columnar_func, args_list in cases:
+        sql_us, columnar_us = _per_query(sql_func, args_list), _per_query(columnar_func, args_list)
+        print(f"{label:>19}: sqlite {sql_us:8.1f} µs  colunar {columnar_us:8.1f} µs  ({sql_us / columnar_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,80 @@
+"""
+Microbenchmark da formatação e do parsing de datas de `app/utils`: implementação anterior
+(`parse_date_input` varrendo o dicionário de meses e tentando `strptime`; `format_currency`
+valor a valor) contra os parsers pré-compilados e memoizados e o `format_currency_column`.
+
+Uso:
+    python -m benchmarks.bench_formatting --iterations 20000 --rows 1000
+"""
+import re
+import time
+import random
+import argparse
+from datetime import datetime
+from decimal import Decimal
+from app.utils import format_currency, format_currency_column, parse_date_input
+
+DATES = ("2025-05", "maio/2025", "05/2025", "2025-05-28", "Março/2025", "2024-12")
+
+
+def _legacy_parse_date_input(date_str: str):
+    """Reproduz o `parse_date_input` anterior (sem o caminho Mês/YY, que nunca funcionou)."""
+    formats = ["%Y-%m", "%Y-%m-%d", "%m/%Y"]
+    month_map = {
+        "janeiro": "01", "jan": "01", "fevereiro": "02", "fev": "02", "março": "03", "mar": "03",
+        "abril": "04", "abr": "04", "maio": "05", "mai": "05", "junho": "06", "jun": "06", "julho": "07", "jul": "07",
+        "agosto": "08", "ago": "08", "setembro": "09", "set": "09", "outubro": "10", "out": "10",
+        "novembro": "11", "nov": "11", "dezembro": "12", "dez": "12"
+    }
+    date_str_lower = date_str.lower()
+    for month_name, month_num in month_map.items():
+        if month_name in date_str_lower:
+            date_str_lower = date_str_lower.replace(month_name, month_num)
+            if re.match(r"^\d{1,2}/\d{4}$", date_str_lower):
+                return datetime.strptime(date_str_lower, "%m/%Y")
+            elif re.match(r"^\d{4}-\d{1,2}$", date_str_lower):
+                return datetime.strptime(date_str_lower, "%Y-%m")
+    for fmt in formats:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"Formato de data '{date_str}' não reconhecido.")
+
+
+def _best(func, repeat: int = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000, help="datas parseadas por passada")
+    parser.add_argument("--rows", type=int, default=1000, help="valores por coluna formatada")
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    dates = [rng.choice(DATES) for _ in range(args.iterations)]
+    column = [Decimal(rng.randrange(0, 10**8)) / 100 for _ in range(args.rows)]
+
+    assert [_legacy_parse_date_input(d) for d in DATES] == [parse_date_input(d) for d in DATES]
+    assert [format_currency(v) for v in column] == format_currency_column(column)
+
+    legacy_dates = _best(lambda: [_legacy_parse_date_input(d) for d in dates])
+    new_dates = _best(lambda: [parse_date_input(d) for d in dates])
+    per_value = _best(lambda: [format_currency(v) for v in column])
+    per_column = _best(lambda: format_currency_column(column))
+
+    print(f"iterations={args.iterations} rows={args.rows}")
+    print(f"parse_date_input: anterior {legacy_dates / len(dates) * 1e6:6.2f} µs  "
+          f"atual {new_dates / len(dates) * 1e6:6.2f} µs  ({legacy_dates / new_dates:.1f}x)")
+    print(f"   coluna em BRL: por valor {per_value * 1e3:6.2f} ms  "
+          f"format_currency_column {per_column * 1e3:6.2f} ms  ({per_value / per_column:.1f}x)")
+
+
+if __name__ == "__main__":
+    main_cli()
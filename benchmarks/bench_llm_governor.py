@@ -0,0 +1,93 @@
+"""
+Latência do `achat` com um provedor de LLM degradado (LLM falso com cauda lenta e erros),
+sem governador (sem prazo, sem novas tentativas, sem hedge, sem disjuntor) e com o
+`LLMGovernor`: prazo por tentativa, novas tentativas com jitter e hedge. Mostra p50/p99 e
+quantas respostas terminaram em erro.
+
+Uso:
+    python -m benchmarks.bench_llm_governor --requests 400 --clients 20 --latency 0.02 \\
+        --slow 2.0 --slow-rate 0.05 --error-rate 0.05
+"""
+import io
+import time
+import random
+import asyncio
+import argparse
+import contextlib
+from app.chatbot import PayrollChatbot, GENERAL_CHAT_ERROR
+from app.extraction_cache import InMemoryExtractionCache
+from app.intent_router import IntentRouter
+from app.response_cache import ResponseCache
+from app.llm_governor import LLMGovernor, CircuitBreaker
+from benchmarks.suite import percentile
+from tests.fake_llm import FakePayrollLLM
+
+
+def _degraded_llm(args):
+    rng = random.Random(11)
+    # Cada pergunta faz ao menos duas chamadas (extração e chat geral), mais novas tentativas e hedges.
+    latencies = [args.slow if rng.random() < args.slow_rate else args.latency for _ in range(args.requests * 6)]
+    return FakePayrollLLM(latencies=latencies, error_rate=args.error_rate, seed=13)
+
+
+async def _run(bot, args):
+    semaphore = asyncio.Semaphore(args.clients)
+    durations, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response, _ = await bot.achat(f"me conte uma curiosidade número {i}", f"bench-{i}")
+            durations.append(time.perf_counter() - start)
+            errors += response == GENERAL_CHAT_ERROR
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    return sorted(durations), errors, time.perf_counter() - start
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="latência normal do LLM (s)")
+    parser.add_argument("--slow", type=float, default=2.0, help="latência das chamadas lentas (s)")
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=0.25, help="prazo por tentativa no governador (s)")
+    parser.add_argument("--hedge-after", type=float, default=0.1)
+    args = parser.parse_args()
+
+    governors = {
+        "sem governador": LLMGovernor(
+            timeouts={}, max_retries=0, hedge_after_seconds=0, breaker=CircuitBreaker(failure_threshold=0),
+        ),
+        "com governador": LLMGovernor(
+            timeouts={"extraction": args.timeout, "general_chat": args.timeout}, max_retries=2,
+            backoff_seconds=0.01, backoff_max_seconds=0.05, hedge_after_seconds=args.hedge_after,
+        ),
+    }
+    print(
+        f"requests={args.requests} clients={args.clients} latency={args.latency * 1000:.0f}ms "
+        f"slow={args.slow * 1000:.0f}ms ({args.slow_rate:.0%}) errors={args.error_rate:.0%}"
+    )
+    for label, governor in governors.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            bot = PayrollChatbot(
+                llm=_degraded_llm(args),
+                extraction_cache=InMemoryExtractionCache(max_entries=0),
+                intent_router=IntentRouter(enabled=False),
+                response_cache=ResponseCache(max_entries=0),
+                llm_governor=governor,
+            )
+            durations, errors, elapsed = asyncio.run(_run(bot, args))
+        print(
+            f"{label:>15}: p50 {percentile(durations, 50) * 1000:7.1f} ms  "
+            f"p99 {percentile(durations, 99) * 1000:7.1f} ms  erros {errors:4d}  "
+            f"({args.requests / elapsed:.0f} req/s)  circuito {governor.breaker.state}"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,69 @@
+"""
+Pico de memória e tempo das respostas linha a linha ("INSS de todos ...") sobre uma folha
+sintética: resposta inteira (todas as linhas com `fetchall` e um texto único) contra a
+primeira página (`fetchmany` com LIMIT, formatada lote a lote). Com a paginação o pico fica
+igual para uma competência ou para a folha inteira.
+
+Uso:
+    python -m benchmarks.bench_pagination --rows 1000000 --months 24
+"""
+import os
+import io
+import time
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+
+
+def _measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(response.encode())
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--months", type=int, default=24)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="payroll-pagination-")
+    os.environ["PAYROLL_CSV_PATH"] = os.path.join(workdir, "payroll.csv")
+    os.environ["PAYROLL_DB_PATH"] = os.path.join(workdir, "payroll.db")
+    os.environ.setdefault("INTENT_ROUTER_ENABLED", "false")
+
+    from app.chatbot import PayrollChatbot
+    from app.config import PAYROLL_PAGE_SIZE
+    from app.response_cache import ResponseCache
+    from benchmarks.synthetic_payroll import generate_payroll_csv, competencies
+    from tests.fake_llm import FakePayrollLLM
+
+    generate_payroll_csv(os.environ["PAYROLL_CSV_PATH"], args.rows, args.months)
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot = PayrollChatbot(llm=FakePayrollLLM(), response_cache=ResponseCache(max_entries=0))
+
+    periods = competencies(min(args.months, args.rows))
+    cases = [
+        ("uma competência", {"competency": periods[-1]}),
+        ("um semestre", {"period_start": periods[-6], "period_end": periods[-1]}),
+        ("folha inteira", {}),
+    ]
+    print(f"rows={args.rows} page_size={PAYROLL_PAGE_SIZE}")
+    for label, extra in cases:
+        params = {"intent": "payroll_query", "data_type": "deductions_inss", **extra}
+        filters = bot._payroll_filters(params)
+        full = _measure(lambda: bot._format_payroll_answer(filters, bot._fetch_payroll_rows(filters)))
+        page = _measure(lambda: bot._payroll_response(params)[0])
+        print(
+            f"{label:>15}: inteira {full[0] * 1000:8.1f} ms  pico {full[1] / 2**20:7.1f} MiB  {full[2] / 2**20:6.1f} MiB de texto | "
+            f"página {page[0] * 1000:6.1f} ms  pico {page[1] / 2**20:5.2f} MiB  {page[2] / 2**10:5.1f} KiB de texto"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,133 @@
+"""
+Tempo das perguntas agregadas ("top 10 bônus do trimestre", "média de IRRF por mês",
+"total líquido por funcionário no ano") sobre uma folha sintética: todas as linhas do
+filtro lidas para o Python e agregadas lá, contra o `SELECT` único de `app.query_planner`
+(GROUP BY, janela e ORDER BY/LIMIT no SQLite). Mostra também o plano de cada consulta e o
+custo do índice de cobertura na ingestão: tempo e tamanho do índice atual contra a versão
+com todas as colunas numéricas e contra só a chave (competency, employee_id).
+
+Uso:
+    python -m benchmarks.bench_query_planner --rows 1000000 --months 24 --repeat 3
+"""
+import os
+import io
+import time
+import sqlite3
+import argparse
+import tempfile
+import contextlib
+from collections import defaultdict
+from statistics import median
+
+
+def _python_aggregate(spec, rows):
+    """O caminho sem planejador: agrupa, agrega e ordena as linhas no Python."""
+    column = spec["column"]
+    rows = [row for row in rows if row[column] is not None]
+    if spec["function"] is None:
+        rows.sort(key=lambda row: (-row[column], row["employee_id"], row["competency"]))
+        return rows[:spec["limit"]]
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row["employee_id"] if spec["group_by"] == "employee" else row["competency"]].append(row[column])
+    aggregate = {"sum": sum, "avg": lambda values: sum(values) / len(values), "max": max, "min": min, "count": len}
+    result = sorted((key, aggregate[spec["function"]](values)) for key, values in groups.items())
+    if spec["order"] is not None:
+        result.sort(key=lambda item: -item[1])
+    return result[:spec["limit"]] if spec["limit"] else result
+
+
+def _timed(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return median(durations)
+
+
+def _index_cost(db_path):
+    """(variante, segundos para criar o índice, MiB) de cada variante do índice de cobertura."""
+    from app.data_to_db import AGGREGATE_INDEX_COLUMNS, ROLLUP_COLUMNS
+
+    variants = [
+        ("atual", ("competency", "employee_id", *AGGREGATE_INDEX_COLUMNS)),
+        ("todas as colunas", ("competency", "employee_id", *ROLLUP_COLUMNS)),
+        ("só a chave", ("competency", "employee_id")),
+    ]
+    connection = sqlite3.connect(db_path)
+    results = []
+    try:
+        for label, columns in variants:
+            start = time.perf_counter()
+            connection.execute(f"CREATE INDEX bench_index ON payroll ({', '.join(columns)})")
+            connection.commit()
+            elapsed = time.perf_counter() - start
+            (size,) = connection.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = 'bench_index'").fetchone()
+            connection.execute("DROP INDEX bench_index")
+            connection.commit()
+            results.append((label, elapsed, size / 2 ** 20))
+    finally:
+        connection.close()
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="payroll-planner-")
+    os.environ["PAYROLL_CSV_PATH"] = os.path.join(workdir, "payroll.csv")
+    os.environ["PAYROLL_DB_PATH"] = os.path.join(workdir, "payroll.db")
+    os.environ.setdefault("INTENT_ROUTER_ENABLED", "false")
+
+    from app.chatbot import PayrollChatbot
+    from app.data_to_db import query_payroll_data
+    from app.query_planner import aggregate_spec, plan_aggregate
+    from app.response_cache import ResponseCache
+    from benchmarks.synthetic_payroll import generate_payroll_csv, competencies
+    from tests.fake_llm import FakePayrollLLM
+
+    generate_payroll_csv(os.environ["PAYROLL_CSV_PATH"], args.rows, args.months)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot = PayrollChatbot(llm=FakePayrollLLM(), response_cache=ResponseCache(max_entries=0))
+    ingest = time.perf_counter() - start
+
+    periods = competencies(min(args.months, args.rows))
+    cases = [
+        ("top 10 bônus do trimestre", {
+            "data_type": "bonus", "order": "desc", "limit": 10, "period_start": periods[-3], "period_end": periods[-1],
+        }),
+        ("média de IRRF por mês", {"data_type": "deductions_irrf", "aggregation": "avg", "group_by": "month"}),
+        ("total líquido por funcionário no ano", {
+            "data_type": "net_pay", "group_by": "employee", "period_start": periods[-12], "period_end": periods[-1],
+        }),
+    ]
+    print(f"rows={args.rows} months={args.months}")
+    table = query_payroll_data("SELECT SUM(pgsize) AS size FROM dbstat WHERE name = 'payroll'")[0]["size"]
+    print(f"ingestão {ingest:.1f} s | tabela {table / 2 ** 20:.1f} MiB")
+    for label, elapsed, size in _index_cost(os.environ["PAYROLL_DB_PATH"]):
+        print(f"{'índice ' + label:>36}: criado em {elapsed:5.2f} s | {size:7.1f} MiB")
+    for label, extra in cases:
+        params = {"intent": "payroll_query", **extra}
+        filters = bot._payroll_filters(params)
+        spec = aggregate_spec(params)
+        python = _timed(lambda: _python_aggregate(spec, bot._fetch_payroll_rows(filters)), args.repeat)
+        planned = _timed(lambda: bot._payroll_response(params), args.repeat)
+        where_clause, where_params = bot._payroll_where(filters)
+        sql, sql_params = plan_aggregate(spec, where_clause, where_params, 101, 5)
+        plan = [row["detail"] for row in query_payroll_data(f"EXPLAIN QUERY PLAN {sql}", sql_params)]
+        print(
+            f"{label:>36}: Python {python * 1000:8.1f} ms | planejador {planned * 1000:7.1f} ms "
+            f"({python / planned:5.1f}x)"
+        )
+        for detail in plan:
+            print(f"{'':>38}{detail}")
+
+
+if __name__ == "__main__":
+    main_cli()
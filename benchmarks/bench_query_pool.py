@@ -0,0 +1,62 @@
+"""
+Microbenchmark das consultas ao SQLite: função antiga (uma conexão nova por consulta e
+SQL montado com f-string) contra o pool somente leitura com parâmetros ligados.
+
+Uso:
+    python -m benchmarks.bench_query_pool --queries 20000 --threads 4
+"""
+import time
+import sqlite3
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from app.config import PAYROLL_DB_PATH as DB_PATH
+from app.data_to_db import csv_to_sqlite, query_payroll_data
+
+CASES = [("Ana Souza", "2025-05"), ("Bruno Lima", "2025-04"), ("Ana Souza", "2025-01"), ("Bruno Lima", "2025-06")]
+
+
+def _legacy_query(name, competency):
+    """Reproduz o `query_payroll_data` anterior, com a consulta interpolada."""
+    connection_to_sqlite = sqlite3.connect(DB_PATH)
+    cursor = connection_to_sqlite.cursor()
+    cursor.execute(f"SELECT net_pay, employee_id, competency FROM payroll WHERE name = '{name}' AND competency = '{competency}'")
+    columns = [desc[0] for desc in cursor.description]
+    result = cursor.fetchall()
+    connection_to_sqlite.close()
+    return [dict(zip(columns, row)) for row in result]
+
+
+def _pooled_query(name, competency):
+    return query_payroll_data(
+        "SELECT net_pay, employee_id, competency FROM payroll WHERE name = ? AND competency = ?",
+        (name, competency),
+        db_path=DB_PATH,
+    )
+
+
+def _run(func, queries: int, threads: int):
+    def worker(count):
+        for i in range(count):
+            func(*CASES[i % len(CASES)])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(worker, [queries // threads] * threads))
+    return (queries // threads) * threads / (time.perf_counter() - start)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    # O banco não é versionado: a ingestão o cria (ou não faz nada se o CSV não mudou).
+    csv_to_sqlite()
+    print(f"queries={args.queries} threads={args.threads}")
+    for label, func in (("conexão por consulta", _legacy_query), ("pool parametrizado", _pooled_query)):
+        print(f"{label:>22}: {_run(func, args.queries, args.threads):10.1f} consultas/s")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,54 @@
+"""
+Soak test do histórico por sessão: simula muitas sessões conversando e mede o tamanho
+do prompt por turno e o RSS do processo. Ambos devem ficar estáveis depois que a janela
+de turnos e o limite de sessões são atingidos.
+
+Uso:
+    python -m benchmarks.bench_sessions --sessions 10000 --turns 30 --backend memory
+"""
+import os
+import time
+import argparse
+import resource
+import tempfile
+from app.sessions import InMemorySessionStore, SQLiteSessionStore
+
+
+def _rss_mb():
+    # ru_maxrss é o pico de RSS, em KiB no Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=30, help="turnos por sessão")
+    parser.add_argument("--max-turns", type=int, default=10)
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    args = parser.parse_args()
+
+    if args.backend == "sqlite":
+        db_path = os.path.join(tempfile.mkdtemp(), "sessions.db")
+        store = SQLiteSessionStore(db_path=db_path, max_turns=args.max_turns, max_sessions=args.max_sessions)
+    else:
+        store = InMemorySessionStore(max_turns=args.max_turns, max_sessions=args.max_sessions)
+
+    message = "Quanto recebi (líquido) em maio/2025? " * 4
+    start = time.perf_counter()
+    for turn in range(args.turns):
+        prompt_chars = 0
+        for s in range(args.sessions):
+            session_id = f"sessao-{s}"
+            prompt_chars = max(prompt_chars, sum(len(content) for _, content in store.get(session_id)))
+            store.append(session_id, message, message)
+        if turn % 5 == 0 or turn == args.turns - 1:
+            print(
+                f"turno {turn + 1:3d}: maior prompt {prompt_chars:6d} chars  "
+                f"sessões ativas {len(store):6d}  RSS pico {_rss_mb():7.1f} MiB"
+            )
+    print(f"{args.sessions * args.turns} turnos em {time.perf_counter() - start:.2f}s ({args.backend})")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,116 @@
+"""
+Tempo de partida da API: do início do processo do uvicorn até a primeira resposta do
+/health, até o chatbot ficar pronto (`ready` no /health) e até o primeiro /chat respondido.
+
+Roda em modo offline (sem LLM) e com o cliente do Gemini (chave fictícia; nenhuma chamada
+ao LLM é feita, o /chat só é medido no modo offline). Também mede, num processo limpo, a
+importação de `app.main` e a construção do chatbot, que antes aconteciam juntas na importação.
+
+Uso:
+    python -m benchmarks.bench_startup --runs 3
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import urllib.error
+import urllib.request
+
+PAYROLL_QUESTION = "Quanto Ana Souza recebeu de líquido em maio/2025?"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return json.loads(response.read())
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None
+
+
+def _post(url, payload):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def _server_run(env: dict, measure_chat: bool, poll: float = 0.005, timeout: float = 120.0):
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result = {}
+    try:
+        while time.perf_counter() - start < timeout:
+            health = _get(f"{base}/health")
+            if health is not None:
+                result.setdefault("first_health_seconds", time.perf_counter() - start)
+                if health.get("ready"):
+                    result["ready_seconds"] = time.perf_counter() - start
+                    break
+            time.sleep(poll)
+        if measure_chat:
+            _post(f"{base}/chat", {"message": PAYROLL_QUESTION})
+            result["first_chat_seconds"] = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait()
+    return result
+
+
+def _import_times(env: dict):
+    code = (
+        "import time; t = time.perf_counter(); import app.main as m; i = time.perf_counter() - t; "
+        "t = time.perf_counter(); m.get_chatbot(); print(i, time.perf_counter() - t)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    ).stdout.split()
+    return {"import_app_main_seconds": float(output[-2]), "build_chatbot_seconds": float(output[-1])}
+
+
+def _mean(runs, key):
+    values = [run[key] for run in runs if key in run]
+    return sum(values) / len(values) if values else None
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    base_env = dict(os.environ, INTENT_ROUTER_ENABLED="false", CHAT_LOG_MESSAGES="false")
+    modes = {
+        "offline": dict(base_env, OFFLINE_MODE="true"),
+        "gemini": dict(base_env, OFFLINE_MODE="false", GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "benchmark")),
+    }
+
+    print(f"runs={args.runs} (médias em ms)")
+    for label, env in modes.items():
+        runs = [
+            {**_server_run(env, measure_chat=label == "offline"), **_import_times(env)}
+            for _ in range(args.runs)
+        ]
+        print(f"{label:>8}:", "  ".join(
+            f"{key}={_mean(runs, key) * 1000:.0f}"
+            for key in ("first_health_seconds", "ready_seconds", "first_chat_seconds",
+                        "import_app_main_seconds", "build_chatbot_seconds")
+            if _mean(runs, key) is not None
+        ))
+
+
+if __name__ == "__main__":
+    main_cli()
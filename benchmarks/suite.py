@@ -0,0 +1,199 @@
+"""
+Suíte de benchmarks ponta a ponta com LLM falso (sem rede nem tokens).
+
+1. Gera uma folha sintética com `--rows` linhas (10 a 10M) e faz a ingestão num banco temporário.
+2. Micro: tempo por chamada de `_handle_payroll_query`, `format_currency` e `parse_date_input`.
+3. Carga: `--clients` clientes concorrentes no `/chat` (ASGI em processo), com p50/p95/p99 e req/s.
+
+Os resultados são gravados em JSON (`--output`); com `--compare` a rodada é comparada a um
+JSON anterior, métrica a métrica.
+
+Uso:
+    python -m benchmarks.suite --rows 100000 --clients 50 --requests 2000 --latency 0.05 \\
+        --output bench_results/atual.json --compare bench_results/base.json
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+from datetime import datetime, timezone
+
+
+def percentile(sorted_values, pct: float):
+    """Percentil por interpolação linear sobre valores já ordenados."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def _time_per_call(func, args_list, repeat: int = 5):
+    """Melhor média (µs) entre `repeat` passadas por `args_list`."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for args in args_list:
+            func(*args)
+        best = min(best, (time.perf_counter() - start) / len(args_list))
+    return best * 1e6
+
+
+def run_micro(bot, employees: int, months: int, iterations: int):
+    from app.utils import format_currency, parse_date_input
+    from benchmarks.synthetic_payroll import employee_name, competencies
+    from decimal import Decimal
+
+    rng = random.Random(7)
+    periods = competencies(months)
+    handle_args = [
+        ({"intent": "payroll_query", "name": employee_name(rng.randrange(employees)),
+          "competency": rng.choice(periods), "data_type": "net_pay"},)
+        for _ in range(min(iterations, 2000))
+    ]
+    currency_args = [(Decimal(rng.randrange(0, 10**8)) / 100,) for _ in range(iterations)]
+    date_args = [(rng.choice(("2025-05", "maio/2025", "05/2025", "2025-05-28")),) for _ in range(iterations)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {
+            "handle_payroll_query_us": _time_per_call(bot._handle_payroll_query, handle_args),
+            "format_currency_us": _time_per_call(format_currency, currency_args),
+            "parse_date_input_us": _time_per_call(parse_date_input, date_args),
+        }
+
+
+async def _load(app, questions, clients: int, total_requests: int):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    per_client = total_requests // clients
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def worker(worker_id):
+            for i in range(per_client):
+                question = questions[(worker_id * per_client + i) % len(questions)]
+                start = time.perf_counter()
+                response = await client.post("/chat", json={"message": question, "session_id": f"bench-{worker_id}"})
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(w) for w in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def run_load(main_module, employees: int, months: int, clients: int, requests: int, latency: float):
+    from benchmarks.synthetic_payroll import employee_name, competencies
+    from tests.fake_llm import FakePayrollLLM
+
+    rng = random.Random(11)
+    periods = competencies(months)
+    extractions = {}
+    for i in range(max(clients, 200)):
+        if i % 5 == 4:
+            extractions[f"Conversa geral #{i}"] = {"intent": "general_chat"}
+            continue
+        name, competency = employee_name(rng.randrange(employees)), rng.choice(periods)
+        extractions[f"Quanto {name} recebeu em {competency}? #{i}"] = {
+            "intent": "payroll_query", "name": name, "competency": competency, "data_type": "net_pay",
+        }
+    main_module.get_chatbot().llm = FakePayrollLLM(latency=latency, extractions=extractions)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(_load(main_module.app, list(extractions), clients, requests))
+
+
+def compare(current: dict, baseline: dict):
+    """Imprime a variação de cada métrica numérica em relação à rodada anterior."""
+    print("\ncomparação com a rodada anterior:")
+    for section in ("micro", "load"):
+        for metric, value in current.get(section, {}).items():
+            old = baseline.get(section, {}).get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            print(f"  {section}.{metric:<28} {old:12.2f} -> {value:12.2f}  ({(value - old) / old * 100:+6.1f}%)")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="linhas da folha sintética (10 a 10M)")
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05, help="latência simulada do LLM (s)")
+    parser.add_argument("--iterations", type=int, default=20000, help="chamadas por micro-benchmark")
+    parser.add_argument("--output", help="arquivo JSON com os resultados")
+    parser.add_argument("--compare", help="JSON de uma rodada anterior para comparar")
+    args = parser.parse_args()
+
+    # A configuração do app é lida na importação: o banco sintético precisa estar no ambiente antes.
+    workdir = tempfile.mkdtemp(prefix="payroll-bench-")
+    os.environ["PAYROLL_CSV_PATH"] = os.path.join(workdir, "payroll.csv")
+    os.environ["PAYROLL_DB_PATH"] = os.path.join(workdir, "payroll.db")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.setdefault("INTENT_ROUTER_ENABLED", "false")
+
+    from benchmarks.synthetic_payroll import generate_payroll_csv
+
+    months = min(args.months, args.rows)
+    start = time.perf_counter()
+    employees = generate_payroll_csv(os.environ["PAYROLL_CSV_PATH"], args.rows, months)
+    generate_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import main
+        main.get_chatbot()
+    ingest_seconds = time.perf_counter() - start
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            **{k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "employees": employees,
+        },
+        "setup": {"generate_seconds": generate_seconds, "startup_with_ingest_seconds": ingest_seconds},
+        "micro": run_micro(main.get_chatbot(), employees, months, args.iterations),
+        "load": run_load(main, employees, months, args.clients, args.requests, args.latency),
+    }
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main_cli()
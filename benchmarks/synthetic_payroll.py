@@ -0,0 +1,84 @@
+"""
+Gerador de folha de pagamento sintética no formato de `data/payroll.csv`.
+
+Gera `--rows` linhas (funcionários x competências mensais), escrevendo em streaming para
+escalar de 10 a 10M linhas sem carregar tudo em memória. A semente fixa torna o arquivo
+reprodutível entre rodadas de benchmark.
+
+Uso:
+    python -m benchmarks.synthetic_payroll --rows 1000000 --months 24 --output /tmp/payroll.csv
+"""
+import csv
+import random
+import argparse
+
+FIRST_NAMES = [
+    "Ana", "Bruno", "Carlos", "Daniela", "Eduardo", "Fernanda", "Gabriel", "Helena", "Igor", "Juliana",
+    "Lucas", "Mariana", "Nicolas", "Olívia", "Pedro", "Rafaela", "Sérgio", "Tatiane", "Vinícius", "Yasmin",
+]
+LAST_NAMES = [
+    "Silva", "Souza", "Lima", "Costa", "Pereira", "Oliveira", "Santos", "Rodrigues", "Almeida", "Nascimento",
+    "Carvalho", "Gomes", "Martins", "Araújo", "Ribeiro", "Barbosa", "Rocha", "Dias", "Teixeira", "Conceição",
+]
+HEADER = [
+    "employee_id", "name", "competency", "base_salary", "bonus", "benefits_vt_vr", "other_earnings",
+    "deductions_inss", "deductions_irrf", "other_deductions", "net_pay", "payment_date",
+]
+
+
+def employee_name(index: int) -> str:
+    """Nome determinístico e (até 400 funcionários) único; acima disso recebe um sufixo numérico."""
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    cycle = index // (len(FIRST_NAMES) * len(LAST_NAMES))
+    return f"{first} {last}" if cycle == 0 else f"{first} {last} {cycle + 1}"
+
+
+def competencies(months: int, start_year: int = 2020):
+    return [f"{start_year + m // 12}-{m % 12 + 1:02d}" for m in range(months)]
+
+
+def generate_payroll_csv(path: str, rows: int, months: int = 12, seed: int = 42):
+    """Escreve `rows` linhas em `path`; retorna o número de funcionários gerados."""
+    rng = random.Random(seed)
+    months = max(1, min(months, rows))
+    employees = -(-rows // months)
+    periods = competencies(months)
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for e in range(employees):
+            employee_id = f"E{e + 1:07d}"
+            name = employee_name(e)
+            base_salary = rng.randrange(2000, 20000, 100)
+            for competency in periods:
+                if written == rows:
+                    return employees
+                bonus = rng.choice((0, 0, 0, 300, 500, 1000))
+                benefits = 600
+                other_earnings = rng.choice((0, 0, 200))
+                inss = round(base_salary * 0.11, 2)
+                irrf = round(max(0.0, (base_salary + bonus - inss) * 0.075 - 150), 2)
+                net_pay = round(base_salary + bonus + other_earnings - inss - irrf, 2)
+                writer.writerow([
+                    employee_id, name, competency, base_salary, bonus, benefits, other_earnings,
+                    inss, irrf, 0, net_pay, f"{competency}-28",
+                ])
+                written += 1
+    return employees
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="data/synthetic_payroll.csv")
+    args = parser.parse_args()
+    employees = generate_payroll_csv(args.output, args.rows, args.months, args.seed)
+    print(f"{args.rows} linhas ({employees} funcionários x {args.months} meses) em {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 import json
 import os
+import uuid
 
 FASTAPI_URL = os.getenv("FASTAPI_URL", "http://localhost:8000")
 
@@ -13,6 +14,9 @@ st.write("Pergunte sobre sua folha de pagamento ou converse sobre outros assunto
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
+
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
@@ -25,20 +29,35 @@ if prompt := st.chat_input("Como posso ajudar?"):
         st.markdown(prompt)
 
     try:
+        # /chat/stream: o timeout vale entre pedaços, não para a resposta inteira.
         response = requests.post(
-            f"{FASTAPI_URL}/chat",
-            json={"message": prompt},
+            f"{FASTAPI_URL}/chat/stream",
+            json={"message": prompt, "session_id": st.session_state.session_id},
+            stream=True,
             timeout=30
         )
         if response.status_code == 200:
-            data = response.json()
-            answer = data.get("response", "Nenhuma resposta gerada.")
-            evidence = data.get("evidence")
-            st.session_state.messages.append({"role": "assistant", "content": answer, "evidence": evidence})
+            final_event = {}
+
+            def stream_tokens():
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data: "):
+                        continue
+                    event = json.loads(line[len("data: "):])
+                    if event["event"] == "token":
+                        yield event["content"]
+                    else:
+                        final_event.update(event)
+
             with st.chat_message("assistant"):
-                st.markdown(answer)
+                streamed = st.write_stream(stream_tokens())
+                answer = final_event.get("content") or streamed or "Nenhuma resposta gerada."
+                if final_event.get("event") in ("message", "error"):
+                    st.markdown(answer)
+                evidence = final_event.get("evidence")
                 if evidence:
                     st.json(evidence)
+            st.session_state.messages.append({"role": "assistant", "content": answer, "evidence": evidence})
         else:
             st.session_state.messages.append({"role": "assistant", "content": f"Erro ao consultar backend: {response.status_code}"})
             with st.chat_message("assistant"):
@@ -47,5 +66,3 @@ if prompt := st.chat_input("Como posso ajudar?"):
         st.session_state.messages.append({"role": "assistant", "content": f"Erro: {str(e)}"})
         with st.chat_message("assistant"):
             st.markdown(f"Erro: {str(e)}")
-
-    
\ No newline at end of file
@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+import pytest
+
+# Antes de importar `app`: sem o roteador de intenção local nos testes, então o modelo do HF
+# não é baixado e os parâmetros vêm do LLM falso. Os testes do roteador o ligam explicitamente.
+os.environ["INTENT_ROUTER_ENABLED"] = "false"
+
+# Banco, caches e sessões dos testes num diretório temporário: a suíte ingere o CSV lá e não
+# altera nada em `data/`. Vale para a sessão inteira porque os caminhos viram padrões de
+# argumentos na importação de `app`.
+DATA_DIR = tempfile.mkdtemp(prefix="payroll-tests-")
+os.environ["PAYROLL_DB_PATH"] = os.path.join(DATA_DIR, "payroll.db")
+os.environ["SESSION_DB_PATH"] = os.path.join(DATA_DIR, "sessions.db")
+os.environ["EXTRACTION_CACHE_DB_PATH"] = os.path.join(DATA_DIR, "extraction_cache.db")
+os.environ["COLUMNAR_CACHE_DIR"] = os.path.join(DATA_DIR, "columnar")
+
+
+class FakeClock:
+    """Relógio controlado pelo teste: devolve `now`, que só muda quando o teste avança."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def data_dir():
+    # Banco padrão já ingerido: testes que só consultam não dependem de outro tê-lo criado.
+    from app.data_to_db import csv_to_sqlite
+
+    csv_to_sqlite()
+    yield DATA_DIR
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
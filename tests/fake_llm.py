@@ -0,0 +1,99 @@
+import json
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+
+class FakePayrollLLM(BaseChatModel):
+    """
+    Modelo de chat local para testes e benchmarks: responde sem rede, com latência
+    configurável. Quando chamado com `response_format` (extração), devolve em JSON a entrada
+    de `extractions` para a pergunta (ou `extraction`); caso contrário devolve `reply`. Em streaming, `reply` sai palavra
+    por palavra, com `chunk_latency` entre os pedaços.
+
+    Para simular um provedor degradado: `latencies` dá a latência de cada chamada pela ordem
+    (depois vale `latency`), as `fail_first` primeiras chamadas falham e as demais falham
+    com probabilidade `error_rate` (sorteio com `seed`). `calls` conta as chamadas.
+    """
+
+    latency: float = 0.0
+    chunk_latency: float = 0.0
+    extraction: dict = {"intent": "general_chat"}
+    extractions: dict = {}
+    reply: str = "Olá! Posso ajudar com sua folha de pagamento."
+    latencies: list = []
+    fail_first: int = 0
+    error_rate: float = 0.0
+    seed: int = 0
+    calls: int = 0
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _rng: Any = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-payroll"
+
+    def _content(self, messages, kwargs: dict) -> str:
+        if kwargs.get("response_format"):
+            extraction = self.extractions.get(messages[-1].content, self.extraction)
+            return json.dumps(extraction, ensure_ascii=False)
+        return self.reply
+
+    def _next_call(self):
+        """Latência e falha sorteadas para a próxima chamada."""
+        with self._lock:
+            if self._rng is None:
+                self._rng = random.Random(self.seed)
+            index = self.calls
+            self.calls += 1
+            latency = self.latencies[index] if index < len(self.latencies) else self.latency
+            fails = index < self.fail_first or (self.error_rate > 0 and self._rng.random() < self.error_rate)
+        return latency, fails
+
+    def _generate(self, messages, stop: Optional[list] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        latency, fails = self._next_call()
+        if latency:
+            time.sleep(latency)
+        if fails:
+            raise RuntimeError("provedor indisponível")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._content(messages, kwargs)))])
+
+    async def _agenerate(self, messages, stop: Optional[list] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        latency, fails = self._next_call()
+        if latency:
+            await asyncio.sleep(latency)
+        if fails:
+            raise RuntimeError("provedor indisponível")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._content(messages, kwargs)))])
+
+    def _chunks(self, messages, kwargs: dict):
+        words = self._content(messages, kwargs).split(" ")
+        return [word if i == len(words) - 1 else word + " " for i, word in enumerate(words)]
+
+    def _stream(self, messages, stop: Optional[list] = None, run_manager: Any = None, **kwargs):
+        latency, fails = self._next_call()
+        if latency:
+            time.sleep(latency)
+        if fails:
+            raise RuntimeError("provedor indisponível")
+        for piece in self._chunks(messages, kwargs):
+            if self.chunk_latency:
+                time.sleep(self.chunk_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    async def _astream(self, messages, stop: Optional[list] = None, run_manager: Any = None, **kwargs):
+        latency, fails = self._next_call()
+        if latency:
+            await asyncio.sleep(latency)
+        if fails:
+            raise RuntimeError("provedor indisponível")
+        for piece in self._chunks(messages, kwargs):
+            if self.chunk_latency:
+                await asyncio.sleep(self.chunk_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
@@ -1,11 +1,13 @@
 import pytest
 from app.chatbot import PayrollChatbot
+from app.intent_router import IntentRouter
+from tests.fake_llm import FakePayrollLLM
 
 
 @pytest.fixture(scope="module")
 def bot():
-    # Instancia o chatbot sem depender do LLM (não chama o .chat)
-    return PayrollChatbot()
+    # LLM falso: os testes não dependem de GEMINI_API_KEY nem de rede.
+    return PayrollChatbot(llm=FakePayrollLLM())
 
 
 def test_liquido_por_mes(bot):
@@ -45,3 +47,181 @@ def test_data_pagamento_com_liquido(bot):
     assert "28/04/2025" in resposta
     assert "R$ 5.756,25" in resposta
     assert "E002, 2025-04" in resposta
+
+
+def test_achat_consulta_folha_sem_bloquear():
+    import asyncio
+    from tests.fake_llm import FakePayrollLLM
+
+    fake = FakePayrollLLM(extraction={
+        "intent": "payroll_query",
+        "name": "Ana Souza",
+        "competency": "2025-05",
+        "data_type": "net_pay",
+    })
+    async_bot = PayrollChatbot(llm=fake)
+    resposta, evidencia = asyncio.run(async_bot.achat("Quanto recebi em maio/2025?"))
+    assert "R$ 8.418,75" in resposta
+    assert evidencia["source"]["competency"] == "2025-05"
+
+
+def test_astream_chat_primeiro_token_antes_da_resposta_completa():
+    import asyncio
+    import time
+    from tests.fake_llm import FakePayrollLLM
+
+    fake = FakePayrollLLM(reply="uma resposta longa de conversa geral com várias palavras", chunk_latency=0.02)
+    stream_bot = PayrollChatbot(llm=fake)
+
+    async def consume():
+        start = time.perf_counter()
+        first_token_at, events = None, []
+        async for event in stream_bot.astream_chat("Me conte algo", session_id="stream"):
+            if event["event"] == "token" and first_token_at is None:
+                first_token_at = time.perf_counter() - start
+            events.append(event)
+        return first_token_at, time.perf_counter() - start, events
+
+    first_token_at, total, events = asyncio.run(consume())
+    assert first_token_at < total / 2
+    assert events[-1] == {"event": "done", "content": fake.reply, "evidence": {}}
+
+
+def test_astream_chat_folha_em_um_unico_evento():
+    import asyncio
+    from tests.fake_llm import FakePayrollLLM
+
+    fake = FakePayrollLLM(extraction={
+        "intent": "payroll_query",
+        "name": "Ana Souza",
+        "competency": "2025-05",
+        "data_type": "net_pay",
+    })
+    stream_bot = PayrollChatbot(llm=fake)
+
+    async def consume():
+        return [event async for event in stream_bot.astream_chat("Quanto recebi em maio/2025?")]
+
+    events = asyncio.run(consume())
+    assert len(events) == 1
+    assert events[0]["event"] == "message"
+    assert "R$ 8.418,75" in events[0]["content"]
+
+
+def test_achat_batch_agrupa_sql_e_preserva_ordem(monkeypatch):
+    import asyncio
+    from app import chatbot as chatbot_module
+    from tests.fake_llm import FakePayrollLLM
+
+    perguntas = {
+        "líquido da Ana em março": {"intent": "payroll_query", "name": "Ana Souza", "competency": "2025-03", "data_type": "net_pay"},
+        "oi": {"intent": "general_chat"},
+        "líquido do Bruno em março": {"intent": "payroll_query", "name": "Bruno Lima", "competency": "2025-03", "data_type": "net_pay"},
+        "data de pagamento do Bruno em abril": {"intent": "payroll_query", "name": "Bruno Lima", "competency": "2025-04", "data_type": "payment_date"},
+    }
+    batch_bot = PayrollChatbot(llm=FakePayrollLLM(extractions=perguntas))
+
+    consultas = []
+    original = chatbot_module.query_payroll_data
+    monkeypatch.setattr(chatbot_module, "query_payroll_data", lambda *a, **k: consultas.append(a) or original(*a, **k))
+
+    resultados = asyncio.run(batch_bot.achat_batch(list(perguntas)))
+    assert len(consultas) == 2
+    assert "E001, 2025-03" in resultados[0][0]
+    assert resultados[1] == (FakePayrollLLM().reply, {})
+    assert "E002, 2025-03" in resultados[2][0]
+    assert "28/04/2025" in resultados[3][0]
+    assert resultados[3][1]["source"]["competency"] == "2025-04"
+
+
+def test_pergunta_unica_le_so_as_linhas_da_resposta(bot, monkeypatch):
+    from app import chatbot as chatbot_module
+
+    consultas = []
+    original = chatbot_module.query_payroll_data
+
+    def capturando(query, params=()):
+        rows = original(query, params)
+        consultas.append((query, len(rows)))
+        return rows
+
+    monkeypatch.setattr(chatbot_module, "query_payroll_data", capturando)
+    resposta = bot._handle_payroll_query({"intent": "payroll_query", "name": "Ana Souza", "data_type": "bonus"})
+    assert "R$ 1.200,00" in resposta
+    assert "LIMIT 1" in consultas[-1][0] and consultas[-1][1] == 1
+
+    resposta = bot._handle_payroll_query(
+        {"intent": "payroll_query", "data_type": "net_pay", "period_start": "2025-01", "period_end": "2025-03"}
+    )
+    assert "SUM(net_pay)" in consultas[-1][0] and consultas[-1][1] == 1
+    assert "**R$ 41.552,50**" in resposta
+
+    resposta = bot._handle_payroll_query({"intent": "payroll_query", "data_type": "payment_date"})
+    assert "E001, 2025-01" in resposta
+
+
+def test_chat_sem_session_id_nao_guarda_historico():
+    import asyncio
+    from tests.fake_llm import FakePayrollLLM
+
+    anon_bot = PayrollChatbot(llm=FakePayrollLLM())
+    asyncio.run(anon_bot.achat("me conte uma curiosidade"))
+    anon_bot.chat("me conte outra curiosidade")
+    assert len(anon_bot.sessions) == 0
+    messages = anon_bot._general_chat_messages("e mais uma?")
+    assert [message.type for message in messages] == ["system", "human"]
+
+
+def test_fallback_entende_semestre_e_ano():
+    # Só a heurística: chatbot próprio com LLM falso, sem GEMINI_API_KEY.
+    bot = PayrollChatbot(llm=FakePayrollLLM(), intent_router=IntentRouter(enabled=False))
+    params = bot._fallback_extract_params("Quanto de INSS o Bruno pagou no 2º semestre de 2024?")
+    assert (params["period_start"], params["period_end"]) == ("2024-07", "2024-12")
+    params = bot._fallback_extract_params("líquido acumulado de 2025 da Ana")
+    assert (params["period_start"], params["period_end"]) == ("2025-01", "2025-12")
+
+
+def test_ano_solto_limita_pergunta_de_todos(bot):
+    params = bot._fallback_extract_params("INSS de todos em 2021")
+    assert (params["period_start"], params["period_end"]) == ("2021-01", "2021-12")
+    response = bot._handle_payroll_query(params)
+    assert response == "Não encontrei dados de folha de pagamento de Jan/2021 a Dec/2021 para o item solicitado."
+    response = bot._handle_payroll_query(bot._fallback_extract_params("INSS de todos em 2025"))
+    assert "2025-01" in response and "2024" not in response
+
+
+def test_nome_nao_resolvido_pede_esclarecimento(bot):
+    params = bot._fallback_extract_params("INSS do Zé em 2025")
+    assert params["intent"] == "payroll_query" and "employee_id" not in params
+    response = bot._handle_payroll_query(params)
+    assert response == 'Não encontrei um único funcionário chamado "Zé". Informe o nome completo.'
+    # Nome parcial em minúsculas é resolvido.
+    params = bot._fallback_extract_params("quanto o bruno recebeu em maio/2025")
+    assert params["employee_id"] == "E002"
+    assert "R$ 6.788,75" in bot._handle_payroll_query(params)
+    # Pergunta sem nome segue para a empresa toda.
+    params = bot._fallback_extract_params("média de IRRF por mês")
+    assert "name" not in params
+
+
+def test_modo_offline_responde_folha_sem_llm():
+    import asyncio
+    from app.chatbot import OFFLINE_GENERAL_CHAT
+
+    offline_bot = PayrollChatbot(offline=True, intent_router=IntentRouter(enabled=False))
+    assert offline_bot.llm is None
+
+    resposta, evidencia = asyncio.run(offline_bot.achat("Quanto a Ana Souza recebeu de líquido em maio/2025?"))
+    assert "R$ 8.418,75" in resposta
+    assert evidencia["source"]["competency"] == "2025-05"
+    assert asyncio.run(offline_bot.achat("me conte uma piada")) == (OFFLINE_GENERAL_CHAT, {})
+
+
+def test_importar_api_nao_carrega_llm():
+    import sys
+    import subprocess
+
+    code = "import sys, app.main; print('langchain_google_genai' in sys.modules, app.main._chatbot is None)"
+    env = {"PATH": "", "PYTHONPATH": "."}
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["False", "True"]
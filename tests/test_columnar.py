@@ -0,0 +1,129 @@
+import functools
+import numpy as np
+import pytest
+from app import chatbot as chatbot_module
+from app.chatbot import PayrollChatbot
+from app.config import PAYROLL_CSV_PATH
+from app.columnar import ColumnarPayroll, load_columnar_payroll
+from app.data_to_db import csv_to_sqlite, query_payroll_data, query_period_totals, dataset_version
+from tests.fake_llm import FakePayrollLLM
+
+HEADER = "employee_id,name,competency,base_salary,bonus,benefits_vt_vr,other_earnings,deductions_inss,deductions_irrf,other_deductions,net_pay,payment_date\n"
+
+
+@pytest.fixture(scope="module")
+def db_path(tmp_path_factory):
+    # Banco próprio, carregado do CSV: não depende de `data/payroll.db` já ter sido ingerido.
+    path = str(tmp_path_factory.mktemp("columnar") / "payroll.db")
+    csv_to_sqlite(PAYROLL_CSV_PATH, path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def engine(db_path):
+    return load_columnar_payroll(db_path, cache_dir=None)
+
+
+@pytest.mark.parametrize("filters, where, params", [
+    ({"employee_id": "E001", "competency": "2025-05"}, "employee_id = ? AND competency = ?", ["E001", "2025-05"]),
+    ({"employee_ids": ["E002", "E001"], "competency": "2025-03"}, "employee_id IN (?, ?) AND competency = ?", ["E001", "E002", "2025-03"]),
+    ({"employee_id": "E002", "period_start": "2025-02", "period_end": "2025-04"}, "employee_id = ? AND competency BETWEEN ? AND ?", ["E002", "2025-02", "2025-04"]),
+    ({"name": "Ana Souza"}, "name = ?", ["Ana Souza"]),
+    ({"competency": "2025-06"}, "competency = ?", ["2025-06"]),
+    ({"employee_id": "E999"}, "employee_id = ?", ["E999"]),
+])
+def test_linhas_iguais_ao_sql(engine, db_path, filters, where, params):
+    expected = query_payroll_data(
+        f"SELECT * FROM payroll WHERE {where} ORDER BY employee_id, competency", params, db_path=db_path,
+    )
+    assert engine.fetch_rows(**filters) == expected
+
+
+def test_totais_por_periodo_iguais_aos_agregados(engine, db_path):
+    for start, end in (("2025-01", "2025-03"), ("2025-01", "2025-06"), ("2024-07", "2025-02")):
+        expected = query_period_totals(["E001", "E002"], start, end, db_path=db_path)
+        totals = engine.period_totals(["E001", "E002"], start, end)
+        assert totals.keys() == expected.keys()
+        for employee_id, employee_totals in totals.items():
+            assert employee_totals["sources"] == expected[employee_id]["sources"]
+            for column, value in employee_totals.items():
+                if column != "sources":
+                    assert value == pytest.approx(expected[employee_id][column])
+
+
+def test_maior_bonus_vetorizado(engine, db_path):
+    rows = query_payroll_data("SELECT * FROM payroll WHERE employee_id = ? ORDER BY competency", ["E001"], db_path=db_path)
+    assert engine.max_row("bonus", employee_id="E001") == max(rows, key=lambda r: r["bonus"] or 0)
+    assert engine.max_row("bonus", employee_id="E999") is None
+
+
+def test_nulos_e_cache_mapeado_em_memoria(tmp_path):
+    csv_path = tmp_path / "payroll.csv"
+    db_path = str(tmp_path / "payroll.db")
+    csv_path.write_text(
+        HEADER
+        + "E001,Ana Souza,2025-01,8000,,600,0,880.0,495.0,0,7725.0,\n"
+        + "E001,Ana Souza,2025-02,8000,300,600,0,880.0,,0,7447.5,2025-02-28\n"
+    )
+    csv_to_sqlite(str(csv_path), db_path)
+
+    cache_dir = str(tmp_path / "columnar")
+    engine = load_columnar_payroll(db_path, cache_dir=cache_dir)
+    expected = query_payroll_data("SELECT * FROM payroll ORDER BY employee_id, competency", db_path=db_path)
+    assert engine.fetch_rows(employee_id="E001") == expected
+    assert expected[0]["bonus"] is None and expected[0]["payment_date"] is None
+
+    reloaded = ColumnarPayroll.load(cache_dir, dataset_version(db_path))
+    assert isinstance(reloaded.columns["net_pay"], np.memmap)
+    assert reloaded.fetch_rows(employee_id="E001") == expected
+    assert ColumnarPayroll.load(cache_dir, "outra-versao") is None
+
+
+def test_cache_mantem_so_as_versoes_mais_recentes(engine, tmp_path):
+    cache_dir = str(tmp_path / "columnar")
+    for version in ("v1", "v2", "v3"):
+        ColumnarPayroll(engine.columns, engine.nulls, version).save(cache_dir, keep_versions=2)
+    assert ColumnarPayroll.load(cache_dir, "v1") is None
+    assert ColumnarPayroll.load(cache_dir, "v2") is not None
+    assert ColumnarPayroll.load(cache_dir, "v3") is not None
+
+
+def test_chatbot_responde_igual_nos_dois_motores(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        chatbot_module, "load_columnar_payroll",
+        functools.partial(load_columnar_payroll, cache_dir=str(tmp_path / "columnar")),
+    )
+    sql_bot = PayrollChatbot(llm=FakePayrollLLM())
+    columnar_bot = PayrollChatbot(llm=FakePayrollLLM(), payroll_backend="columnar")
+    assert columnar_bot.columnar is not None
+
+    perguntas = [
+        {"name": "Ana Souza", "competency": "2025-05", "data_type": "net_pay"},
+        {"name": "Ana Souza", "period_start": "2025-01", "period_end": "2025-03", "data_type": "net_pay"},
+        {"name": "Bruno Lima", "period_start": "2025-01", "period_end": "2025-06", "data_type": "deductions_inss"},
+        {"name": "Bruno Lima", "competency": "2025-04", "data_type": "payment_date"},
+        {"name": "Ana Souza", "data_type": "bonus"},
+        {"competency": "2025-03", "data_type": "deductions_irrf"},
+        {"name": "Bruno Lima", "competency": "2025-02"},
+    ]
+    for params in perguntas:
+        params = {"intent": "payroll_query", **params}
+        assert columnar_bot._handle_payroll_query(params) == sql_bot._handle_payroll_query(params)
+
+
+def test_indice_de_nomes_e_motor_colunar_acompanham_a_versao(monkeypatch, tmp_path):
+    from app import columnar as columnar_module
+
+    monkeypatch.setattr(
+        chatbot_module, "load_columnar_payroll",
+        functools.partial(load_columnar_payroll, cache_dir=str(tmp_path / "columnar")),
+    )
+    bot = PayrollChatbot(llm=FakePayrollLLM(), payroll_backend="columnar")
+    name_index, engine = bot.name_index, bot.columnar
+    assert bot.name_index is name_index and bot.columnar is engine
+
+    # Nova carga (ex.: feita por outro worker): a versão muda e os dois são remontados.
+    for module in (chatbot_module, columnar_module):
+        monkeypatch.setattr(module, "dataset_version", lambda db_path=None: "nova-carga")
+    assert bot.name_index is not name_index
+    assert bot.columnar is not engine and bot.columnar.version == "nova-carga"
@@ -0,0 +1,80 @@
+import threading
+from app.data_to_db import query_payroll_data, get_connection_pool
+
+
+def test_consulta_com_parametros():
+    rows = query_payroll_data(
+        "SELECT net_pay, employee_id FROM payroll WHERE name = ? AND competency = ?",
+        ("Ana Souza", "2025-05"),
+    )
+    assert rows == [{"net_pay": 8418.75, "employee_id": "E001"}]
+
+
+def test_parametro_nao_e_interpretado_como_sql():
+    rows = query_payroll_data("SELECT * FROM payroll WHERE name = ?", ("x' OR '1'='1",))
+    assert rows == []
+
+
+def test_pool_reaproveita_conexao_por_thread():
+    pool = get_connection_pool()
+    assert pool._connection() is pool._connection()
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool._connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not pool._connection()
+
+
+def test_ingestao_incremental(tmp_path):
+    import sqlite3
+    from app.data_to_db import csv_to_sqlite
+
+    header = "employee_id,name,competency,base_salary,bonus,benefits_vt_vr,other_earnings,deductions_inss,deductions_irrf,other_deductions,net_pay,payment_date\n"
+    csv_path = tmp_path / "payroll.csv"
+    db_path = str(tmp_path / "payroll.db")
+    csv_path.write_text(
+        header
+        + "E001,Ana Souza,2025-01,8000,500,600,0,880.0,495.0,0,7725.0,2025-01-28\n"
+        + "E002,Bruno Lima,2025-01,6000,0,500,0,660.0,157.5,0,5682.5,2025-01-28\n"
+    )
+    csv_to_sqlite(str(csv_path), db_path, chunk_size=1)
+
+    csv_path.write_text(
+        header
+        + "E001,Ana Souza,2025-01,8000,900,600,0,880.0,495.0,0,8125.0,2025-01-28\n"
+        + "E001,Ana Souza,2025-02,8000,0,600,200,880.0,472.5,0,7447.5,2025-02-28\n"
+    )
+    csv_to_sqlite(str(csv_path), db_path, chunk_size=1)
+
+    connection = sqlite3.connect(db_path)
+    rows = connection.execute("SELECT employee_id, competency, bonus FROM payroll ORDER BY employee_id, competency").fetchall()
+    rollups = connection.execute(
+        "SELECT employee_id, period, net_pay, sources FROM payroll_rollups WHERE period_type IN ('quarter', 'year') "
+        "ORDER BY employee_id, period"
+    ).fetchall()
+    connection.close()
+    assert rows == [("E001", "2025-01", 900), ("E001", "2025-02", 0)]
+    # Agregados acompanham a carga incremental: E002 saiu e a soma de E001 foi recalculada.
+    assert rollups == [
+        ("E001", "2025", 15572.5, "2025-01,2025-02"),
+        ("E001", "2025-Q1", 15572.5, "2025-01,2025-02"),
+    ]
+
+
+def test_decomposicao_de_periodos():
+    from app.data_to_db import rollup_periods
+
+    assert rollup_periods("2025-01", "2025-03") == ["2025-Q1"]
+    assert rollup_periods("2025-01", "2025-12") == ["2025"]
+    assert rollup_periods("2024-11", "2026-08") == ["2024-11", "2024-12", "2025", "2026-S1", "2026-07", "2026-08"]
+
+
+def test_totais_do_periodo_pelos_agregados():
+    from decimal import Decimal
+    from app.data_to_db import csv_to_sqlite, query_period_totals
+
+    csv_to_sqlite()
+    totals = query_period_totals(["E001", "E002"], "2025-01", "2025-03")
+    assert totals["E001"]["net_pay"] == Decimal("23221.25")
+    assert totals["E002"]["sources"] == ["2025-01", "2025-02", "2025-03"]
@@ -0,0 +1,44 @@
+import asyncio
+from app.chatbot import PayrollChatbot
+from app.extraction_cache import InMemoryExtractionCache, SQLiteExtractionCache, normalize_query
+from tests.fake_llm import FakePayrollLLM
+
+
+def test_normalizacao_da_pergunta():
+    assert normalize_query("Quanto   RECEBI em Maio/2025?") == normalize_query("quanto recebi em maio/2025")
+    assert normalize_query("Qual o LÍQUIDO de 05/2025") == "qual o liquido de 5/2025"
+    assert normalize_query("bônus de R$ 1.234,56") == normalize_query("bonus de r$ 1234.56")
+
+
+def test_lru_e_ttl(clock):
+    cache = InMemoryExtractionCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.set("a", {"intent": "general_chat"})
+    cache.set("b", {"intent": "general_chat"})
+    cache.get("a")
+    cache.set("c", {"intent": "general_chat"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"intent": "general_chat"}
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_sqlite_sobrevive_a_reinicio(tmp_path):
+    db_path = str(tmp_path / "extraction_cache.db")
+    SQLiteExtractionCache(db_path=db_path).set("k", {"intent": "payroll_query", "name": "Ana Souza"})
+    assert SQLiteExtractionCache(db_path=db_path).get("k") == {"intent": "payroll_query", "name": "Ana Souza"}
+
+
+def test_chatbot_reaproveita_extracao():
+    fake = FakePayrollLLM(extraction={
+        "intent": "payroll_query",
+        "name": "Ana Souza",
+        "competency": "2025-05",
+        "data_type": "net_pay",
+    })
+    bot = PayrollChatbot(llm=fake, extraction_cache=InMemoryExtractionCache())
+    asyncio.run(bot.achat("Quanto recebi em maio/2025?"))
+    resposta, _ = asyncio.run(bot.achat("quanto recebi em  MAIO/2025"))
+    assert "R$ 8.418,75" in resposta
+    assert bot.extraction_cache.stats()["hits"] == 1
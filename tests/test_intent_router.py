@@ -0,0 +1,53 @@
+import asyncio
+import re
+import zlib
+import numpy as np
+from app.chatbot import PayrollChatbot
+from app.extraction_cache import InMemoryExtractionCache, normalize_query
+from app.intent_router import IntentRouter
+from tests.fake_llm import FakePayrollLLM
+
+
+def bag_of_words(texts):
+    """Encoder determinístico para testes: bag-of-words com hashing, vetores normalizados."""
+    vectors = np.zeros((len(texts), 512), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in re.findall(r"[a-z]+", normalize_query(text)):
+            vectors[row, zlib.crc32(token.encode()) % 512] += 1.0
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+
+def make_router(**kwargs):
+    # Ligado explicitamente: o padrão vem de INTENT_ROUTER_ENABLED.
+    options = {"enabled": True, "encoder": bag_of_words, "bank_path": None, "threshold": 0.5, "margin": 0.1}
+    options.update(kwargs)
+    return IntentRouter(**options)
+
+
+def test_roteia_perguntas_obvias_e_devolve_duvidosas():
+    router = make_router()
+    assert router.route("Quanto recebi de líquido em maio/2025?")[0] == "payroll_query"
+    assert router.route("Olá, bom dia, tudo bem?")[0] == "general_chat"
+    assert router.route("xyz")[0] is None
+
+
+def test_lote_igual_ao_individual():
+    router = make_router()
+    queries = ["Qual o maior bônus que recebi?", "Me conte uma piada", "abc"]
+    assert router.route_batch(queries) == [router.route(q) for q in queries]
+
+
+def test_desativado_sempre_consulta_llm():
+    router = IntentRouter(encoder=bag_of_words, bank_path=None, enabled=False)
+    assert router.route("Quanto recebi em maio/2025?") == (None, 0.0)
+
+
+def test_chatbot_pula_llm_quando_roteador_tem_confianca():
+    # A extração pelo LLM diria general_chat: se a resposta vier da folha, o LLM não foi usado.
+    fake = FakePayrollLLM(extraction={"intent": "general_chat"})
+    router = make_router()
+    bot = PayrollChatbot(llm=fake, extraction_cache=InMemoryExtractionCache(), intent_router=router)
+    resposta, evidencia = asyncio.run(bot.achat("Quanto a Ana Souza recebeu de líquido em maio/2025?"))
+    assert "R$ 8.418,75" in resposta
+    assert evidencia["source"]["name"] == "Ana Souza"
+    assert router.stats()["share_without_llm"] == 1.0
@@ -0,0 +1,212 @@
+import time
+import asyncio
+import threading
+import pytest
+from app.chatbot import PayrollChatbot
+from app.extraction_cache import InMemoryExtractionCache
+from app.intent_router import IntentRouter
+from app.llm_governor import LLMGovernor, CircuitBreaker, CircuitOpenError
+from app.metrics import LLM_CALLS, LLM_HEDGED, LLM_RETRIES
+from tests.fake_llm import FakePayrollLLM
+
+
+def governor(**kwargs):
+    options = {"timeouts": {"general_chat": 1.0}, "max_retries": 0, "backoff_seconds": 0, "breaker": CircuitBreaker(0)}
+    options.update(kwargs)
+    return LLMGovernor(**options)
+
+
+def test_prazo_estourado_e_nova_tentativa():
+    llm = FakePayrollLLM(latencies=[0.5])
+    gov = governor(timeouts={"general_chat": 0.05}, max_retries=1)
+    before = LLM_CALLS.value(call="general_chat", outcome="timeout")
+
+    reply = asyncio.run(gov.acall(lambda: llm.ainvoke("oi")))
+
+    assert reply.content == llm.reply
+    assert llm.calls == 2
+    assert LLM_CALLS.value(call="general_chat", outcome="timeout") == before + 1
+
+
+def test_prazo_no_caminho_sincrono():
+    llm = FakePayrollLLM(latencies=[0.3])
+    gov = governor(timeouts={"general_chat": 0.05})
+    with pytest.raises(TimeoutError):
+        gov.call(lambda: llm.invoke("oi"))
+    assert gov.call(lambda: llm.invoke("oi")).content == llm.reply
+
+
+def test_erros_com_novas_tentativas():
+    llm = FakePayrollLLM(fail_first=2)
+    assert governor(max_retries=2).call(lambda: llm.invoke("oi")).content == llm.reply
+    assert llm.calls == 3
+
+    llm = FakePayrollLLM(fail_first=2)
+    with pytest.raises(RuntimeError):
+        asyncio.run(governor(max_retries=1).acall(lambda: llm.ainvoke("oi")))
+
+
+def test_hedge_responde_com_a_chamada_mais_rapida():
+    llm = FakePayrollLLM(latencies=[1.0])
+    gov = governor(timeouts={"general_chat": 2.0}, hedge_after_seconds=0.02)
+    before = LLM_HEDGED.value(call="general_chat")
+
+    start = time.perf_counter()
+    reply = asyncio.run(gov.acall(lambda: llm.ainvoke("oi")))
+
+    assert reply.content == llm.reply
+    assert time.perf_counter() - start < 0.5
+    assert llm.calls == 2
+    assert LLM_HEDGED.value(call="general_chat") == before + 1
+
+
+def test_limite_de_chamadas_simultaneas():
+    llm = FakePayrollLLM(latency=0.02)
+    gov = governor(max_concurrency=2)
+    in_flight, peak = 0, 0
+
+    async def tracked():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            return await llm.ainvoke("oi")
+        finally:
+            in_flight -= 1
+
+    async def run():
+        return await asyncio.gather(*(gov.acall(tracked) for _ in range(6)))
+
+    assert len(asyncio.run(run())) == 6
+    assert peak == 2
+
+
+def test_chamadas_sincronas_e_assincronas_dividem_o_limite():
+    gov = governor(max_concurrency=2)
+    lock = threading.Lock()
+    in_flight, peak = 0, 0
+
+    def enter():
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+
+    def leave():
+        nonlocal in_flight
+        with lock:
+            in_flight -= 1
+
+    def sync_call():
+        enter()
+        try:
+            time.sleep(0.03)
+        finally:
+            leave()
+
+    async def async_call():
+        enter()
+        try:
+            await asyncio.sleep(0.03)
+        finally:
+            leave()
+
+    threads = [threading.Thread(target=gov.call, args=(sync_call,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+
+    async def run():
+        await asyncio.gather(*(gov.acall(async_call) for _ in range(4)))
+
+    asyncio.run(run())
+    for thread in threads:
+        thread.join()
+    assert peak == 2
+
+
+def test_disjuntor_abre_e_testa_o_provedor_de_novo(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=clock)
+    llm = FakePayrollLLM(fail_first=2)
+    gov = governor(breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            gov.call(lambda: llm.invoke("oi"))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        gov.call(lambda: llm.invoke("oi"))
+    assert llm.calls == 2
+
+    clock.now = 10
+    assert gov.call(lambda: llm.invoke("oi")).content == llm.reply
+    assert breaker.state == "closed"
+
+
+def test_meio_aberto_deixa_passar_uma_chamada_e_reabre_se_falhar(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_streaming_tenta_de_novo_antes_do_primeiro_pedaco():
+    llm = FakePayrollLLM(fail_first=1, reply="um dois três")
+
+    async def run():
+        return [chunk.content async for chunk in governor(max_retries=1).astream(lambda: llm.astream("oi"))]
+
+    assert "".join(asyncio.run(run())) == "um dois três"
+    assert llm.calls == 2
+
+
+def test_falha_depois_do_primeiro_pedaco_nao_conta_nova_tentativa():
+    async def broken():
+        yield "um"
+        raise RuntimeError("queda no meio do stream")
+
+    async def run():
+        return [chunk async for chunk in governor(max_retries=2).astream(broken)]
+
+    before = LLM_RETRIES.value(call="general_chat")
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+    assert LLM_RETRIES.value(call="general_chat") == before
+
+
+def test_leitor_lento_do_stream_nao_segura_a_vaga():
+    llm = FakePayrollLLM(reply="um dois três")
+    gov = governor(max_concurrency=1)
+
+    async def run():
+        stream = gov.astream(lambda: llm.astream("oi"))
+        first = await stream.__anext__()
+        # O cliente ainda não leu o resto, mas outra chamada já consegue a vaga.
+        reply = await asyncio.wait_for(gov.acall(lambda: llm.ainvoke("oi")), 0.5)
+        rest = [chunk.content async for chunk in stream]
+        return first.content + "".join(rest), reply.content
+
+    assert asyncio.run(run()) == ("um dois três", "um dois três")
+
+
+def test_disjuntor_aberto_leva_a_extracao_para_a_heuristica():
+    llm = FakePayrollLLM(fail_first=100)
+    bot = PayrollChatbot(
+        llm=llm,
+        extraction_cache=InMemoryExtractionCache(),
+        intent_router=IntentRouter(enabled=False),
+        llm_governor=governor(breaker=CircuitBreaker(failure_threshold=1, reset_seconds=60)),
+    )
+    pergunta = "Qual o salário líquido da Ana Souza em maio/2025?"
+
+    primeira, _ = asyncio.run(bot.achat(pergunta, "governor-1"))
+    assert bot.governor.breaker.state == "open"
+    calls = llm.calls
+
+    segunda, evidence = asyncio.run(bot.achat(pergunta, "governor-2"))
+    assert llm.calls == calls
+    assert segunda == primeira
+    assert evidence["source"] == bot._fallback_extract_params(pergunta)
@@ -0,0 +1,72 @@
+import asyncio
+from app.chatbot import PayrollChatbot
+from app.extraction_cache import InMemoryExtractionCache
+from app.intent_router import IntentRouter
+from app.response_cache import ResponseCache
+from app.metrics import MetricsRegistry, STAGE_SECONDS, INTENTS, EXTRACTIONS, LLM_ERRORS
+from tests.fake_llm import FakePayrollLLM
+
+
+class FailingLLM(FakePayrollLLM):
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise RuntimeError("provedor indisponível")
+
+
+def test_formato_prometheus():
+    metrics = MetricsRegistry()
+    requests = metrics.counter("x_requests_total", "Requisições.")
+    latency = metrics.histogram("x_seconds", "Latência.", buckets=(0.1, 1.0))
+    requests.inc(intent="general_chat")
+    requests.inc(2, intent="general_chat")
+    latency.observe(0.05, stage="sql")
+    latency.observe(0.5, stage="sql")
+
+    text = metrics.render()
+    assert "# TYPE x_requests_total counter" in text
+    assert 'x_requests_total{intent="general_chat"} 3' in text
+    assert "# TYPE x_seconds histogram" in text
+    assert 'x_seconds_bucket{stage="sql",le="0.1"} 1' in text
+    assert 'x_seconds_bucket{stage="sql",le="1"} 2' in text
+    assert 'x_seconds_bucket{stage="sql",le="+Inf"} 2' in text
+    assert 'x_seconds_count{stage="sql"} 2' in text
+
+
+def test_spans_e_contadores_do_chat():
+    extraction = {"intent": "payroll_query", "name": "Ana Souza", "competency": "2025-05", "data_type": "net_pay"}
+    bot = PayrollChatbot(
+        llm=FakePayrollLLM(extraction=extraction),
+        extraction_cache=InMemoryExtractionCache(),
+        intent_router=IntentRouter(enabled=False),
+        response_cache=ResponseCache(max_entries=0),
+    )
+    before_sql = STAGE_SECONDS.count(stage="sql")
+    before_formatting = STAGE_SECONDS.count(stage="formatting")
+    before_intent = INTENTS.value(intent="payroll_query")
+    before_llm = EXTRACTIONS.value(source="llm")
+    before_cache = EXTRACTIONS.value(source="cache")
+
+    asyncio.run(bot.achat("quanto a Ana Souza recebeu em maio/2025?", "metrics"))
+    asyncio.run(bot.achat("quanto a Ana Souza recebeu em maio/2025?", "metrics"))
+
+    assert STAGE_SECONDS.count(stage="sql") == before_sql + 2
+    assert INTENTS.value(intent="payroll_query") == before_intent + 2
+    assert EXTRACTIONS.value(source="llm") == before_llm + 1
+    assert EXTRACTIONS.value(source="cache") == before_cache + 1
+    assert STAGE_SECONDS.count(stage="formatting") == before_formatting + 2
+
+
+def test_falhas_do_llm_e_fallback():
+    bot = PayrollChatbot(
+        llm=FailingLLM(),
+        extraction_cache=InMemoryExtractionCache(),
+        intent_router=IntentRouter(enabled=False),
+    )
+    before_fallback = EXTRACTIONS.value(source="fallback")
+    before_extraction = LLM_ERRORS.value(call="extraction")
+    before_chat = LLM_ERRORS.value(call="general_chat")
+
+    asyncio.run(bot.achat("me conte uma curiosidade", "metrics-falha"))
+
+    assert EXTRACTIONS.value(source="fallback") == before_fallback + 1
+    assert LLM_ERRORS.value(call="extraction") == before_extraction + 1
+    assert LLM_ERRORS.value(call="general_chat") == before_chat + 1
@@ -0,0 +1,53 @@
+from app.name_index import NameIndex
+
+EMPLOYEES = [
+    ("E001", "Ana Souza"),
+    ("E002", "Bruno Lima"),
+    ("E003", "Júlia Conceição"),
+    ("E004", "Ana Pereira"),
+]
+
+
+def test_resolve_nome_parcial_sem_acento_e_com_erro():
+    index = NameIndex(EMPLOYEES)
+    assert index.resolve("ANA SOUZA") == ("E001", "Ana Souza")
+    assert index.resolve("julia conceicao") == ("E003", "Júlia Conceição")
+    assert index.resolve("Bru") == ("E002", "Bruno Lima")
+    assert index.resolve("Ana Sousa") == ("E001", "Ana Souza")
+
+
+def test_nome_ambiguo_nao_e_resolvido():
+    index = NameIndex(EMPLOYEES)
+    assert index.resolve("Ana") is None
+
+
+def test_encontra_funcionario_na_pergunta():
+    index = NameIndex(EMPLOYEES)
+    assert index.find_in_text("Quando foi pago o salário de abril/2025 do Bruno?") == ("E002", "Bruno Lima")
+    assert index.find_in_text("Qual o líquido de março?") is None
+    # Nome parcial em minúsculas também vale, se for igual a um token de nome.
+    assert index.find_in_text("quanto o bruno recebeu em maio/2025") == ("E002", "Bruno Lima")
+    assert index.find_in_text("líquido da julia em maio") == ("E003", "Júlia Conceição")
+    assert index.find_in_text("quanto a ana recebeu") is None
+
+
+def test_indice_montado_da_tabela_payroll():
+    index = NameIndex.from_db()
+    assert index.resolve("ana souza") == ("E001", "Ana Souza")
+
+
+def test_palavras_comuns_nao_viram_funcionario():
+    index = NameIndex(EMPLOYEES + [("E005", "Marcos Medina"), ("E006", "Maísa Rocha")])
+    assert index.find_in_text("média de IRRF por mês") is None
+    assert index.find_in_text("Média de IRRF por mês") is None
+    assert index.find_in_text("quanto recebi a mais") is None
+    assert index.unresolved_mention("quanto recebi a mais") is None
+
+
+def test_nome_completo_com_digitos_e_mencao_nao_resolvida():
+    index = NameIndex([("E001", "Ana Silva"), ("E401", "Ana Silva 2"), ("E002", "Bruno Lima")])
+    assert index.find_in_text("líquido da ana silva 2 em maio") == ("E401", "Ana Silva 2")
+    assert index.find_in_text("líquido da ana silva em maio") == ("E001", "Ana Silva")
+    assert index.find_in_text("bônus do bruno lima") == ("E002", "Bruno Lima")
+    assert index.unresolved_mention("INSS da Ana em 2025") == "Ana"
+    assert index.unresolved_mention("INSS do Zé em 2025") == "Zé"
@@ -0,0 +1,136 @@
+import asyncio
+import functools
+import pytest
+from app import chatbot as chatbot_module
+from app.chatbot import PayrollChatbot
+from app.columnar import load_columnar_payroll
+from app.data_to_db import query_payroll_data
+from app.pagination import encode_cursor, decode_cursor, InvalidCursorError
+from app.response_cache import ResponseCache
+from tests.fake_llm import FakePayrollLLM
+
+# "INSS de todos": sem nome nem competência, a consulta cobre a folha inteira.
+PARAMS = {"intent": "payroll_query", "data_type": "deductions_inss"}
+
+
+@pytest.fixture
+def small_pages(monkeypatch):
+    monkeypatch.setattr(chatbot_module, "PAYROLL_PAGE_SIZE", 4)
+    monkeypatch.setattr(chatbot_module, "PAYROLL_FETCH_BATCH", 3)
+
+
+def _all_pages(bot):
+    async def run():
+        pages, cursor = [], None
+        while True:
+            response, evidence = await bot.achat("INSS de todos", "paginas", cursor)
+            pages.append((response, evidence["page"]))
+            cursor = evidence["page"]["next_cursor"]
+            if cursor is None:
+                return pages
+
+    return asyncio.run(run())
+
+
+def test_cursor_ida_e_volta_e_invalido():
+    params = decode_cursor(encode_cursor({**PARAMS, "after": ["E000", "2000-01"]}, ("E001", "2025-03")))
+    assert params == {**PARAMS, "after": ["E001", "2025-03"]}
+    tampered = [{**PARAMS, "name": {"x": 1}}, {**PARAMS, "data_type": ["bonus"]}, {**PARAMS, "competency": 5},
+                {**PARAMS, "period_start": "0", "period_end": "9"}]
+    cursors = ["nao-e-base64!", encode_cursor({"intent": "general_chat"}, ("E001", "2025-03"))[:-2], "W10"]
+    cursors += [encode_cursor(params, ("E001", "2025-03")) for params in tampered]
+    for cursor in cursors:
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor)
+
+
+def test_respostas_sem_paginacao_leem_linhas_limitadas(monkeypatch):
+    lidas = []
+    original_query, original_iter = chatbot_module.query_payroll_data, chatbot_module.iter_payroll_data
+
+    def query(*args, **kwargs):
+        rows = original_query(*args, **kwargs)
+        lidas.append(len(rows))
+        return rows
+
+    def iterate(*args, **kwargs):
+        for batch in original_iter(*args, **kwargs):
+            lidas.append(len(batch))
+            yield batch
+
+    monkeypatch.setattr(chatbot_module, "query_payroll_data", query)
+    monkeypatch.setattr(chatbot_module, "iter_payroll_data", iterate)
+    monkeypatch.setattr(chatbot_module, "AGGREGATE_SOURCE_LIMIT", 2)
+    bot = PayrollChatbot(llm=FakePayrollLLM(), response_cache=ResponseCache(max_entries=0))
+    # Data de pagamento sem nome e líquido da empresa no período: nada cresce com a folha.
+    bot._payroll_response({"intent": "payroll_query", "data_type": "payment_date"})
+    bot._payroll_response({"intent": "payroll_query", "data_type": "net_pay", "period_start": "2025-01", "period_end": "2025-12"})
+    assert lidas == [1, 1]
+
+
+def test_lote_pagina_respostas_linha_a_linha(small_pages):
+    # Sem competência: todas as linhas de cada funcionário, então cada resposta é paginada.
+    perguntas = {
+        "IRRF da Ana": {"intent": "payroll_query", "name": "Ana Souza", "data_type": "deductions_irrf"},
+        "IRRF do Bruno": {"intent": "payroll_query", "name": "Bruno Lima", "data_type": "deductions_irrf"},
+    }
+    bot = PayrollChatbot(llm=FakePayrollLLM(extractions=perguntas), response_cache=ResponseCache(max_entries=0))
+
+    resultados = asyncio.run(bot.achat_batch(list(perguntas)))
+
+    for (response, evidence), employee_id in zip(resultados, ("E001", "E002")):
+        assert evidence["page"]["rows"] == 4 and evidence["page"]["next_cursor"]
+        assert response.count(f"{employee_id}, 2025-") == 4
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "columnar"])
+def test_paginas_cobrem_todas_as_linhas_uma_vez(small_pages, monkeypatch, tmp_path, backend):
+    monkeypatch.setattr(
+        chatbot_module, "load_columnar_payroll",
+        functools.partial(load_columnar_payroll, cache_dir=str(tmp_path / "columnar")),
+    )
+    bot = PayrollChatbot(llm=FakePayrollLLM(extraction=PARAMS), payroll_backend=backend)
+    rows = query_payroll_data("SELECT * FROM payroll ORDER BY employee_id, competency")
+    expected = bot._format_column_lines("deductions_inss", rows)
+
+    pages = _all_pages(bot)
+
+    assert len(pages) == -(-len(rows) // 4)
+    assert all(page["rows"] == 4 for _, page in pages[:-1])
+    lines = []
+    for response, page in pages:
+        body = response.split("\n")[1:]
+        if page["next_cursor"]:
+            assert body.pop() == "Mostrando 4 linhas; há mais resultados na próxima página."
+        lines.extend(body)
+    assert lines == expected
+
+
+def test_pagina_le_o_banco_em_lotes_limitados(small_pages, monkeypatch):
+    batches = []
+    original = chatbot_module.iter_payroll_data
+
+    def counting(*args, **kwargs):
+        for batch in original(*args, **kwargs):
+            batches.append(len(batch))
+            yield batch
+
+    monkeypatch.setattr(chatbot_module, "iter_payroll_data", counting)
+    bot = PayrollChatbot(llm=FakePayrollLLM(extraction=PARAMS), response_cache=ResponseCache(max_entries=0))
+    response, evidence = bot._payroll_response(PARAMS)
+
+    # Página de 4 linhas + 1 para saber se há continuação, lida de 3 em 3.
+    assert batches == [3, 2]
+    assert evidence["page"]["rows"] == 4 and evidence["page"]["next_cursor"]
+
+
+def test_consulta_sem_continuacao_nao_tem_cursor():
+    bot = PayrollChatbot(llm=FakePayrollLLM())
+    params = {"intent": "payroll_query", "name": "Bruno Lima", "data_type": "deductions_inss"}
+    response, evidence = bot.chat("INSS do Bruno", cursor=encode_cursor(params, ("E002", "2025-04")))
+    assert response.count("Fonte:") == 2
+    assert "E002, 2025-05" in response and "E002, 2025-04" not in response
+    assert evidence["page"]["next_cursor"] is None
+
+    response, evidence = bot.chat("mais", cursor=encode_cursor(params, ("E002", "2025-06")))
+    assert response == "Não há mais dados para esta consulta."
@@ -0,0 +1,139 @@
+from collections import defaultdict
+import pytest
+from app import chatbot as chatbot_module
+from app.chatbot import PayrollChatbot
+from app.data_to_db import AGGREGATE_INDEX_COLUMNS, query_payroll_data
+from app.query_planner import aggregate_spec, plan_aggregate
+from app.response_cache import ResponseCache
+from tests.fake_llm import FakePayrollLLM
+
+AGGREGATES = {"sum": sum, "avg": lambda values: sum(values) / len(values), "max": max, "min": min, "count": len}
+
+
+@pytest.fixture(scope="module")
+def bot():
+    return PayrollChatbot(llm=FakePayrollLLM(), response_cache=ResponseCache(max_entries=0))
+
+
+def _rows(where=lambda row: True):
+    return [row for row in query_payroll_data("SELECT * FROM payroll") if where(row)]
+
+
+@pytest.mark.parametrize("extra, where", [
+    ({"data_type": "deductions_irrf", "aggregation": "avg", "group_by": "month"}, lambda row: True),
+    (
+        {"data_type": "net_pay", "group_by": "employee", "period_start": "2025-01", "period_end": "2025-12"},
+        lambda row: "2025-01" <= row["competency"] <= "2025-12",
+    ),
+    ({"data_type": "deductions_inss", "aggregation": "max", "group_by": "month"}, lambda row: True),
+    ({"data_type": "bonus", "aggregation": "min", "group_by": "employee"}, lambda row: True),
+    ({"data_type": "bonus", "aggregation": "count", "competency": "2025-03"}, lambda row: row["competency"] == "2025-03"),
+])
+def test_agregacao_confere_com_python_e_cita_as_linhas(bot, extra, where):
+    params = {"intent": "payroll_query", **extra}
+    spec = aggregate_spec(params)
+    column, key = spec["column"], {"employee": "employee_id", "month": "competency"}.get(spec["group_by"])
+    rows = _rows(where)
+    expected = defaultdict(list)
+    for row in rows:
+        expected[row[key] if key else None].append(row)
+
+    response, evidence = bot._payroll_response(params)
+
+    groups = evidence["aggregate"]["groups"]
+    totals = {k: AGGREGATES[spec["function"]]([row[column] for row in group_rows]) for k, group_rows in expected.items()}
+    if spec["order"] is None:
+        order = sorted(totals)
+    else:
+        sign = -1 if spec["order"] == "desc" else 1
+        order = sorted(totals, key=lambda k: (sign * totals[k], k or ""))
+    assert [group["key"] for group in groups] == order
+    for group in groups:
+        group_rows = expected[group["key"]]
+        values = [row[column] for row in group_rows]
+        assert group["value"] == pytest.approx(AGGREGATES[spec["function"]](values))
+        assert group["rows"] == len(group_rows)
+        cited = {f"{row['employee_id']}, {row['competency']}": row for row in group_rows}
+        assert group["sources"] and all(source in cited for source in group["sources"])
+        if spec["function"] in ("max", "min"):
+            assert [cited[source][column] for source in group["sources"]] == [group["value"]]
+        for source in group["sources"]:
+            assert source in response
+
+
+def test_ranking_de_linhas(bot):
+    params = {"intent": "payroll_query", "data_type": "bonus", "order": "desc", "limit": 3}
+    expected = sorted(_rows(), key=lambda row: (-row["bonus"], row["employee_id"], row["competency"]))[:3]
+
+    response, evidence = bot._payroll_response(params)
+
+    assert [group["sources"] for group in evidence["aggregate"]["groups"]] == [
+        [f"{row['employee_id']}, {row['competency']}"] for row in expected
+    ]
+    assert response.splitlines()[1] == "1. Ana Souza em 2025-05: **R$ 1.200,00**. Fonte: `E001, 2025-05`"
+
+
+def test_uma_unica_consulta_e_teto_de_grupos(bot, monkeypatch):
+    queries = []
+    original = chatbot_module.query_payroll_data
+
+    def counting(query, params=()):
+        queries.append(query)
+        return original(query, params)
+
+    monkeypatch.setattr(chatbot_module, "query_payroll_data", counting)
+    monkeypatch.setattr(chatbot_module, "AGGREGATE_MAX_GROUPS", 4)
+    params = {"intent": "payroll_query", "data_type": "net_pay", "aggregation": "sum", "group_by": "month"}
+
+    response, evidence = bot._payroll_response(params)
+
+    assert len(queries) == 1
+    assert len(evidence["aggregate"]["groups"]) == 4
+    assert response.endswith("Mostrando os 4 primeiros grupos.")
+
+
+def test_agrupamento_por_mes_usa_indice_de_cobertura():
+    spec = aggregate_spec({"data_type": "deductions_irrf", "aggregation": "avg", "group_by": "month"})
+    sql, params = plan_aggregate(spec, "", [], 101, 5)
+    plan = " ".join(row["detail"] for row in query_payroll_data(f"EXPLAIN QUERY PLAN {sql}", params))
+    assert "COVERING INDEX idx_payroll_competency_employee" in plan
+
+
+def test_indice_de_cobertura_so_copia_as_colunas_agregadas():
+    columns = [row["name"] for row in query_payroll_data("PRAGMA index_info(idx_payroll_competency_employee)")]
+    assert columns == ["competency", "employee_id", *AGGREGATE_INDEX_COLUMNS]
+    # Coluna fora do índice continua agregada certo, lendo a tabela.
+    spec = aggregate_spec({"data_type": "base_salary", "aggregation": "sum", "group_by": "month"})
+    sql, params = plan_aggregate(spec, "", [], 101, 5)
+    totals = {row["competency"]: row["value"] for row in query_payroll_data(sql, params)}
+    expected = defaultdict(int)
+    for row in _rows():
+        expected[row["competency"]] += row["base_salary"]
+    assert totals == expected
+
+
+def test_fallback_extrai_agregacoes(bot):
+    cases = {
+        "top 10 bônus": {"function": None, "column": "bonus", "group_by": None, "order": "desc", "limit": 10},
+        "média de IRRF por mês": {
+            "function": "avg", "column": "deductions_irrf", "group_by": "month", "order": None, "limit": None,
+        },
+        "total líquido por funcionário em 2025": {
+            "function": "sum", "column": "net_pay", "group_by": "employee", "order": "desc", "limit": None,
+        },
+    }
+    for query, expected in cases.items():
+        assert aggregate_spec(bot._fallback_extract_params(query)) == expected
+    assert bot._fallback_extract_params("total líquido por funcionário em 2025")["period_start"] == "2025-01"
+    # Trimestre/semestre sem número: o da última competência carregada (2025-06).
+    params = bot._fallback_extract_params("top 10 bônus do trimestre")
+    assert (params["period_start"], params["period_end"]) == ("2025-04", "2025-06")
+    response, _ = bot._payroll_response(params)
+    assert response.startswith("Maiores valores de bônus de Apr/2025 a Jun/2025:")
+    params = bot._fallback_extract_params("média de IRRF do semestre")
+    assert (params["period_start"], params["period_end"]) == ("2025-01", "2025-06")
+    params = bot._fallback_extract_params("INSS do 2º semestre de 2024")
+    assert (params["period_start"], params["period_end"]) == ("2024-07", "2024-12")
+    # Sem pedido de agregação, segue pelos caminhos de sempre.
+    assert aggregate_spec(bot._fallback_extract_params("Quanto recebi em maio de 2025?")) is None
+    assert aggregate_spec({"data_type": "payment_date", "aggregation": "max"}) is None
@@ -0,0 +1,102 @@
+import asyncio
+import shutil
+from app import chatbot as chatbot_module
+from app.chatbot import PayrollChatbot
+from app.data_to_db import csv_to_sqlite, dataset_version
+from app.response_cache import ResponseCache, SingleFlight, response_key
+from tests.fake_llm import FakePayrollLLM
+
+PARAMS = {"intent": "payroll_query", "name": "Ana Souza", "competency": "2025-05", "data_type": "net_pay"}
+
+
+def test_chave_independe_da_ordem_e_muda_com_a_versao():
+    assert response_key("v1", {"a": 1, "b": 2}) == response_key("v1", {"b": 2, "a": 1})
+    assert response_key("v1", PARAMS) != response_key("v2", PARAMS)
+
+
+def test_lru_ttl_e_desligado(clock):
+    cache = ResponseCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache.get("a")
+    cache.set("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 2
+
+    disabled = ResponseCache(max_entries=0)
+    disabled.set("a", "A")
+    assert disabled.get("a") is None
+
+
+def test_single_flight_compartilha_chamadas_simultaneas():
+    flight = SingleFlight("teste")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "resposta"
+
+    async def run():
+        return await asyncio.gather(*(flight.run("k", compute) for _ in range(10)))
+
+    assert asyncio.run(run()) == ["resposta"] * 10
+    assert len(calls) == 1
+    assert flight.coalesced == 9
+    assert len(flight) == 0
+
+
+def test_perguntas_iguais_simultaneas_fazem_uma_consulta(monkeypatch):
+    bot = PayrollChatbot(llm=FakePayrollLLM(extraction=PARAMS), response_cache=ResponseCache())
+    consultas = []
+    original = bot._payroll_response
+    monkeypatch.setattr(bot, "_payroll_response", lambda params: consultas.append(params) or original(params))
+
+    async def run():
+        return await asyncio.gather(*(bot.achat("Quanto a Ana recebeu em maio/2025?", f"s{i}") for i in range(20)))
+
+    respostas = asyncio.run(run())
+    assert {resposta for resposta, _ in respostas} == {respostas[0][0]}
+    assert "R$ 8.418,75" in respostas[0][0]
+    asyncio.run(bot.achat("Quanto a Ana recebeu em maio/2025?"))
+    assert len(consultas) == 1
+
+
+def test_chat_geral_identico_simultaneo_chama_o_llm_uma_vez():
+    bot = PayrollChatbot(llm=FakePayrollLLM(latency=0.02), response_cache=ResponseCache())
+    chamadas = []
+    original = bot.llm.ainvoke
+
+    async def counting_ainvoke(messages, *args, **kwargs):
+        chamadas.append(messages)
+        return await original(messages, *args, **kwargs)
+
+    object.__setattr__(bot.llm, "ainvoke", counting_ainvoke)
+
+    async def run():
+        return await asyncio.gather(*(bot.achat("me conte uma curiosidade", f"nova-{i}") for i in range(5)))
+
+    respostas = asyncio.run(run())
+    assert all(resposta == (FakePayrollLLM().reply, {}) for resposta in respostas)
+    # As extrações chegam como prompt da chain; as mensagens do chat geral, como lista.
+    assert len([m for m in chamadas if isinstance(m, list)]) == 1
+
+
+def test_nova_ingestao_invalida_respostas(monkeypatch, tmp_path):
+    csv_path, db_path = tmp_path / "payroll.csv", str(tmp_path / "payroll.db")
+    shutil.copy("data/payroll.csv", csv_path)
+    csv_to_sqlite(str(csv_path), db_path)
+    monkeypatch.setattr(chatbot_module, "PAYROLL_DB_PATH", db_path)
+
+    bot = PayrollChatbot(llm=FakePayrollLLM(), response_cache=ResponseCache())
+    version = dataset_version(db_path)
+    key = bot._payroll_key(PARAMS)
+    assert version and version in key
+
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("E003,Carla Dias,2025-05,7000,0,600,0,770.0,300.0,0,6530.0,2025-05-28\n")
+    assert csv_to_sqlite(str(csv_path), db_path) != version
+    assert bot._payroll_key(PARAMS) != key
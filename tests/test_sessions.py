@@ -0,0 +1,41 @@
+from app.sessions import InMemorySessionStore, SQLiteSessionStore
+
+
+def test_janela_de_turnos_limitada():
+    store = InMemorySessionStore(max_turns=2, ttl_seconds=60, max_sessions=10)
+    for i in range(5):
+        store.append("s1", f"pergunta {i}", f"resposta {i}")
+    assert store.get("s1") == [
+        ("human", "pergunta 3"), ("ai", "resposta 3"),
+        ("human", "pergunta 4"), ("ai", "resposta 4"),
+    ]
+
+
+def test_sessoes_isoladas_e_lru():
+    store = InMemorySessionStore(max_turns=2, ttl_seconds=60, max_sessions=2)
+    store.append("a", "oi", "olá")
+    store.append("b", "oi", "olá")
+    store.get("a")
+    store.append("c", "oi", "olá")
+    assert len(store) == 2
+    assert store.get("b") == []
+    assert store.get("a") == [("human", "oi"), ("ai", "olá")]
+
+
+def test_sessao_expira_por_ttl(clock):
+    store = InMemorySessionStore(max_turns=2, ttl_seconds=10, max_sessions=10, clock=clock)
+    store.append("s1", "oi", "olá")
+    clock.now = 11
+    assert store.get("s1") == []
+    assert len(store) == 0
+
+
+def test_sqlite_compartilha_sessoes_entre_instancias(tmp_path, clock):
+    db_path = str(tmp_path / "sessions.db")
+    writer = SQLiteSessionStore(db_path=db_path, max_turns=1, ttl_seconds=10, max_sessions=10, clock=clock)
+    reader = SQLiteSessionStore(db_path=db_path, max_turns=1, ttl_seconds=10, max_sessions=10, clock=clock)
+    writer.append("s1", "pergunta 1", "resposta 1")
+    writer.append("s1", "pergunta 2", "resposta 2")
+    assert reader.get("s1") == [("human", "pergunta 2"), ("ai", "resposta 2")]
+    clock.now = 11
+    assert reader.get("s1") == []
@@ -1,5 +1,7 @@
+import pytest
+from datetime import datetime
 from decimal import Decimal
-from app.utils import format_currency
+from app.utils import format_currency, format_currency_column, parse_date_input
 
 def test_format_currency_decimal():
     value = Decimal("1234.56")
@@ -8,3 +10,19 @@ def test_format_currency_decimal():
 def test_format_currency_rounding():
     value = Decimal("1234.567")
     assert format_currency(value) == "R$ 1.234,57"
+
+def test_format_currency_column_igual_ao_formatador_por_valor():
+    values = [Decimal("1234.567"), None, Decimal("-0.5"), 0, 1.5, Decimal("1000000")]
+    assert format_currency_column(values) == [format_currency(v) for v in values]
+    assert format_currency_column([]) == []
+
+def test_parse_date_input_formatos():
+    assert parse_date_input("2025-05") == datetime(2025, 5, 1)
+    assert parse_date_input("2025-05-28") == datetime(2025, 5, 28)
+    assert parse_date_input("5/2025") == datetime(2025, 5, 1)
+    assert parse_date_input("Março/2025") == datetime(2025, 3, 1)
+    assert parse_date_input("mai/25") == datetime(2025, 5, 1)
+    assert parse_date_input("2025-maio") == datetime(2025, 5, 1)
+    for invalid in ("2025-13", "2025-02-30", "marco/2025", "maio de 2025"):
+        with pytest.raises(ValueError):
+            parse_date_input(invalid)